@@ -26,17 +26,68 @@ class Settings:
     groq_api_key: str = ""
     embedding_model_name: str = "sentence-transformers/all-MiniLM-L6-v2"
     top_k: int = 4
+    retrieval_oversample: int = 2
+    router_workers: int = 8
+    embed_concurrency: int = 2
+    store_concurrency: int = 8
+    llm_concurrency: int = 4
+    llm_model_name: str = "llama-3.1-8b-instant"
+    groq_base_url: str = ""  # vacío = API pública de Groq
+    llm_timeout_s: float = 30.0
+    llm_max_connections: int = 20
+    llm_max_retries: int = 3
     persons: List[PersonConfig] = None
+    vector_backend: str = "pinecone"  # "pinecone" | "local"
+    local_index_dir: str = ".index/vectors"
+    vector_namespaces: str = "person"  # "person" (un namespace por persona) | "none"
+    ingest_manifest_path: str = ".index/manifest.json"
+    chunk_store_path: str = ".index/chunks.sqlite"  # texto de los chunks; vacío = en la metadata
+    profile_index_path: str = ".index/profiles.json"  # perfiles extraídos; vacío = sin fast-path
+    chunk_max_tokens: int = 256  # límite de secuencia del encoder
+    chunk_overlap_tokens: int = 32
+    upsert_batch_size: int = 100
+    upsert_workers: int = 4
+    index_version_path: str = ".index/version"
+    context_max_tokens: int = 1500  # presupuesto del contexto del prompt; 0 = sin límite
+    context_dedupe_threshold: float = 0.8
+    context_score_gap: float = 0.15  # 0 = no se corta por score
+    answer_cache_enabled: bool = True
+    answer_cache_threshold: float = 0.95
+    answer_cache_ttl_s: float = 3600.0
+    answer_cache_max_entries: int = 1000
+    tracing_enabled: bool = False
+    trace_log_path: str = ""  # "" = stderr
+    metrics_path: str = ""  # archivo con formato de texto de Prometheus; "" = no se escribe
+    metrics_port: int = 0  # >0 expone GET /metrics en ese puerto
+    embedding_backend: str = "torch"  # "torch" | "tuned" | "int8"
+    embedding_threads: int = 0  # 0 = lo que decida torch
+    embedding_offline: bool = False  # sólo modelos ya descargados (sin red)
+    embedding_model_cache_dir: str = ""  # "" = cache por defecto de Hugging Face
+    embedding_cache_dir: str = ".cache/embeddings"  # "" = sólo memoria
+    embedding_cache_memory_entries: int = 4096
+    embedding_cache_disk_entries: int = 200_000
+    embedding_server_socket: str = ""  # "" = el modelo corre en el proceso
+    embedding_server_max_wait_ms: float = 2.0
+    embedding_server_max_batch: int = 256
+    chat_history_visible: int = 20  # mensajes que se dibujan en cada rerun; el resto se pagina
+    chat_history_max_messages: int = 200  # tope por sesión; se descartan los más viejos
+    chat_history_excerpt_chars: int = 600  # texto guardado si el chunk no está en el store
 
 
 @lru_cache
 def get_settings() -> Settings:
     load_dotenv()
 
-    pinecone_api_key = os.getenv("PINECONE_API_KEY")
+    pinecone_api_key = os.getenv("PINECONE_API_KEY", "")
     groq_api_key = os.getenv("GROQ_API_KEY")
+    vector_backend = os.getenv("VECTOR_BACKEND", "pinecone").lower()
 
-    if not pinecone_api_key:
+    if vector_backend not in ("pinecone", "local"):
+        raise RuntimeError(f"VECTOR_BACKEND inválido: {vector_backend}")
+    vector_namespaces = os.getenv("VECTOR_NAMESPACES", "person").lower()
+    if vector_namespaces not in ("person", "none"):
+        raise RuntimeError(f"VECTOR_NAMESPACES inválido: {vector_namespaces}")
+    if vector_backend == "pinecone" and not pinecone_api_key:
         raise RuntimeError("PINECONE_API_KEY no está definido en .env")
     if not groq_api_key:
         raise RuntimeError("GROQ_API_KEY no está definido en .env")
@@ -80,5 +131,50 @@ def get_settings() -> Settings:
             "sentence-transformers/all-MiniLM-L6-v2",
         ),
         top_k=int(os.getenv("TOP_K", "4")),
-        persons=persons
+        retrieval_oversample=int(os.getenv("RETRIEVAL_OVERSAMPLE", "2")),
+        router_workers=int(os.getenv("ROUTER_WORKERS", "8")),
+        embed_concurrency=int(os.getenv("EMBED_CONCURRENCY", "2")),
+        store_concurrency=int(os.getenv("STORE_CONCURRENCY", "8")),
+        llm_concurrency=int(os.getenv("LLM_CONCURRENCY", "4")),
+        llm_model_name=os.getenv("LLM_MODEL_NAME", "llama-3.1-8b-instant"),
+        groq_base_url=os.getenv("GROQ_BASE_URL", ""),
+        llm_timeout_s=float(os.getenv("LLM_TIMEOUT_S", "30")),
+        llm_max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "20")),
+        llm_max_retries=int(os.getenv("LLM_MAX_RETRIES", "3")),
+        persons=persons,
+        vector_backend=vector_backend,
+        local_index_dir=os.getenv("LOCAL_INDEX_DIR", ".index/vectors"),
+        vector_namespaces=vector_namespaces,
+        ingest_manifest_path=os.getenv("INGEST_MANIFEST_PATH", ".index/manifest.json"),
+        chunk_store_path=os.getenv("CHUNK_STORE_PATH", ".index/chunks.sqlite"),
+        profile_index_path=os.getenv("PROFILE_INDEX_PATH", ".index/profiles.json"),
+        chunk_max_tokens=int(os.getenv("CHUNK_MAX_TOKENS", "256")),
+        chunk_overlap_tokens=int(os.getenv("CHUNK_OVERLAP_TOKENS", "32")),
+        upsert_batch_size=int(os.getenv("UPSERT_BATCH_SIZE", "100")),
+        upsert_workers=int(os.getenv("UPSERT_WORKERS", "4")),
+        index_version_path=os.getenv("INDEX_VERSION_PATH", ".index/version"),
+        context_max_tokens=int(os.getenv("CONTEXT_MAX_TOKENS", "1500")),
+        context_dedupe_threshold=float(os.getenv("CONTEXT_DEDUPE_THRESHOLD", "0.8")),
+        context_score_gap=float(os.getenv("CONTEXT_SCORE_GAP", "0.15")),
+        answer_cache_enabled=os.getenv("ANSWER_CACHE_ENABLED", "true").lower() in ("1", "true", "yes"),
+        answer_cache_threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95")),
+        answer_cache_ttl_s=float(os.getenv("ANSWER_CACHE_TTL_S", "3600")),
+        answer_cache_max_entries=int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000")),
+        tracing_enabled=os.getenv("TRACING_ENABLED", "false").lower() in ("1", "true", "yes"),
+        trace_log_path=os.getenv("TRACE_LOG_PATH", ""),
+        metrics_path=os.getenv("METRICS_PATH", ""),
+        metrics_port=int(os.getenv("METRICS_PORT", "0")),
+        embedding_backend=os.getenv("EMBEDDING_BACKEND", "torch").lower(),
+        embedding_threads=int(os.getenv("EMBEDDING_THREADS", "0")),
+        embedding_offline=os.getenv("EMBEDDING_OFFLINE", "false").lower() in ("1", "true", "yes"),
+        embedding_model_cache_dir=os.getenv("EMBEDDING_MODEL_CACHE_DIR", ""),
+        embedding_cache_dir=os.getenv("EMBEDDING_CACHE_DIR", ".cache/embeddings"),
+        embedding_cache_memory_entries=int(os.getenv("EMBEDDING_CACHE_MEMORY_ENTRIES", "4096")),
+        embedding_cache_disk_entries=int(os.getenv("EMBEDDING_CACHE_DISK_ENTRIES", "200000")),
+        embedding_server_socket=os.getenv("EMBEDDING_SERVER_SOCKET", ""),
+        embedding_server_max_wait_ms=float(os.getenv("EMBEDDING_SERVER_MAX_WAIT_MS", "2")),
+        embedding_server_max_batch=int(os.getenv("EMBEDDING_SERVER_MAX_BATCH", "256")),
+        chat_history_visible=int(os.getenv("CHAT_HISTORY_VISIBLE", "20")),
+        chat_history_max_messages=int(os.getenv("CHAT_HISTORY_MAX_MESSAGES", "200")),
+        chat_history_excerpt_chars=int(os.getenv("CHAT_HISTORY_EXCERPT_CHARS", "600")),
     )
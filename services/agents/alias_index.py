@@ -0,0 +1,68 @@
+# services/agents/alias_index.py
+from __future__ import annotations
+
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Set
+
+from config import PersonConfig
+
+
+def fold(text: str) -> str:
+    """Minúsculas, sin tildes/diéresis (José → jose, Muñoz → munoz) y espacios colapsados."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(stripped.split())
+
+
+def _trie_pattern(node: Dict[str, dict]) -> str:
+    """Convierte un trie de caracteres en una regex equivalente sin alternativas redundantes."""
+    terminal = "" in node
+    branches = [re.escape(ch) + _trie_pattern(child) for ch, child in sorted(node.items()) if ch]
+    if not branches:
+        return ""
+    if len(branches) == 1 and not terminal:
+        return branches[0]
+    pattern = "(?:" + "|".join(branches) + ")"
+    return pattern + "?" if terminal else pattern
+
+
+class AliasIndex:
+    """
+    Índice compilado de alias y nombres completos → person_id.
+
+    Se construye una sola vez: todos los alias (normalizados con `fold`) se insertan
+    en un trie que se compila a una única regex con límites de palabra. Así "ana" no
+    matchea dentro de "mañana" y "luis" no matchea "luisa", y el costo por pregunta
+    depende del largo de la pregunta, no de cuántas personas haya registradas.
+    """
+
+    def __init__(self, persons: Iterable[PersonConfig]) -> None:
+        self._order: Dict[str, int] = {}
+        self._owners: Dict[str, Set[str]] = {}
+        trie: Dict[str, dict] = {}
+
+        for position, person in enumerate(persons):
+            self._order[person.id] = position
+            for phrase in [person.name, *person.aliases]:
+                key = fold(phrase)
+                if not key:
+                    continue
+                self._owners.setdefault(key, set()).add(person.id)
+                node = trie
+                for ch in key:
+                    node = node.setdefault(ch, {})
+                node[""] = {}
+
+        self._pattern = (
+            re.compile(r"(?<!\w)" + _trie_pattern(trie) + r"(?!\w)") if trie else None
+        )
+
+    def match(self, text: str) -> List[str]:
+        """person_ids mencionados en `text`, en el orden de la configuración."""
+        if self._pattern is None:
+            return []
+        found: Set[str] = set()
+        for m in self._pattern.finditer(fold(text)):
+            found.update(self._owners.get(m.group(0), ()))
+        return sorted(found, key=self._order.__getitem__)
@@ -0,0 +1,159 @@
+# services/agents/answer_cache.py
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from services.rag.index_version import IndexVersionWatcher
+
+
+@dataclass
+class CachedAnswer:
+    question: str
+    answer: str
+    chunks: List[Any]
+    created_at: float
+    similarity: float = 1.0
+
+
+@dataclass
+class AnswerCacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+
+
+class _Scope:
+    """Entradas de un mismo conjunto de personas, con su matriz de vectores normalizados."""
+
+    def __init__(self) -> None:
+        self.keys: List[int] = []
+        self.vectors: List[np.ndarray] = []
+        self._matrix: Optional[np.ndarray] = None
+
+    def add(self, key: int, vec: np.ndarray) -> None:
+        self.keys.append(key)
+        self.vectors.append(vec)
+        self._matrix = None
+
+    def remove(self, key: int) -> None:
+        i = self.keys.index(key)
+        del self.keys[i]
+        del self.vectors[i]
+        self._matrix = None
+
+    def best(self, q: np.ndarray) -> Tuple[Optional[int], float]:
+        if not self.keys:
+            return None, -1.0
+        if self._matrix is None:
+            self._matrix = np.vstack(self.vectors)
+        scores = self._matrix @ q
+        i = int(np.argmax(scores))
+        return self.keys[i], float(scores[i])
+
+
+class SemanticAnswerCache:
+    """
+    Cache de respuestas por similitud de la pregunta.
+
+    - Las búsquedas se limitan al mismo conjunto exacto de `person_id`s.
+    - Hit si el coseno entre embeddings de preguntas es >= `threshold`.
+    - Cada entrada guarda la respuesta y los chunks usados; expira por TTL y se desaloja por LRU.
+    - Si cambia la versión del índice (ingest la incrementa), se vacía completo.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        ttl_s: float = 3600.0,
+        max_entries: int = 1000,
+        version_path: Optional[str] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.threshold = threshold
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self.stats = AnswerCacheStats()
+        self._clock = clock
+        self._watcher = IndexVersionWatcher(version_path) if version_path else None
+        self._version = self._watcher.current() if self._watcher else ""
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._entries: "OrderedDict[int, Tuple[FrozenSet[str], CachedAnswer]]" = OrderedDict()
+        self._scopes: Dict[FrozenSet[str], _Scope] = {}
+
+    @staticmethod
+    def _normalize(vec: Any) -> np.ndarray:
+        v = np.asarray(vec, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(v))
+        return v / norm if norm else v
+
+    def _check_version(self) -> None:
+        if self._watcher is None:
+            return
+        version = self._watcher.current()
+        if version != self._version:
+            self._version = version
+            if self._entries:
+                self.stats.invalidations += 1
+            self._entries.clear()
+            self._scopes.clear()
+
+    def _drop(self, key: int) -> None:
+        scope_key, _ = self._entries.pop(key)
+        scope = self._scopes[scope_key]
+        scope.remove(key)
+        if not scope.keys:
+            del self._scopes[scope_key]
+
+    def lookup(self, person_ids: Iterable[str], query_vec: Any) -> Optional[CachedAnswer]:
+        scope_key = frozenset(person_ids)
+        q = self._normalize(query_vec)
+        with self._lock:
+            self._check_version()
+            scope = self._scopes.get(scope_key)
+            if scope is not None:
+                key, similarity = scope.best(q)
+                if key is not None and similarity >= self.threshold:
+                    _, entry = self._entries[key]
+                    if self._clock() - entry.created_at <= self.ttl_s:
+                        self._entries.move_to_end(key)
+                        self.stats.hits += 1
+                        return replace(entry, similarity=similarity)
+                    self._drop(key)
+            self.stats.misses += 1
+            return None
+
+    def store(
+        self,
+        person_ids: Iterable[str],
+        question: str,
+        query_vec: Any,
+        answer: str,
+        chunks: List[Any],
+    ) -> None:
+        scope_key = frozenset(person_ids)
+        q = self._normalize(query_vec)
+        with self._lock:
+            self._check_version()
+            key = next(self._ids)
+            self._entries[key] = (
+                scope_key,
+                CachedAnswer(question=question, answer=answer, chunks=list(chunks), created_at=self._clock()),
+            )
+            self._scopes.setdefault(scope_key, _Scope()).add(key, q)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.stats.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._scopes.clear()
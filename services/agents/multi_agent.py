@@ -1,14 +1,38 @@
 # services/agents/multi_agent.py
 from __future__ import annotations
 
+import asyncio
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Dict, List, Tuple
-
-from groq import Groq
+from functools import partial
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Generator,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+import numpy as np
 
 from config import Settings, get_settings, PersonConfig
-from services.rag.embeddings import embed_text
-from services.rag.vector_store import VectorStore, VectorStoreConfig
+from services.agents.alias_index import AliasIndex
+from services.agents.answer_cache import CachedAnswer, SemanticAnswerCache
+from services.agents.profile_answers import ProfileAnswerer
+from services.rag.chunk_store import ChunkTextStore, chunk_texts, open_chunk_store
+from services.rag.context_packing import pack_context, packing_config_from_settings
+from services.rag.embeddings import embed_array
+from services.rag.llm_client import AsyncLLMClient, LLMClient, llm_config_from_settings
+from services.rag.profile_index import ProfileIndex
+from services.rag.vector_store import VectorStore, VectorStoreConfig, person_namespace
+from services.telemetry.tracing import run_in_context, span, trace
 
 
 @dataclass
@@ -28,34 +52,130 @@ class RAGAgent:
     embedding_model_name: str
     top_k: int
     llm_model_name: str
+    # namespace propio en el índice; sin namespace se filtra el índice compartido por metadata
+    namespace: Optional[str] = None
+    # texto de los chunks fuera del índice (la metadata sólo lleva person_id)
+    chunk_store: Optional[ChunkTextStore] = None
 
     def retrieve(self, question: str) -> List[RetrievedChunk]:
-        query_vec = embed_text(question, model_name=self.embedding_model_name)
-        matches = self.vector_store.query(
-            query_vec,
-            top_k=self.top_k,
-            metadata_filter={"person_id": self.person.id},
-        )
+        query_vec = embed_array(question, model_name=self.embedding_model_name)
+        return self.retrieve_by_vector(query_vec)
+
+    def retrieve_by_vector(self, query_vec: np.ndarray) -> List[RetrievedChunk]:
+        if self.namespace:
+            # en su namespace no hace falta metadata: sólo ids y scores
+            matches = self.vector_store.query(
+                query_vec,
+                top_k=self.top_k,
+                namespace=self.namespace,
+                include_metadata=self.chunk_store is None,
+            )
+        else:
+            matches = self.vector_store.query(
+                query_vec,
+                top_k=self.top_k,
+                metadata_filter={"person_id": self.person.id},
+            )
+        return self.to_chunks(matches)
+
+    def to_chunks(
+        self,
+        matches: List[Tuple[str, float, Dict]],
+        texts: Optional[Dict[str, str]] = None,
+    ) -> List[RetrievedChunk]:
+        if texts is None:
+            texts = chunk_texts(self.chunk_store, matches)
         chunks: List[RetrievedChunk] = []
-        for _id, score, meta in matches:
+        for _id, score, _ in matches:
             chunks.append(
                 RetrievedChunk(
                     person_id=self.person.id,
                     person_name=self.person.name,
                     id=_id,
                     score=score,
-                    text=meta.get("text", ""),
+                    text=texts.get(_id, ""),
                 )
             )
         return chunks
 
 
+@dataclass
+class _Call:
+    """Llamada bloqueante que pide un flujo de respuesta, contra uno de los backends."""
+
+    backend: str  # "embed" | "store" | "llm"
+    fn: Callable[[], Any]
+    # variante nativa asíncrona (AsyncLLMClient): aanswer la espera sin ocupar un hilo
+    afn: Optional[Callable[[], Awaitable[Any]]] = None
+
+
+# Un flujo (answer, retrieve) es un generador que cede cada llamada bloqueante, o una
+# lista de llamadas independientes, y recibe su resultado: la lógica se escribe una vez
+# y `_run_flow` (síncrono) o `_arun_flow` (asyncio, con límites por backend) la ejecutan.
+_Step = Union[_Call, List[_Call]]
+_Flow = Generator[_Step, Any, Any]
+
+
+@dataclass
+class _Context:
+    """Resultado de `_context_flow`."""
+
+    agents: List[RAGAgent]
+    query_vec: Optional[np.ndarray]
+    chunks: List[RetrievedChunk]
+    # respuesta ya resuelta (perfil o cache): no hace falta el LLM
+    answer: Optional[str] = None
+
+
 class AgentRouter:
-    def __init__(self, settings: Settings, store: VectorStore) -> None:
+    def __init__(
+        self,
+        settings: Settings,
+        store: VectorStore,
+        llm_client: Optional[LLMClient] = None,
+        async_llm_client: Optional[AsyncLLMClient] = None,
+        chunk_store: Optional[ChunkTextStore] = None,
+    ) -> None:
         self.settings = settings
         self.store = store
+        self.chunk_store = chunk_store if chunk_store is not None else open_chunk_store(settings)
+        # un único cliente LLM (pool httpx con keep-alive) compartido por todas las respuestas
+        self.llm = llm_client or LLMClient(llm_config_from_settings(settings))
+        # opcional: si está, aanswer espera al LLM sin ocupar un hilo del pool
+        self.async_llm = async_llm_client
         self.agents: Dict[str, RAGAgent] = {}
 
+        # ejecución concurrente (aanswer): pool de hilos compartido + un semáforo por backend
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.router_workers,
+            thread_name_prefix="router",
+        )
+        self._semaphores: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+        # loop de fondo de answer_concurrent: uno solo, vivo mientras viva el router
+        self._loop_thread = _LoopThread("router-loop")
+
+        # cache semántico de respuestas (se invalida cuando ingest cambia la versión del índice)
+        self.answer_cache: Optional[SemanticAnswerCache] = None
+        if settings.answer_cache_enabled:
+            self.answer_cache = SemanticAnswerCache(
+                threshold=settings.answer_cache_threshold,
+                ttl_s=settings.answer_cache_ttl_s,
+                max_entries=settings.answer_cache_max_entries,
+                version_path=settings.index_version_path,
+            )
+
+        # presupuesto, dedupe y corte por score del contexto que va al prompt
+        self.packing = packing_config_from_settings(settings)
+
+        # matcher de alias/nombres compilado una sola vez
+        self.alias_index = AliasIndex(settings.persons)
+
+        # consultas puntuales (email, aptitudes, certificaciones...) desde los perfiles de la ingesta
+        self.profiles: Optional[ProfileIndex] = (
+            ProfileIndex(settings.profile_index_path) if settings.profile_index_path else None
+        )
+        self.profile_answerer = ProfileAnswerer(settings.persons)
+
         for person in settings.persons:
             self.agents[person.id] = RAGAgent(
                 person=person,
@@ -63,7 +183,9 @@ class AgentRouter:
                 groq_api_key=settings.groq_api_key,
                 embedding_model_name=settings.embedding_model_name,
                 top_k=settings.top_k,
-                llm_model_name="llama-3.1-8b-instant",
+                llm_model_name=settings.llm_model_name,
+                namespace=person_namespace(settings, person.id),
+                chunk_store=self.chunk_store,
             )
 
     @property
@@ -75,44 +197,341 @@ class AgentRouter:
         return list(self.agents.values())[0]
 
     def detect_agents(self, question: str) -> List[RAGAgent]:
-        q = question.lower()
-        selected: List[RAGAgent] = []
+        with span("detect") as s:
+            selected = [self.agents[pid] for pid in self.alias_index.match(question)]
+
+            if not selected:
+                selected = [self.default_agent]
 
-        for person in self.settings.persons:
-            for alias in person.aliases:
-                if alias.lower() in q:
-                    selected.append(self.agents[person.id])
-                    break  # no repetir por alias
+            s.set(persons=len(selected))
+            return selected
 
-        if not selected:
-            selected = [self.default_agent]
+    def retrieve_many(
+        self,
+        question: str,
+        agents: List[RAGAgent],
+    ) -> List[RetrievedChunk]:
+        """
+        Embebe la pregunta una sola vez y recupera el contexto de todos los agentes.
+        Con namespaces, una consulta por persona (en paralelo), cada una sobre sus propios
+        vectores. Sin namespaces, una única consulta filtrada por `$in`, sobre-muestreada para
+        que cada persona reciba su cuota de `top_k`; si alguna queda corta, se completa con
+        una consulta dirigida.
+        """
+        query_vec = embed_array(question, model_name=self.settings.embedding_model_name)
+        return self.retrieve_many_by_vector(query_vec, agents)
+
+    def retrieve_many_by_vector(
+        self,
+        query_vec: np.ndarray,
+        agents: List[RAGAgent],
+    ) -> List[RetrievedChunk]:
+        return self._run_flow(self._retrieve_flow(query_vec, agents))
+
+    def _retrieve_flow(self, query_vec: np.ndarray, agents: List[RAGAgent]) -> _Flow:
+        with span("retrieve", persons=len(agents), top_k=self.settings.top_k) as s:
+            chunks = yield from self._retrieve_many_flow(query_vec, agents)
+            s.set(chunks=len(chunks))
+            return chunks
+
+    def _retrieve_many_flow(self, query_vec: np.ndarray, agents: List[RAGAgent]) -> _Flow:
+        if len(agents) == 1:
+            return (yield _Call("store", partial(agents[0].retrieve_by_vector, query_vec)))
+        if all(agent.namespace for agent in agents):
+            # una consulta por namespace, en paralelo
+            per_agent = yield [
+                _Call("store", partial(agent.retrieve_by_vector, query_vec)) for agent in agents
+            ]
+            return [c for chunks in per_agent for c in chunks]
+
+        by_id = {agent.person.id: agent for agent in agents}
+        quota = max(agent.top_k for agent in agents)
+        limit = quota * len(agents) * max(self.settings.retrieval_oversample, 1)
+
+        matches = yield _Call(
+            "store",
+            partial(
+                self.store.query,
+                query_vec,
+                top_k=limit,
+                metadata_filter={"person_id": {"$in": list(by_id)}},
+            ),
+        )
 
-        return selected
+        grouped: Dict[str, List[Tuple[str, float, Dict]]] = {pid: [] for pid in by_id}
+        for match in matches:
+            pid = match[2].get("person_id")
+            if pid in grouped and len(grouped[pid]) < by_id[pid].top_k:
+                grouped[pid].append(match)
+
+        # si la consulta vino completa, puede haber más fragmentos de las personas que
+        # quedaron cortas: se completan con consultas dirigidas, en paralelo
+        short = [
+            agent
+            for pid, agent in by_id.items()
+            if len(grouped[pid]) < agent.top_k and len(matches) >= limit
+        ]
+        refills = (
+            (yield [_Call("store", partial(a.retrieve_by_vector, query_vec)) for a in short])
+            if short
+            else []
+        )
+        refilled = {a.person.id: chunks for a, chunks in zip(short, refills)}
+
+        texts = chunk_texts(self.chunk_store, [m for group in grouped.values() for m in group])
+        all_chunks: List[RetrievedChunk] = []
+        for pid, agent in by_id.items():
+            if pid in refilled:
+                all_chunks.extend(refilled[pid])
+            else:
+                all_chunks.extend(agent.to_chunks(grouped[pid], texts))
+        return all_chunks
+
+    def pack_context(self, chunks: List[RetrievedChunk]) -> List[RetrievedChunk]:
+        """Contexto que efectivamente va al prompt (ver context_packing.pack_context)."""
+        with span("context.pack") as s:
+            packed, report = pack_context(chunks, self.packing)
+            s.set(**report.to_attributes())
+            return packed
+
+    def profile_answer(
+        self,
+        question: str,
+        agents: List[RAGAgent],
+    ) -> Optional[Tuple[str, List[RetrievedChunk]]]:
+        """Respuesta directa desde los perfiles, o None si hay que ir por el RAG."""
+        if self.profiles is None:
+            return None
+        with span("profile.lookup") as s:
+            result = self.profile_answerer.answer(
+                question, [a.person for a in agents], self.profiles.profiles()
+            )
+            s.set(hit=result is not None)
+            if result is None:
+                return None
+            chunks = [
+                RetrievedChunk(
+                    person_id=a.person.id,
+                    person_name=a.person.name,
+                    id=f"{a.person.id}-profile",
+                    score=1.0,
+                    text=result.sources[a.person.id],
+                )
+                for a in agents
+            ]
+            return result.answer, chunks
+
+    def _cache_lookup(self, agents: List[RAGAgent], query_vec: np.ndarray) -> Optional[CachedAnswer]:
+        if self.answer_cache is None:
+            return None
+        with span("cache.lookup") as s:
+            cached = self.answer_cache.lookup([a.person.id for a in agents], query_vec)
+            s.set(hit=cached is not None)
+            return cached
+
+    def _cache_store(
+        self,
+        agents: List[RAGAgent],
+        question: str,
+        query_vec: np.ndarray,
+        answer: str,
+        chunks: List[RetrievedChunk],
+    ) -> None:
+        if self.answer_cache is not None:
+            self.answer_cache.store([a.person.id for a in agents], question, query_vec, answer, chunks)
 
     def answer(self, question: str) -> Tuple[str, List[RetrievedChunk]]:
+        with trace("answer", question_chars=len(question)):
+            return self._run_flow(self._answer_flow(question))
+
+    def _context_flow(self, question: str) -> _Flow:
+        """
+        Personas, embedding y fragmentos de una pregunta: la parte común de answer y
+        stream_answer. Si la respuesta sale del perfil o del cache, viene en `answer`.
+        """
         selected_agents = self.detect_agents(question)
 
-        # single persona → respondemos como antes
-        if len(selected_agents) == 1:
-            agent = selected_agents[0]
-            chunks = agent.retrieve(question)
-            answer = self._generate_single_answer(question, agent, chunks)
-            return answer, chunks
+        # consulta puntual (email, aptitudes...) → sin embedding, índice ni LLM
+        direct = self.profile_answer(question, selected_agents)
+        if direct is not None:
+            return _Context(selected_agents, None, direct[1], direct[0])
 
-        # multi-persona → juntamos contexto de todos
-        all_chunks: List[RetrievedChunk] = []
-        for agent in selected_agents:
-            all_chunks.extend(agent.retrieve(question))
+        # un solo embedding y una sola consulta para todas las personas
+        query_vec = yield _Call(
+            "embed",
+            partial(embed_array, question, model_name=self.settings.embedding_model_name),
+        )
+
+        # pregunta casi idéntica ya respondida para las mismas personas → sin retrieval ni LLM
+        cached = self._cache_lookup(selected_agents, query_vec)
+        if cached is not None:
+            return _Context(selected_agents, query_vec, cached.chunks, cached.answer)
+
+        retrieved = yield from self._retrieve_flow(query_vec, selected_agents)
+        return _Context(selected_agents, query_vec, self.pack_context(retrieved))
+
+    def _answer_flow(self, question: str) -> _Flow:
+        ctx = yield from self._context_flow(question)
+        if ctx.answer is not None:
+            return ctx.answer, ctx.chunks
+        system_prompt, user_prompt, model = self._build_prompt(question, ctx.agents, ctx.chunks)
+        with span("generate", mode="single" if len(ctx.agents) == 1 else "multi"):
+            answer = yield self._llm_call(
+                [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt},
+                ],
+                model,
+            )
+        self._cache_store(ctx.agents, question, ctx.query_vec, answer, ctx.chunks)
+        return answer, ctx.chunks
+
+    def _llm_call(self, messages: List[Dict[str, str]], model: Optional[str]) -> _Call:
+        afn = None
+        if self.async_llm is not None:
+            afn = partial(self.async_llm.chat, messages, model=model)
+        return _Call("llm", partial(self.llm.chat, messages, model=model), afn)
+
+    # ------------------------------------------------------------------ #
+    # ejecución de flujos
+    # ------------------------------------------------------------------ #
+    def _run_flow(self, flow: _Flow) -> Any:
+        """Ejecuta un flujo en el hilo actual; las llamadas independientes van al pool."""
+        result: Any = None
+        error: Optional[BaseException] = None
+        while True:
+            try:
+                step = flow.send(result) if error is None else flow.throw(error)
+            except StopIteration as stop:
+                return stop.value
+            result, error = None, None
+            try:
+                if isinstance(step, list):
+                    # el hilo del pool hereda la traza/span activos
+                    futures = [self._executor.submit(run_in_context(call.fn)) for call in step]
+                    result = [future.result() for future in futures]
+                else:
+                    result = step.fn()
+            except Exception as exc:
+                error = exc
+
+    async def _arun_flow(self, flow: _Flow) -> Any:
+        """Como `_run_flow`, pero cada llamada espera su turno en el semáforo del backend."""
+        result: Any = None
+        error: Optional[BaseException] = None
+        while True:
+            try:
+                step = flow.send(result) if error is None else flow.throw(error)
+            except StopIteration as stop:
+                return stop.value
+            result, error = None, None
+            try:
+                if isinstance(step, list):
+                    result = list(await asyncio.gather(*(self._arun_call(c) for c in step)))
+                else:
+                    result = await self._arun_call(step)
+            except Exception as exc:
+                error = exc
+
+    def stream_answer(self, question: str) -> Tuple[Iterator[str], List[RetrievedChunk]]:
+        """
+        Igual que `answer`, pero devuelve los fragmentos recuperados de inmediato y la
+        respuesta como un iterador de texto que se consume a medida que llega del LLM.
+        """
+        with trace("answer", question_chars=len(question), stream=True):
+            ctx = self._run_flow(self._context_flow(question))
+            if ctx.answer is not None:
+                return iter([ctx.answer]), ctx.chunks
+            system_prompt, user_prompt, model = self._build_prompt(
+                question, ctx.agents, ctx.chunks
+            )
 
-        answer = self._generate_multi_answer(question, all_chunks)
-        return answer, all_chunks
+        stream = self.llm.stream_chat(
+            [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            model=model,
+        )
 
-    def _generate_single_answer(
+        def stream_and_cache() -> Iterator[str]:
+            parts: List[str] = []
+            # la generación ocurre al consumir el iterador: si quien lo consume abrió
+            # una traza (p. ej. Streamlit), el span del LLM queda dentro de ella
+            with trace("answer.stream"):
+                for part in stream:
+                    parts.append(part)
+                    yield part
+            # sólo se cachea si la respuesta llegó completa
+            self._cache_store(ctx.agents, question, ctx.query_vec, "".join(parts), ctx.chunks)
+
+        return stream_and_cache(), ctx.chunks
+
+    # ------------------------------------------------------------------ #
+    # ejecución concurrente
+    # ------------------------------------------------------------------ #
+    def _backend_semaphore(self, backend: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        sems = self._semaphores.get(loop)
+        if sems is None:
+            sems = {
+                "embed": asyncio.Semaphore(self.settings.embed_concurrency),
+                "store": asyncio.Semaphore(self.settings.store_concurrency),
+                "llm": asyncio.Semaphore(self.settings.llm_concurrency),
+            }
+            self._semaphores[loop] = sems
+        return sems[backend]
+
+    async def _arun_call(self, call: _Call) -> Any:
+        """Corre `call` (bloqueante) en el pool de hilos respetando el límite del backend."""
+        async with self._backend_semaphore(call.backend):
+            if call.afn is not None:
+                return await call.afn()
+            loop = asyncio.get_running_loop()
+            # el hilo del pool hereda la traza/span activos
+            return await loop.run_in_executor(self._executor, run_in_context(call.fn))
+
+    async def aanswer(self, question: str) -> Tuple[str, List[RetrievedChunk]]:
+        """
+        Versión asíncrona de `answer` (mismo flujo): el embedding corre en el pool de hilos
+        y las consultas de varias personas en paralelo, así la latencia multi-persona
+        queda cerca de la dependencia más lenta y no de la suma. Cada backend tiene su
+        límite de llamadas simultáneas (EMBED_/STORE_/LLM_CONCURRENCY) por event loop.
+        """
+        with trace("answer", question_chars=len(question), concurrent=True):
+            return await self._arun_flow(self._answer_flow(question))
+
+    def answer_concurrent(self, question: str) -> Tuple[str, List[RetrievedChunk]]:
+        """
+        Envoltorio síncrono de `aanswer` (p. ej. para Streamlit). Todas las llamadas usan
+        el mismo event loop de fondo, así los límites por backend valen entre preguntas
+        simultáneas de distintos hilos.
+        """
+        return self._loop_thread.run(self.aanswer(question))
+
+    def _build_prompt(
+        self,
+        question: str,
+        agents: List[RAGAgent],
+        chunks: List[RetrievedChunk],
+    ) -> Tuple[str, str, Optional[str]]:
+        """(system, user, modelo): prompt de una persona o el combinado de varias."""
+        with span("prompt.build", persons=len(agents), chunks=len(chunks)) as s:
+            if len(agents) == 1:
+                system_prompt, user_prompt = self._build_single_prompt(question, agents[0], chunks)
+                model: Optional[str] = agents[0].llm_model_name
+            else:
+                system_prompt, user_prompt = self._build_multi_prompt(question, chunks)
+                model = None
+            s.set(prompt_chars=len(system_prompt) + len(user_prompt))
+            return system_prompt, user_prompt, model
+
+    def _build_single_prompt(
         self,
         question: str,
         agent: RAGAgent,
         chunks: List[RetrievedChunk],
-    ) -> str:
+    ) -> Tuple[str, str]:
         context_lines = [f"- {c.text}" for c in chunks if c.text]
         context_block = "\n".join(context_lines) or "(sin contexto recuperado)"
 
@@ -135,24 +554,13 @@ Instrucciones:
 - No inventes información fuera del contexto.
 - Sé claro y conciso.
 """
+        return system_prompt, user_prompt
 
-        client = Groq(api_key=agent.groq_api_key)
-
-        completion = client.chat.completions.create(
-            model=agent.llm_model_name,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            temperature=0.2,
-        )
-        return completion.choices[0].message.content
-
-    def _generate_multi_answer(
+    def _build_multi_prompt(
         self,
         question: str,
         chunks: List[RetrievedChunk],
-    ) -> str:
+    ) -> Tuple[str, str]:
         by_person: Dict[str, List[RetrievedChunk]] = {}
         for c in chunks:
             by_person.setdefault(c.person_name, []).append(c)
@@ -182,16 +590,32 @@ Instrucciones:
 - En cada sección, aclara el nombre de la persona.
 - No inventes datos que no aparezcan en el contexto.
 """
+        return system_prompt, user_prompt
 
-        settings = self.settings
-        client = Groq(api_key=settings.groq_api_key)
 
-        completion = client.chat.completions.create(
-            model="llama-3.1-8b-instant",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            temperature=0.2,
-        )
-        return completion.choices[0].message.content
+class _LoopThread:
+    """Event loop en un hilo daemon, creado al primer uso y reutilizado por cada llamada."""
+
+    def __init__(self, name: str) -> None:
+        self._name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name=self._name, daemon=True
+                )
+                self._thread.start()
+            return self._loop
+
+    def run(self, coro: Any) -> Any:
+        """Ejecuta `coro` en el loop de fondo y espera el resultado."""
+        loop = self._ensure_loop()
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("No se puede esperar al loop de fondo desde su propio hilo")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
@@ -0,0 +1,153 @@
+# services/agents/profile_answers.py
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Union
+
+from config import PersonConfig
+from services.agents.alias_index import fold
+from services.rag.profile_index import Profile
+
+
+# campo del perfil → cómo se nombra en la respuesta
+FIELD_LABELS = {
+    "email": "Email",
+    "phone": "Teléfono",
+    "linkedin": "LinkedIn",
+    "location": "Ubicación",
+    "skills": "Aptitudes principales",
+    "certifications": "Certificaciones",
+    "publications": "Publicaciones",
+    "languages": "Idiomas",
+}
+
+# intención (sobre la pregunta plegada con `fold`) → campos que responde
+_INTENTS = [
+    (re.compile(r"\b(?:datos de )?contactos?\b|\bcontactar\w*"), ("email", "phone", "linkedin")),
+    (re.compile(r"\be-?mails?\b|\bcorreos?(?: electronicos?)?\b|\bmails?\b"), ("email",)),
+    (re.compile(r"\btelefonos?\b|\bcelular(?:es)?\b|\bphone\b|\bwhatsapp\b"), ("phone",)),
+    (re.compile(r"\blinkedin\b"), ("linkedin",)),
+    (
+        re.compile(r"\bubicacion\b|\bdonde vive\w*|\bde donde es\b|\bpais\b|\blocation\b"),
+        ("location",),
+    ),
+    (re.compile(r"\baptitudes\b|\bhabilidades\b|\bskills?\b"), ("skills",)),
+    (
+        re.compile(r"\bcertifica(?:ciones|cion|dos|das|do|da|tes|te|tions|tion)s?\b"),
+        ("certifications",),
+    ),
+    (re.compile(r"\bpublicacion(?:es)?\b|\bpapers?\b|\bpublications?\b"), ("publications",)),
+    (re.compile(r"\bidiomas?\b|\blanguages?\b"), ("languages",)),
+]
+
+# palabras que no cambian el pedido; cualquier otra ("aws", "cuantas", "mejor"...) indica
+# una pregunta que el perfil no contesta tal cual y se deriva al RAG
+_FILLER = set(
+    """
+    a al ambos ambas cada cual cuales cuenta con compara comparame comparar comparacion da dame
+    datos de del decime di dime e el ella ellos en entre es esta estan favor hola indica indicame
+    informacion la las lista listame los me mostrame muestra muestrame numero o pasame podes
+    podrias por principales puedes que quiero saber ser sobre son su sus tabla te tiene tienen
+    todas todos tu tus un una uno vive viven reside habla hablan y ya vs versus
+    about and are compare give has have her his is list me of please show tell the their what
+    which
+    """.split()
+)
+_WORD = re.compile(r"\w+")
+
+
+@dataclass
+class ProfileAnswer:
+    answer: str
+    # texto del perfil por persona, para mostrarlo como fuente
+    sources: Dict[str, str]
+    fields: List[str]
+
+
+def _value(profile: Profile, name: str) -> Union[str, List[str]]:
+    return getattr(profile, name)
+
+
+def _render_value(value: Union[str, List[str]], sep: str) -> str:
+    return sep.join(value) if isinstance(value, list) else str(value)
+
+
+class ProfileAnswerer:
+    """
+    Responde las preguntas de consulta (email, teléfono, aptitudes, certificaciones...)
+    directo desde los perfiles extraídos en la ingesta: sin embedding, índice ni LLM.
+
+    Sólo responde si está seguro: la pregunta tiene que ser una consulta pura (intención
+    + nombres + palabras de relleno) y todas las personas tienen los campos pedidos.
+    En cualquier otro caso devuelve None y el router sigue por el RAG completo.
+    """
+
+    def __init__(self, persons: Iterable[PersonConfig]) -> None:
+        self._names = set()
+        for person in persons:
+            for phrase in [person.name, *person.aliases]:
+                self._names.update(_WORD.findall(fold(phrase)))
+
+    def fields_for(self, question: str) -> List[str]:
+        """Campos pedidos, o [] si la pregunta no es una consulta pura."""
+        text = fold(question)
+        fields: List[str] = []
+        for pattern, names in _INTENTS:
+            if pattern.search(text):
+                fields.extend(n for n in names if n not in fields)
+                text = pattern.sub(" ", text)
+        if not fields:
+            return []
+        leftover = [w for w in _WORD.findall(text) if w not in _FILLER and w not in self._names]
+        return [] if leftover else fields
+
+    def answer(
+        self,
+        question: str,
+        persons: Sequence[PersonConfig],
+        profiles: Dict[str, Profile],
+    ) -> Optional[ProfileAnswer]:
+        if not persons or not profiles:
+            return None
+        fields = self.fields_for(question)
+        if not fields:
+            return None
+        selected = [profiles.get(p.id) for p in persons]
+        if any(p is None or not all(_value(p, f) for f in fields) for p in selected):
+            return None
+
+        sources = {
+            p.person_id: "\n".join(
+                f"{FIELD_LABELS[f]}: {_render_value(_value(p, f), '; ')}" for f in fields
+            )
+            for p in selected
+        }
+        if len(selected) == 1:
+            text = _render_single(selected[0], fields)
+        else:
+            text = _render_table(selected, fields)
+        return ProfileAnswer(answer=text, sources=sources, fields=fields)
+
+
+def _render_single(profile: Profile, fields: List[str]) -> str:
+    lines: List[str] = []
+    for f in fields:
+        value = _value(profile, f)
+        if isinstance(value, list):
+            lines.append(f"**{FIELD_LABELS[f]}** de {profile.name}:")
+            lines.extend(f"- {item}" for item in value)
+        else:
+            lines.append(f"**{FIELD_LABELS[f]}** de {profile.name}: {value}")
+    return "\n".join(lines)
+
+
+def _render_table(profiles: List[Profile], fields: List[str]) -> str:
+    header = ["Persona", *(FIELD_LABELS[f] for f in fields)]
+    rows = [
+        [p.name, *(_render_value(_value(p, f), ", ").replace("|", "/") for f in fields)]
+        for p in profiles
+    ]
+    lines = ["| " + " | ".join(header) + " |", "|" + "---|" * len(header)]
+    lines.extend("| " + " | ".join(row) + " |" for row in rows)
+    return "\n".join(lines)
@@ -0,0 +1,140 @@
+# services/bench/corpus.py
+from __future__ import annotations
+
+import glob
+import random
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from config import PersonConfig
+from services.ingest.manifest import chunk_id
+
+
+_FIRST_NAMES = [
+    "Ana", "Bruno", "Carla", "Diego", "Elena", "Facundo", "Gabriela", "Hernán",
+    "Inés", "Joaquín", "Lucía", "Martín", "Nadia", "Óscar", "Paula", "Ramiro",
+    "Sofía", "Tomás", "Valeria", "Ximena",
+]
+_LAST_NAMES = [
+    "Álvarez", "Benítez", "Castro", "Domínguez", "Espinoza", "Fernández", "Gómez",
+    "Herrera", "Ibáñez", "Juárez", "López", "Muñoz", "Navarro", "Ortiz", "Peña",
+    "Quiroga", "Ríos", "Suárez", "Torres", "Vega",
+]
+_SYLLABLES = [
+    "ka", "ro", "mi", "tu", "le", "sa", "no", "vi", "da", "pe",
+    "lu", "ze", "bo", "ni", "ga", "fe", "chi", "ra", "mo", "ti",
+]
+_QUESTIONS = [
+    "¿Qué experiencia tiene {0} con Python?",
+    "¿Dónde estudió {0}?",
+    "Resumí el perfil profesional de {0}",
+    "¿Qué certificaciones tiene {0}?",
+    "Compará la experiencia de {0} y {1} en bases de datos",
+    "¿Quién tiene más experiencia en IoT, {0} o {1}?",
+    "¿Qué lenguajes de programación domina?",
+]
+
+
+def _codename(i: int) -> str:
+    """Palabra única y pronunciable para el índice `i` (sirve de alias sin colisiones)."""
+    parts = [_SYLLABLES[i % len(_SYLLABLES)]]
+    i //= len(_SYLLABLES)
+    while True:
+        parts.append(_SYLLABLES[i % len(_SYLLABLES)])
+        i //= len(_SYLLABLES)
+        if i == 0:
+            break
+    return "".join(parts).capitalize()
+
+
+@dataclass
+class SyntheticCorpus:
+    persons: List[PersonConfig]
+    # person_id -> texto del CV (en memoria: no se escribe un archivo por persona)
+    texts: Dict[str, str] = field(default_factory=dict)
+
+    def questions(self, count: int, seed: int = 0) -> List[str]:
+        """Preguntas que nombran 0, 1 o 2 personas del corpus (por alias)."""
+        rng = random.Random(seed)
+        out: List[str] = []
+        for _ in range(count):
+            template = rng.choice(_QUESTIONS)
+            a, b = rng.choice(self.persons), rng.choice(self.persons)
+            out.append(template.format(a.aliases[0], b.aliases[0]))
+        return out
+
+
+def load_templates(pattern: str = "data/cv_*.txt") -> List[str]:
+    paths = sorted(glob.glob(pattern))
+    if not paths:
+        raise FileNotFoundError(f"No hay plantillas de CV que coincidan con {pattern}")
+    templates: List[str] = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            templates.append(f.read())
+    return templates
+
+
+def generate_corpus(
+    num_persons: int,
+    templates: Optional[List[str]] = None,
+    seed: int = 0,
+) -> SyntheticCorpus:
+    """
+    Genera `num_persons` CVs sintéticos a partir de las plantillas `data/cv_*.txt`:
+    cambia el nombre de la primera línea, mezcla los párrafos y agrega un código único,
+    de modo que cada CV tenga contenido (y hash) distinto.
+    """
+    templates = templates or load_templates()
+    rng = random.Random(seed)
+    persons: List[PersonConfig] = []
+    texts: Dict[str, str] = {}
+
+    for i in range(num_persons):
+        codename = _codename(i)
+        name = f"{rng.choice(_FIRST_NAMES)} {codename} {rng.choice(_LAST_NAMES)}"
+        person_id = f"p{i:06d}"
+        persons.append(
+            PersonConfig(
+                id=person_id,
+                name=name,
+                cv_path=f"synthetic/{person_id}.txt",
+                aliases=[codename.lower()],
+                is_default=(i == 0),
+            )
+        )
+
+        header, _, body = rng.choice(templates).partition("\n")
+        paragraphs = body.split("\n\n")
+        rng.shuffle(paragraphs)
+        texts[person_id] = "\n\n".join([name, *paragraphs, f"Código de perfil: {person_id}"])
+
+    return SyntheticCorpus(persons=persons, texts=texts)
+
+
+def iter_corpus_records(
+    corpus: SyntheticCorpus,
+    chunker: Callable[[str], List[str]],
+) -> Iterator[Tuple[str, str, Dict]]:
+    """(id, texto, metadata) de cada chunk, con los mismos ids y metadata que el ingest."""
+    for person in corpus.persons:
+        seen = set()
+        for chunk in chunker(corpus.texts[person.id]):
+            cid = chunk_id(person.id, chunk)
+            if cid in seen:
+                continue
+            seen.add(cid)
+            yield (
+                cid,
+                chunk,
+                {"person_id": person.id, "person_name": person.name, "text": chunk},
+            )
+
+
+def random_unit_vectors(count: int, dimension: int, rng: np.random.Generator) -> np.ndarray:
+    """Vectores aleatorios normalizados: alcanzan para medir tiempos de búsqueda."""
+    vectors = rng.standard_normal((count, dimension), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
@@ -0,0 +1,193 @@
+# services/bench/embedding_check.py
+from __future__ import annotations
+
+import argparse
+import datetime
+import json
+import pathlib
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from services.bench.corpus import generate_corpus, iter_corpus_records, load_templates
+from services.bench.timing import run_bench
+from services.ingest.chunking import CHUNK_MAX_CHARS, chunk_text
+from services.rag.embedding_backends import EMBEDDING_BACKENDS
+from services.rag.embeddings import (
+    DEFAULT_EMBEDDING_MODEL,
+    _get_model,
+    configure_embedding_backend,
+)
+
+
+REFERENCE_BACKEND = "torch"
+
+
+@dataclass
+class ConsistencyReport:
+    backend: str
+    texts: int
+    queries: int
+    top_k: int
+    # 1 - coseno entre el vector del backend y el fp32 de referencia, por texto
+    cosine_delta_mean: float
+    cosine_delta_p99: float
+    cosine_delta_max: float
+    # |top-k backend ∩ top-k referencia| / k, promedio sobre las consultas
+    topk_overlap: float
+    query_p50_ms: float
+    query_p95_ms: float
+    speedup_p50: float
+
+    def summary(self) -> str:
+        return (
+            f"{self.backend:<8} Δcos media={self.cosine_delta_mean:.2e} "
+            f"p99={self.cosine_delta_p99:.2e} máx={self.cosine_delta_max:.2e}  "
+            f"top-{self.top_k} overlap={self.topk_overlap:.3f}  "
+            f"consulta p50={self.query_p50_ms:.2f}ms p95={self.query_p95_ms:.2f}ms "
+            f"({self.speedup_p50:.2f}x)"
+        )
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return x / norms
+
+
+def _top_k(queries: np.ndarray, docs: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ docs.T
+    k = min(k, docs.shape[0])
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return top
+
+
+def check_backend(
+    backend: str,
+    model_name: str,
+    texts: List[str],
+    questions: List[str],
+    reference_docs: np.ndarray,
+    reference_queries: np.ndarray,
+    top_k: int,
+    iterations: int,
+    reference_p50_ms: Optional[float] = None,
+) -> ConsistencyReport:
+    encoder = _get_model(model_name, backend)
+    docs = _normalize(encoder.encode(texts, batch_size=32))
+    queries = _normalize(encoder.encode(questions, batch_size=32))
+
+    delta = 1.0 - np.sum(docs * reference_docs, axis=1)
+    ref_top = _top_k(reference_queries, reference_docs, top_k)
+    cand_top = _top_k(queries, docs, top_k)
+    overlap = np.mean(
+        [len(set(a) & set(b)) / ref_top.shape[1] for a, b in zip(ref_top.tolist(), cand_top.tolist())]
+    )
+
+    timing = run_bench(
+        "encode_query",
+        lambda i: encoder.encode([questions[i % len(questions)]], batch_size=1),
+        iterations=iterations,
+        warmup=min(iterations, 10),
+        params={"backend": backend},
+    )
+    speedup = (reference_p50_ms / timing.p50_ms) if reference_p50_ms and timing.p50_ms else 1.0
+    return ConsistencyReport(
+        backend=backend,
+        texts=len(texts),
+        queries=len(questions),
+        top_k=top_k,
+        cosine_delta_mean=float(delta.mean()),
+        cosine_delta_p99=float(np.percentile(delta, 99)),
+        cosine_delta_max=float(delta.max()),
+        topk_overlap=float(overlap),
+        query_p50_ms=timing.p50_ms,
+        query_p95_ms=timing.p95_ms,
+        speedup_p50=speedup,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Compara backends de embeddings contra la referencia fp32: Δcoseno, overlap top-k y velocidad."
+    )
+    parser.add_argument(
+        "--backends",
+        default=",".join(b for b in EMBEDDING_BACKENDS if b != REFERENCE_BACKEND),
+        help="backends a comparar, separados por coma (default: todos menos torch)",
+    )
+    parser.add_argument("--model", default=DEFAULT_EMBEDDING_MODEL, help="modelo de embeddings")
+    parser.add_argument("--persons", type=int, default=50, help="CVs sintéticos para el corpus (default: 50)")
+    parser.add_argument("--queries", type=int, default=64, help="consultas sintéticas (default: 64)")
+    parser.add_argument("--top-k", type=int, default=4, help="k del overlap top-k (default: 4)")
+    parser.add_argument("--iterations", type=int, default=100, help="mediciones de encoding por backend")
+    parser.add_argument("--threads", type=int, default=0, help="hilos de torch (default: los de torch)")
+    parser.add_argument("--offline", action="store_true", help="sólo usar modelos ya descargados")
+    parser.add_argument("--cache-folder", default="", help="carpeta local de modelos")
+    parser.add_argument("--output", default="", help="archivo JSON con el reporte")
+    args = parser.parse_args(argv)
+
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    configure_embedding_backend(
+        REFERENCE_BACKEND,
+        num_threads=args.threads,
+        offline=args.offline,
+        cache_folder=args.cache_folder,
+    )
+
+    corpus = generate_corpus(args.persons, templates=load_templates())
+    texts = [
+        text
+        for _, text, _ in iter_corpus_records(corpus, lambda t: chunk_text(t, max_chars=CHUNK_MAX_CHARS))
+    ]
+    questions = corpus.questions(args.queries)
+    print(f"Corpus: {len(texts)} chunks, {len(questions)} consultas")
+
+    reference = _get_model(args.model, REFERENCE_BACKEND)
+    reference_docs = _normalize(reference.encode(texts, batch_size=32))
+    reference_queries = _normalize(reference.encode(questions, batch_size=32))
+
+    reports: List[ConsistencyReport] = []
+    ref_report = check_backend(
+        REFERENCE_BACKEND,
+        args.model,
+        texts,
+        questions,
+        reference_docs,
+        reference_queries,
+        args.top_k,
+        args.iterations,
+    )
+    reports.append(ref_report)
+    print(ref_report.summary())
+
+    for backend in backends:
+        report = check_backend(
+            backend,
+            args.model,
+            texts,
+            questions,
+            reference_docs,
+            reference_queries,
+            args.top_k,
+            args.iterations,
+            reference_p50_ms=ref_report.query_p50_ms,
+        )
+        reports.append(report)
+        print(report.summary())
+
+    if args.output:
+        output = pathlib.Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        data: Dict[str, Any] = {
+            "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "model": args.model,
+            "reports": [asdict(r) for r in reports],
+        }
+        output.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="utf-8")
+        print(f"Reporte guardado en {output}")
+
+
+if __name__ == "__main__":
+    main()
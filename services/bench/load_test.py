@@ -0,0 +1,492 @@
+# services/bench/load_test.py
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import datetime
+import json
+import pathlib
+import random
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import Settings, get_settings
+from services.agents.multi_agent import AgentRouter
+from services.bench.timing import (
+    BenchResult,
+    bench_environment,
+    compare_results,
+    results_from_dicts,
+)
+from services.bench.workload import WorkloadItem, load_workload, synthetic_workload
+from services.ingest.chunking import build_chunker, chunker_config_from_settings
+from services.ingest.main import load_text
+from services.ingest.manifest import chunk_id
+from services.rag.chunk_store import ChunkTextStore
+from services.rag.embeddings import (
+    configure_embedding_cache,
+    configure_embeddings,
+    embed_array,
+    embedding_dimension,
+)
+from services.rag.llm_client import LLMClient, llm_config_from_settings
+from services.rag.local_store import LocalVectorStore
+from services.rag.profile_index import ProfileIndex, extract_profile
+from services.rag.vector_store import VectorStore, VectorStoreConfig, person_namespace
+from services.telemetry.tracing import Trace, trace
+from services.testing.fake_groq_server import FakeGroqServer
+from services.testing.fakes import FakePineconeIndex, Latency
+
+
+def _ms(value: float) -> float:
+    return value / 1000.0
+
+
+@dataclass
+class RequestSample:
+    kind: str
+    latency_s: float
+    error: Optional[str]
+    # (span, segundos) de todo lo que se midió dentro de la respuesta
+    stages: List[Tuple[str, float]]
+    # spans que contienen a otros (p. ej. "retrieve" → "vector.query")
+    containers: List[str] = field(default_factory=list)
+
+
+@dataclass
+class StageStats:
+    name: str
+    count: int
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+
+    def summary(self) -> str:
+        return (
+            f"  {self.name:<20} n={self.count:<6} mean={self.mean_ms:9.2f}ms "
+            f"p50={self.p50_ms:9.2f}ms p95={self.p95_ms:9.2f}ms p99={self.p99_ms:9.2f}ms"
+        )
+
+
+def _stage_stats(name: str, seconds: Sequence[float]) -> StageStats:
+    ms = np.asarray(seconds, dtype=np.float64) * 1000.0
+    if not len(ms):
+        return StageStats(name, 0, 0.0, 0.0, 0.0, 0.0)
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return StageStats(name, len(ms), float(ms.mean()), float(p50), float(p95), float(p99))
+
+
+@dataclass
+class LevelResult:
+    """Una corrida a concurrencia fija: `users` sesiones durante `duration_s`."""
+
+    users: int
+    duration_s: float
+    requests: int
+    errors: int
+    throughput_rps: float
+    latency: StageStats
+    stages: List[StageStats] = field(default_factory=list)
+    kinds: List[StageStats] = field(default_factory=list)
+    error_types: Dict[str, int] = field(default_factory=dict)
+    containers: List[str] = field(default_factory=list)
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.requests if self.requests else 0.0
+
+    def stage(self, name: str) -> Optional[StageStats]:
+        return next((s for s in self.stages if s.name == name), None)
+
+    def to_bench_result(self) -> BenchResult:
+        """Misma forma que el benchmark: permite `--compare` contra otra corrida."""
+        return BenchResult(
+            name="load",
+            params={"users": self.users},
+            iterations=self.requests,
+            total_s=self.duration_s,
+            ops_per_s=self.throughput_rps,
+            mean_ms=self.latency.mean_ms,
+            p50_ms=self.latency.p50_ms,
+            p95_ms=self.latency.p95_ms,
+            p99_ms=self.latency.p99_ms,
+            min_ms=0.0,
+            max_ms=0.0,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**dataclasses.asdict(self), "error_rate": self.error_rate}
+
+    def summary(self) -> str:
+        return (
+            f"{self.users:>4} usuarios: {self.throughput_rps:7.2f} req/s, "
+            f"{self.requests} pedidos, {self.error_rate:6.1%} errores, "
+            f"p50={self.latency.p50_ms:8.1f}ms p95={self.latency.p95_ms:8.1f}ms "
+            f"p99={self.latency.p99_ms:8.1f}ms"
+        )
+
+
+def summarize(users: int, duration_s: float, samples: List[RequestSample]) -> LevelResult:
+    errors: Dict[str, int] = {}
+    by_stage: Dict[str, List[float]] = {}
+    by_kind: Dict[str, List[float]] = {}
+    containers = set()
+    for sample in samples:
+        containers.update(sample.containers)
+        if sample.error:
+            errors[sample.error] = errors.get(sample.error, 0) + 1
+            continue
+        by_kind.setdefault(sample.kind, []).append(sample.latency_s)
+        for name, seconds in sample.stages:
+            by_stage.setdefault(name, []).append(seconds)
+
+    ok = [s.latency_s for s in samples if not s.error]
+    stages = [_stage_stats(name, values) for name, values in by_stage.items()]
+    # primero las etapas que más tiempo suman
+    stages.sort(key=lambda s: s.mean_ms * s.count, reverse=True)
+    return LevelResult(
+        users=users,
+        duration_s=duration_s,
+        requests=len(samples),
+        errors=sum(errors.values()),
+        throughput_rps=len(ok) / duration_s if duration_s > 0 else 0.0,
+        latency=_stage_stats("answer", ok),
+        stages=stages,
+        kinds=[_stage_stats(kind, values) for kind, values in sorted(by_kind.items())],
+        error_types=errors,
+        containers=sorted(containers),
+    )
+
+
+def _stages(t: Trace) -> Tuple[List[Tuple[str, float]], List[str]]:
+    spans = [s for s in t.spans if s.parent_id is not None]
+    parents = {s.parent_id for s in spans}
+    stages = [(s.name, s.end_s - s.start_s) for s in spans]
+    return stages, sorted({s.name for s in spans if s.span_id in parents})
+
+
+def run_level(
+    router: AgentRouter,
+    workload: Sequence[WorkloadItem],
+    users: int,
+    duration_s: float,
+    think: Latency,
+    seed: int = 0,
+) -> LevelResult:
+    """
+    Modelo cerrado: cada usuario simulado pregunta, espera la respuesta, "lee" durante
+    `think` y vuelve a preguntar, como una sesión de chat. Los usuarios arrancan
+    escalonados dentro del primer tiempo de lectura para no llegar todos juntos.
+    Sólo cuentan los pedidos que empiezan dentro de la ventana de `duration_s`.
+    """
+    samples: List[RequestSample] = []
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def user(index: int) -> None:
+        rng = random.Random(seed * 1_000_003 + index)
+        position = rng.randrange(len(workload))
+        if stop.wait(rng.uniform(0.0, think.base_s)):
+            return
+        while not stop.is_set():
+            item = workload[position % len(workload)]
+            position += 1
+            error: Optional[str] = None
+            t0 = time.perf_counter()
+            with trace("load.request", record=True) as t:
+                try:
+                    router.answer(item.question)
+                except Exception as exc:
+                    error = type(exc).__name__
+            elapsed = time.perf_counter() - t0
+            stages, containers = _stages(t)
+            sample = RequestSample(item.kind, elapsed, error, stages, containers)
+            with lock:
+                samples.append(sample)
+            stop.wait(think.sample())
+
+    threads = [
+        threading.Thread(target=user, args=(i,), name=f"load-user-{i}", daemon=True)
+        for i in range(users)
+    ]
+    for th in threads:
+        th.start()
+    time.sleep(duration_s)
+    stop.set()
+    for th in threads:
+        th.join()
+    return summarize(users, duration_s, samples)
+
+
+@dataclass
+class Saturation:
+    # primer nivel donde más usuarios ya casi no suman throughput (None = no se alcanzó)
+    knee_users: Optional[int]
+    # mayor nivel que cumple el SLO de p99 y de errores (None = ninguno)
+    max_users_within_slo: Optional[int]
+    # etapa (sin hijas) cuyo p95 más creció entre el primer nivel y el de saturación
+    bottleneck: Optional[str]
+
+    def summary(self) -> str:
+        knee = f"{self.knee_users} usuarios" if self.knee_users else "no se alcanzó"
+        slo = (
+            f"{self.max_users_within_slo} usuarios"
+            if self.max_users_within_slo
+            else "ningún nivel"
+        )
+        lines = [f"Saturación (throughput): {knee}", f"Máximo dentro del SLO: {slo}"]
+        if self.bottleneck:
+            lines.append(f"Etapa que más se degrada: {self.bottleneck}")
+        return "\n".join(lines)
+
+
+def find_saturation(
+    levels: Sequence[LevelResult],
+    slo_p99_ms: float,
+    max_error_rate: float,
+    min_gain: float = 0.10,
+) -> Saturation:
+    """
+    Rodilla de la curva: el nivel donde el throughput crece menos de `min_gain` respecto
+    del anterior (en proporción a los usuarios agregados) mientras el p99 sigue subiendo.
+    """
+    levels = sorted(levels, key=lambda level: level.users)
+    within = [
+        level.users
+        for level in levels
+        if level.latency.p99_ms <= slo_p99_ms and level.error_rate <= max_error_rate
+    ]
+
+    knee: Optional[LevelResult] = None
+    for prev, cur in zip(levels, levels[1:]):
+        added = cur.users / prev.users - 1.0
+        gain = cur.throughput_rps / prev.throughput_rps - 1.0 if prev.throughput_rps else 0.0
+        if gain < min_gain * added and cur.latency.p99_ms > prev.latency.p99_ms:
+            knee = cur
+            break
+
+    bottleneck: Optional[str] = None
+    if levels:
+        first, last = levels[0], knee or levels[-1]
+        growth = {
+            s.name: s.p95_ms - (first.stage(s.name).p95_ms if first.stage(s.name) else 0.0)
+            for s in last.stages
+            # sólo etapas hoja: "answer" o "retrieve" crecen por lo que tienen adentro
+            if s.name not in last.containers
+        }
+        if growth:
+            bottleneck = max(growth, key=growth.__getitem__)
+
+    return Saturation(
+        knee_users=knee.users if knee else None,
+        max_users_within_slo=max(within) if within else None,
+        bottleneck=bottleneck,
+    )
+
+
+def build_index(settings: Settings, directory: str, with_profiles: bool) -> Tuple[Settings, Any]:
+    """
+    Indexa los CVs configurados en un índice local temporal (namespaces, textos en SQLite
+    y perfiles), igual que la ingesta. Devuelve los settings apuntando a ese índice.
+    """
+    root = pathlib.Path(directory)
+    settings = dataclasses.replace(
+        settings,
+        vector_backend="local",
+        local_index_dir=str(root / "vectors"),
+        chunk_store_path=str(root / "chunks.sqlite"),
+        profile_index_path=str(root / "profiles.json") if with_profiles else "",
+        index_version_path=str(root / "version"),
+    )
+    chunker = build_chunker(chunker_config_from_settings(settings))
+    dimension = embedding_dimension(settings.embedding_model_name)
+    local = LocalVectorStore(settings.local_index_dir, dimension=dimension)
+    chunk_store = ChunkTextStore(settings.chunk_store_path)
+    profiles = {}
+    for person in settings.persons:
+        raw_text = load_text(person.cv_path)
+        # mismos ids que la ingesta (por contenido); los textos repetidos van una sola vez
+        by_id = {chunk_id(person.id, c): c for c in chunker.chunk(raw_text)}
+        ids, chunks = list(by_id), list(by_id.values())
+        vectors = embed_array(chunks, model_name=settings.embedding_model_name, batch_size=32)
+        local.upsert(
+            ids,
+            vectors,
+            [{"person_id": person.id} for _ in ids],
+            namespace=person_namespace(settings, person.id),
+        )
+        chunk_store.put_many((i, person.id, c) for i, c in zip(ids, chunks))
+        profiles[person.id] = extract_profile(person.id, person.name, raw_text)
+    if with_profiles:
+        ProfileIndex(settings.profile_index_path).save(profiles)
+    return settings, local
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Load test: N usuarios simulados contra AgentRouter.answer, con Pinecone y Groq "
+            "simulados; mide throughput, percentiles por etapa y punto de saturación."
+        )
+    )
+    parser.add_argument("--workload", default="", help="JSONL de preguntas (default: sintético)")
+    parser.add_argument(
+        "--questions", type=int, default=200, help="preguntas del workload sintético (default: 200)"
+    )
+    parser.add_argument(
+        "--users",
+        default="1,2,4,8,16,32",
+        help="niveles de concurrencia separados por coma (default: 1,2,4,8,16,32)",
+    )
+    parser.add_argument("--duration", type=float, default=20.0, help="segundos por nivel (default: 20)")
+    parser.add_argument("--think-ms", type=float, default=1000.0, help="lectura entre preguntas")
+    parser.add_argument("--think-jitter-ms", type=float, default=500.0, help="jitter de la lectura")
+    parser.add_argument("--store-latency-ms", type=float, default=30.0, help="latencia del índice")
+    parser.add_argument("--store-jitter-ms", type=float, default=10.0, help="jitter del índice")
+    parser.add_argument(
+        "--store-sigma", type=float, default=0.3, help="cola lognormal del índice (0 = sin cola)"
+    )
+    parser.add_argument("--store-error-rate", type=float, default=0.0, help="fracción de fallas")
+    parser.add_argument("--llm-latency-ms", type=float, default=400.0, help="latencia de Groq")
+    parser.add_argument("--llm-jitter-ms", type=float, default=100.0, help="jitter de Groq")
+    parser.add_argument(
+        "--llm-sigma", type=float, default=0.3, help="cola lognormal de Groq (0 = sin cola)"
+    )
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="fracción de fallas")
+    parser.add_argument(
+        "--llm-error-status", type=int, default=503, help="status de las fallas (429 o 5xx)"
+    )
+    parser.add_argument(
+        "--embedding-cache",
+        action="store_true",
+        help="usa la cache de embeddings configurada (default: cada pregunta paga el encoder)",
+    )
+    parser.add_argument(
+        "--answer-cache", action="store_true", help="activa el cache semántico de respuestas"
+    )
+    parser.add_argument(
+        "--no-profiles", action="store_true", help="sin respuestas directas desde el perfil"
+    )
+    parser.add_argument("--slo-p99-ms", type=float, default=3000.0, help="SLO de p99 (default: 3000)")
+    parser.add_argument(
+        "--max-error-rate", type=float, default=0.01, help="errores tolerados por el SLO"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="semilla del workload y los usuarios")
+    parser.add_argument(
+        "--output", default="", help="reporte JSON (default: .bench/load-<fecha>.json)"
+    )
+    parser.add_argument("--compare", default="", help="reporte de una corrida anterior")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="cambio relativo (p95 u ops/s) que cuenta como regresión (default: 0.10)",
+    )
+    args = parser.parse_args(argv)
+    levels_users = sorted({int(u) for u in args.users.split(",") if u.strip()})
+    if not levels_users or levels_users[0] < 1:
+        parser.error("--users necesita niveles >= 1")
+
+    settings = get_settings()
+    configure_embeddings(settings)
+    if not args.embedding_cache:
+        configure_embedding_cache(None, max_memory_entries=0)
+    workload = (
+        load_workload(args.workload)
+        if args.workload
+        else synthetic_workload(settings.persons, args.questions, seed=args.seed)
+    )
+    think = Latency(_ms(args.think_ms), _ms(args.think_jitter_ms))
+    store_latency = Latency(_ms(args.store_latency_ms), _ms(args.store_jitter_ms), args.store_sigma)
+    llm_latency = Latency(_ms(args.llm_latency_ms), _ms(args.llm_jitter_ms), args.llm_sigma)
+
+    levels: List[LevelResult] = []
+    with tempfile.TemporaryDirectory(prefix="load-index-") as directory, FakeGroqServer(
+        latency=llm_latency,
+        error_rate=args.llm_error_rate,
+        error_status=args.llm_error_status,
+    ) as server:
+        print(f"Indexando {len(settings.persons)} CVs en un índice temporal...")
+        load_settings, local = build_index(settings, directory, with_profiles=not args.no_profiles)
+        load_settings = dataclasses.replace(
+            load_settings,
+            groq_base_url=server.base_url,
+            answer_cache_enabled=args.answer_cache,
+        )
+        index = FakePineconeIndex(local, store_latency, error_rate=args.store_error_rate)
+        config = VectorStoreConfig(
+            api_key="",
+            index_name="load",
+            dimension=embedding_dimension(settings.embedding_model_name),
+        )
+        router = AgentRouter(
+            load_settings,
+            VectorStore.from_index(config, index),
+            llm_client=LLMClient(llm_config_from_settings(load_settings)),
+        )
+        # modelo y conexiones calientes antes de medir
+        for item in workload[:3]:
+            router.answer(item.question)
+
+        print(f"Workload: {len(workload)} preguntas; {args.duration:.0f}s por nivel\n")
+        for users in levels_users:
+            level = run_level(router, workload, users, args.duration, think, seed=args.seed)
+            levels.append(level)
+            print(level.summary())
+            for stage in level.stages:
+                print(stage.summary())
+            print("  por tipo de pregunta:")
+            for kind in level.kinds:
+                print(kind.summary())
+            if level.error_types:
+                print(f"  errores: {level.error_types}")
+        router.llm.close()
+
+    saturation = find_saturation(levels, args.slo_p99_ms, args.max_error_rate)
+    print(f"\n{saturation.summary()}")
+
+    results = [level.to_bench_result() for level in levels]
+    report = {
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "environment": bench_environment(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "results": [r.to_dict() for r in results],
+        "levels": [level.to_dict() for level in levels],
+        "saturation": dataclasses.asdict(saturation),
+    }
+    output = pathlib.Path(
+        args.output or f".bench/load-{datetime.datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=1), encoding="utf-8")
+    print(f"\nReporte guardado en {output}")
+
+    if args.compare:
+        baseline = json.loads(pathlib.Path(args.compare).read_text(encoding="utf-8"))
+        comparisons = compare_results(
+            results_from_dicts(baseline["results"]),
+            results,
+            threshold=args.threshold,
+        )
+        print(f"\n== comparación contra {args.compare} ==")
+        for comparison in comparisons:
+            print(comparison.summary())
+        base_sat = baseline.get("saturation") or {}
+        print(
+            f"Saturación: {base_sat.get('knee_users')} → {saturation.knee_users} usuarios; "
+            f"dentro del SLO: {base_sat.get('max_users_within_slo')} → "
+            f"{saturation.max_users_within_slo}"
+        )
+        if any(c.regressed for c in comparisons):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
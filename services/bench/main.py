@@ -0,0 +1,377 @@
+# services/bench/main.py
+from __future__ import annotations
+
+import argparse
+import datetime
+import json
+import pathlib
+import sys
+import tempfile
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config import Settings
+from services.agents.multi_agent import AgentRouter
+from services.bench.corpus import (
+    SyntheticCorpus,
+    generate_corpus,
+    iter_corpus_records,
+    load_templates,
+    random_unit_vectors,
+)
+from services.bench.timing import (
+    BenchResult,
+    BenchRun,
+    bench_environment,
+    compare_results,
+    results_from_dicts,
+    run_bench,
+)
+from services.ingest.chunking import (
+    CHUNK_MAX_CHARS,
+    ChunkerConfig,
+    TokenChunker,
+    build_chunker,
+    chunk_text,
+)
+from services.rag.embeddings import (
+    DEFAULT_EMBEDDING_MODEL,
+    configure_embedding_cache,
+    embed_array,
+    embedding_dimension,
+)
+from services.rag.llm_client import LLMClient, llm_config_from_settings
+from services.rag.local_store import LocalVectorStore
+from services.rag.vector_store import VectorStore, VectorStoreConfig
+from services.testing.fake_groq_server import FakeGroqServer
+from services.testing.fakes import FakePineconeIndex, Latency
+
+
+BENCHMARKS = [
+    "chunk_tokens",  # TokenChunker, el que usa la ingesta
+    "chunk_text",  # chunker por caracteres anterior, para comparar
+    "embed_single",
+    "embed_batch",
+    "vector_query",
+    "detect_agents",
+    "build_prompt",
+    "answer",
+]
+
+
+def _ms(value: float) -> float:
+    return value / 1000.0
+
+
+def _chunker(args: argparse.Namespace) -> TokenChunker:
+    return build_chunker(
+        ChunkerConfig(
+            model_name=args.model,
+            max_tokens=args.chunk_max_tokens,
+            overlap_tokens=args.chunk_overlap_tokens,
+        )
+    )
+
+
+def bench_embeddings(args: argparse.Namespace, texts: List[str], questions: List[str]) -> List[BenchResult]:
+    """Encoder real con el cache desactivado: se mide `encode`, no aciertos de cache."""
+    results: List[BenchResult] = []
+    if "embed_single" in args.only:
+        results.append(
+            run_bench(
+                "embed_single",
+                lambda i: embed_array(questions[i % len(questions)], model_name=args.model),
+                iterations=args.iterations,
+                warmup=args.warmup,
+            )
+        )
+    if "embed_batch" in args.only:
+        size = args.embed_batch_size
+        batches = [texts[i : i + size] for i in range(0, max(len(texts) - size, 0) + 1, size)]
+        results.append(
+            run_bench(
+                "embed_batch",
+                lambda i: embed_array(batches[i % len(batches)], model_name=args.model, batch_size=size),
+                iterations=max(args.iterations // 10, 1),
+                warmup=min(args.warmup, 2),
+                params={"batch_size": size},
+            )
+        )
+    return results
+
+
+def build_store(
+    corpus: SyntheticCorpus,
+    dimension: int,
+    args: argparse.Namespace,
+    directory: str,
+) -> VectorStore:
+    """
+    Carga el corpus en un LocalVectorStore (de una sola vez) y lo expone detrás de un
+    índice Pinecone simulado, así las consultas pasan por el VectorStore real.
+    """
+    records = list(iter_corpus_records(corpus, _chunker(args).chunk))
+    if args.real_embeddings:
+        vectors = embed_array([text for _, text, _ in records], model_name=args.model, batch_size=64)
+    else:
+        vectors = random_unit_vectors(len(records), dimension, np.random.default_rng(args.seed))
+
+    local = LocalVectorStore(directory, dimension=dimension)
+    if args.namespaces == "person":
+        rows_by_person: Dict[str, List[int]] = {}
+        for row, record in enumerate(records):
+            rows_by_person.setdefault(record[2]["person_id"], []).append(row)
+        for person_id, rows in rows_by_person.items():
+            local.upsert(
+                [records[i][0] for i in rows],
+                vectors[rows],
+                [records[i][2] for i in rows],
+                namespace=person_id,
+            )
+    else:
+        local.upsert([r[0] for r in records], vectors, [r[2] for r in records])
+
+    index = FakePineconeIndex(
+        local,
+        Latency(_ms(args.store_latency_ms), _ms(args.store_jitter_ms)),
+    )
+    config = VectorStoreConfig(api_key="", index_name="bench", dimension=dimension)
+    return VectorStore.from_index(config, index)
+
+
+def bench_corpus(
+    size: int,
+    args: argparse.Namespace,
+    server: FakeGroqServer,
+    dimension: int,
+    templates: List[str],
+) -> List[BenchResult]:
+    corpus = generate_corpus(size, templates=templates, seed=args.seed)
+    questions = corpus.questions(max(args.iterations, 16), seed=args.seed)
+    texts = [corpus.texts[p.id] for p in corpus.persons]
+    params = {"persons": size}
+    results: List[BenchResult] = []
+
+    if "chunk_tokens" in args.only:
+        chunker = _chunker(args)
+        results.append(
+            run_bench(
+                "chunk_tokens",
+                lambda i: chunker.chunk_with_tokens(texts[i % len(texts)]),
+                iterations=args.iterations,
+                warmup=args.warmup,
+                params=params,
+            )
+        )
+    if "chunk_text" in args.only:
+        results.append(
+            run_bench(
+                "chunk_text",
+                lambda i: chunk_text(texts[i % len(texts)], max_chars=CHUNK_MAX_CHARS),
+                iterations=args.iterations,
+                warmup=args.warmup,
+                params=params,
+            )
+        )
+
+    needs_router = {"vector_query", "detect_agents", "build_prompt", "answer"} & set(args.only)
+    if not needs_router:
+        return results
+
+    with tempfile.TemporaryDirectory(prefix="bench-index-") as directory:
+        store = build_store(corpus, dimension, args, directory)
+        settings = Settings(
+            pinecone_api_key="",
+            pinecone_index_name="bench",
+            groq_api_key="bench",
+            embedding_model_name=args.model,
+            groq_base_url=server.base_url,
+            persons=corpus.persons,
+            answer_cache_enabled=False,
+            vector_namespaces=args.namespaces,
+            chunk_store_path="",  # el corpus sintético lleva el texto en la metadata
+            profile_index_path="",  # se mide el camino RAG completo
+        )
+        router = AgentRouter(
+            settings,
+            store,
+            llm_client=LLMClient(llm_config_from_settings(settings)),
+        )
+        # los vectores de las preguntas se calculan una vez: query no mide el encoder
+        query_vecs = embed_array(questions, model_name=args.model)
+
+        if "vector_query" in args.only:
+            persons = corpus.persons
+            results.append(
+                run_bench(
+                    "vector_query",
+                    # lo mismo que hace RAGAgent.retrieve_by_vector
+                    lambda i: router.agents[persons[i % len(persons)].id].retrieve_by_vector(
+                        query_vecs[i % len(query_vecs)]
+                    ),
+                    iterations=args.iterations,
+                    warmup=args.warmup,
+                    params=params,
+                )
+            )
+
+        if "detect_agents" in args.only:
+            results.append(
+                run_bench(
+                    "detect_agents",
+                    lambda i: router.detect_agents(questions[i % len(questions)]),
+                    iterations=args.iterations,
+                    warmup=args.warmup,
+                    params=params,
+                )
+            )
+
+        if "build_prompt" in args.only:
+            prepared = []
+            for i, question in enumerate(questions[: min(len(questions), 64)]):
+                agents = router.detect_agents(question)
+                prepared.append(
+                    (question, agents, router.retrieve_many_by_vector(query_vecs[i], agents))
+                )
+
+            def build(i: int) -> Any:
+                # incluye el armado del contexto (dedupe, corte por score, presupuesto)
+                question, agents, chunks = prepared[i % len(prepared)]
+                chunks = router.pack_context(chunks)
+                if len(agents) == 1:
+                    return router._build_single_prompt(question, agents[0], chunks)
+                return router._build_multi_prompt(question, chunks)
+
+            results.append(
+                run_bench(
+                    "build_prompt",
+                    build,
+                    iterations=args.iterations,
+                    warmup=args.warmup,
+                    params=params,
+                )
+            )
+
+        if "answer" in args.only:
+            results.append(
+                run_bench(
+                    "answer",
+                    lambda i: router.answer(questions[i % len(questions)]),
+                    iterations=max(args.iterations // 5, 1),
+                    warmup=min(args.warmup, 2),
+                    params={**params, "llm_latency_ms": args.llm_latency_ms},
+                )
+            )
+        router.llm.close()
+
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark offline de los caminos calientes del RAG (índice y LLM simulados)."
+    )
+    parser.add_argument(
+        "--persons",
+        default="10,1000",
+        help="tamaños de corpus sintético separados por coma (default: 10,1000)",
+    )
+    parser.add_argument("--iterations", type=int, default=200, help="mediciones por caso (default: 200)")
+    parser.add_argument("--warmup", type=int, default=10, help="llamadas sin medir por caso (default: 10)")
+    parser.add_argument(
+        "--only",
+        default=",".join(BENCHMARKS),
+        help=f"casos a correr, separados por coma (default: todos: {','.join(BENCHMARKS)})",
+    )
+    parser.add_argument("--model", default=DEFAULT_EMBEDDING_MODEL, help="modelo de embeddings")
+    parser.add_argument(
+        "--chunk-max-tokens", type=int, default=256, help="límite de tokens por chunk (default: 256)"
+    )
+    parser.add_argument(
+        "--chunk-overlap-tokens", type=int, default=32, help="solapamiento entre chunks (default: 32)"
+    )
+    parser.add_argument("--embed-batch-size", type=int, default=32, help="textos por lote en embed_batch")
+    parser.add_argument("--store-latency-ms", type=float, default=0.0, help="latencia simulada del índice")
+    parser.add_argument("--store-jitter-ms", type=float, default=0.0, help="jitter de la latencia del índice")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0, help="latencia simulada de Groq")
+    parser.add_argument("--llm-jitter-ms", type=float, default=0.0, help="jitter de la latencia de Groq")
+    parser.add_argument(
+        "--real-embeddings",
+        action="store_true",
+        help="embebe el corpus con el modelo real (lento); por defecto usa vectores aleatorios",
+    )
+    parser.add_argument(
+        "--namespaces",
+        choices=("person", "none"),
+        default="person",
+        help="un namespace por persona o índice plano filtrado por metadata (default: person)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="semilla del corpus sintético")
+    parser.add_argument(
+        "--output",
+        default="",
+        help="archivo JSON de resultados (default: .bench/bench-<fecha>.json)",
+    )
+    parser.add_argument("--compare", default="", help="JSON de una corrida anterior para comparar")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="cambio relativo (p95 u ops/s) que cuenta como regresión (default: 0.10)",
+    )
+    args = parser.parse_args(argv)
+    args.only = [name.strip() for name in args.only.split(",") if name.strip()]
+    unknown = set(args.only) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"casos desconocidos: {', '.join(sorted(unknown))}")
+    sizes = [int(s) for s in args.persons.split(",") if s.strip()]
+
+    # sin cache de embeddings: cada llamada paga el encoder, como una pregunta nueva
+    configure_embedding_cache(None, max_memory_entries=0)
+
+    templates = load_templates()
+    dimension = embedding_dimension(args.model)
+    run = BenchRun(
+        created_at=datetime.datetime.now().isoformat(timespec="seconds"),
+        environment=bench_environment(),
+        config={k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+    )
+
+    def report(results: List[BenchResult]) -> None:
+        for result in results:
+            print(result.summary())
+        run.results.extend(results)
+
+    sample = generate_corpus(min(max(sizes, default=10), 256), templates=templates, seed=args.seed)
+    sample_chunks = [text for _, text, _ in iter_corpus_records(sample, _chunker(args).chunk)]
+    report(bench_embeddings(args, sample_chunks, sample.questions(64, seed=args.seed)))
+
+    with FakeGroqServer(latency=Latency(_ms(args.llm_latency_ms), _ms(args.llm_jitter_ms))) as server:
+        for size in sizes:
+            print(f"\n== corpus sintético: {size} personas ==")
+            report(bench_corpus(size, args, server, dimension, templates))
+
+    output = pathlib.Path(
+        args.output or f".bench/bench-{datetime.datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(run.to_dict(), ensure_ascii=False, indent=1), encoding="utf-8")
+    print(f"\nResultados guardados en {output}")
+
+    if args.compare:
+        baseline = json.loads(pathlib.Path(args.compare).read_text(encoding="utf-8"))
+        comparisons = compare_results(
+            results_from_dicts(baseline["results"]),
+            run.results,
+            threshold=args.threshold,
+        )
+        print(f"\n== comparación contra {args.compare} ==")
+        for comparison in comparisons:
+            print(comparison.summary())
+        if any(c.regressed for c in comparisons):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
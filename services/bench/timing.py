@@ -0,0 +1,155 @@
+# services/bench/timing.py
+from __future__ import annotations
+
+import os
+import platform
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+
+@dataclass
+class BenchResult:
+    name: str
+    params: Dict[str, Any]
+    iterations: int
+    total_s: float
+    ops_per_s: float
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    min_ms: float
+    max_ms: float
+
+    @property
+    def key(self) -> str:
+        """Identifica el caso para comparar corridas (nombre + parámetros)."""
+        params = ",".join(f"{k}={v}" for k, v in sorted(self.params.items()))
+        return f"{self.name}[{params}]"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def summary(self) -> str:
+        return (
+            f"{self.key:<44} {self.ops_per_s:>10.1f} ops/s  "
+            f"p50={self.p50_ms:8.3f}ms p95={self.p95_ms:8.3f}ms p99={self.p99_ms:8.3f}ms"
+        )
+
+
+def bench_environment() -> Dict[str, Any]:
+    """Datos de la máquina que se guardan con cada corrida (para comparar con contexto)."""
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+    }
+
+
+def run_bench(
+    name: str,
+    fn: Callable[[int], Any],
+    iterations: int,
+    warmup: int = 0,
+    params: Optional[Dict[str, Any]] = None,
+) -> BenchResult:
+    """
+    Ejecuta `fn(i)` `warmup` veces sin medir y luego `iterations` veces midiendo
+    cada llamada. `i` permite rotar entradas (preguntas, textos, vectores).
+    """
+    for i in range(warmup):
+        fn(i)
+
+    samples = np.empty(iterations, dtype=np.float64)
+    started = time.perf_counter()
+    for i in range(iterations):
+        t0 = time.perf_counter()
+        fn(i)
+        samples[i] = time.perf_counter() - t0
+    total_s = time.perf_counter() - started
+
+    ms = samples * 1000.0
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99]) if iterations else (0.0, 0.0, 0.0)
+    return BenchResult(
+        name=name,
+        params=dict(params or {}),
+        iterations=iterations,
+        total_s=total_s,
+        ops_per_s=iterations / total_s if total_s > 0 else 0.0,
+        mean_ms=float(ms.mean()) if iterations else 0.0,
+        p50_ms=float(p50),
+        p95_ms=float(p95),
+        p99_ms=float(p99),
+        min_ms=float(ms.min()) if iterations else 0.0,
+        max_ms=float(ms.max()) if iterations else 0.0,
+    )
+
+
+@dataclass
+class Comparison:
+    key: str
+    baseline: BenchResult
+    current: BenchResult
+    threshold: float = 0.10
+
+    @property
+    def p95_change(self) -> float:
+        if self.baseline.p95_ms <= 0:
+            return 0.0
+        return self.current.p95_ms / self.baseline.p95_ms - 1.0
+
+    @property
+    def ops_change(self) -> float:
+        if self.baseline.ops_per_s <= 0:
+            return 0.0
+        return self.current.ops_per_s / self.baseline.ops_per_s - 1.0
+
+    @property
+    def regressed(self) -> bool:
+        return self.p95_change > self.threshold or self.ops_change < -self.threshold
+
+    def summary(self) -> str:
+        flag = "  REGRESIÓN" if self.regressed else ""
+        return (
+            f"{self.key:<44} ops/s {self.ops_change:+7.1%}  "
+            f"p95 {self.p95_change:+7.1%}{flag}"
+        )
+
+
+def compare_results(
+    baseline: List[BenchResult],
+    current: List[BenchResult],
+    threshold: float = 0.10,
+) -> List[Comparison]:
+    """Empareja casos por `key`; los que no están en ambas corridas se ignoran."""
+    by_key = {r.key: r for r in baseline}
+    return [
+        Comparison(key=r.key, baseline=by_key[r.key], current=r, threshold=threshold)
+        for r in current
+        if r.key in by_key
+    ]
+
+
+def results_from_dicts(items: List[Dict[str, Any]]) -> List[BenchResult]:
+    return [BenchResult(**item) for item in items]
+
+
+@dataclass
+class BenchRun:
+    created_at: str
+    environment: Dict[str, Any]
+    config: Dict[str, Any]
+    results: List[BenchResult] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "created_at": self.created_at,
+            "environment": self.environment,
+            "config": self.config,
+            "results": [r.to_dict() for r in self.results],
+        }
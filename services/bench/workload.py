@@ -0,0 +1,74 @@
+# services/bench/workload.py
+from __future__ import annotations
+
+import json
+import pathlib
+import random
+from dataclasses import dataclass
+from typing import List, Sequence
+
+from config import PersonConfig
+
+
+# (tipo, plantilla, personas que nombra); el tipo agrupa los resultados del load test
+_TEMPLATES = [
+    ("single", "¿Qué experiencia tiene {0}?", 1),
+    ("single", "¿Dónde estudió {0}?", 1),
+    ("single", "Resumí el perfil profesional de {0}", 1),
+    ("single", "¿En qué proyectos trabajó {0} últimamente?", 1),
+    ("single", "¿Qué tecnologías usa {0} en su trabajo actual?", 1),
+    ("multi", "Compará la experiencia de {0} y {1}", 2),
+    ("multi", "¿Quién tiene más experiencia en datos, {0} o {1}?", 2),
+    ("lookup", "¿Cuál es el email de {0}?", 1),
+    ("lookup", "¿Qué certificaciones tiene {0}?", 1),
+    ("lookup", "Compará las aptitudes de {0} y {1}", 2),
+    ("default", "¿Qué lenguajes de programación domina?", 0),
+]
+
+
+@dataclass
+class WorkloadItem:
+    question: str
+    kind: str = "custom"
+
+
+def load_workload(path: str) -> List[WorkloadItem]:
+    """
+    JSONL con una pregunta por línea: `{"question": "...", "kind": "..."}` (`kind` opcional).
+    Las líneas vacías y las que empiezan con `#` se ignoran.
+    """
+    items: List[WorkloadItem] = []
+    lines = pathlib.Path(path).read_text(encoding="utf-8").splitlines()
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as exc:
+            raise ValueError(f"{path}:{number}: JSON inválido ({exc})") from exc
+        if not isinstance(data, dict) or not data.get("question"):
+            raise ValueError(f"{path}:{number}: falta el campo 'question'")
+        items.append(WorkloadItem(question=data["question"], kind=data.get("kind") or "custom"))
+    if not items:
+        raise ValueError(f"{path}: no hay preguntas")
+    return items
+
+
+def synthetic_workload(
+    persons: Sequence[PersonConfig],
+    count: int,
+    seed: int = 0,
+) -> List[WorkloadItem]:
+    """
+    Preguntas armadas con las personas configuradas (por alias, como las escribe un
+    usuario): de una persona, comparaciones, consultas puntuales y sin nombre.
+    """
+    rng = random.Random(seed)
+    names = [p.aliases[0] if p.aliases else p.name for p in persons]
+    templates = [t for t in _TEMPLATES if t[2] <= len(names)]
+    items: List[WorkloadItem] = []
+    for _ in range(count):
+        kind, template, needed = rng.choice(templates)
+        items.append(WorkloadItem(question=template.format(*rng.sample(names, needed)), kind=kind))
+    return items
@@ -0,0 +1,374 @@
+# services/ingest/chunking.py
+from __future__ import annotations
+
+import argparse
+import re
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+
+# chunker por caracteres (el de las primeras versiones; el benchmark lo mide para comparar)
+CHUNK_MAX_CHARS = 2000
+
+# recurso de NLTK que usa sent_tokenize (nltk>=3.9); se instala con
+#   python -m nltk.downloader punkt_tab
+NLTK_SENTENCE_RESOURCE = "tokenizers/punkt_tab/spanish/"
+
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+
+
+def _regex_sentences(text: str) -> List[str]:
+    return [s for s in _SENTENCE_END.split(text) if s]
+
+
+@lru_cache(maxsize=1)
+def sentence_splitter() -> Callable[[str], List[str]]:
+    """
+    sent_tokenize en español si el modelo punkt está instalado localmente; si no,
+    un separador por puntuación. Nunca descarga nada (ni hace red) al importar o chunkear.
+    """
+    try:
+        import nltk
+        from nltk.tokenize import sent_tokenize
+
+        nltk.data.find(NLTK_SENTENCE_RESOURCE)
+    except (ImportError, LookupError):
+        print(
+            "Aviso: no se encontró el modelo 'punkt_tab' de NLTK; se usa un separador "
+            "de oraciones simple. Instalar con: python -m nltk.downloader punkt_tab"
+        )
+        return _regex_sentences
+    return lambda text: sent_tokenize(text, language="spanish")
+
+
+def split_paragraphs(text: str) -> List[str]:
+    raw_paragraphs = text.split("\n\n")
+    return [p.strip() for p in raw_paragraphs if p.strip()]
+
+
+def chunk_long_paragraph(paragraph: str, max_chars: int) -> List[str]:
+    if len(paragraph) <= max_chars:
+        return [paragraph]
+
+    sentences = sentence_splitter()(paragraph)
+    chunks: List[str] = []
+    # oraciones del chunk en curso y su largo unido con espacios (sin concatenar en cada paso)
+    current: List[str] = []
+    length = 0
+
+    for sent in sentences:
+        sent = sent.strip()
+        if not sent:
+            continue
+        candidate = length + len(sent) + (1 if current else 0)
+        if candidate <= max_chars or not current:
+            current.append(sent)
+            length = candidate
+        else:
+            chunks.append(" ".join(current))
+            current, length = [sent], len(sent)
+
+    if current:
+        chunks.append(" ".join(current))
+
+    return chunks
+
+
+def chunk_text(text: str, max_chars: int = 400) -> List[str]:
+    paragraphs = split_paragraphs(text)
+    all_chunks: List[str] = []
+    for p in paragraphs:
+        all_chunks.extend(chunk_long_paragraph(p, max_chars))
+    return [c.strip() for c in all_chunks if c.strip()]
+
+
+# [CLS] y [SEP]: el encoder los agrega a cada texto y cuentan contra el límite del modelo
+SPECIAL_TOKENS = 2
+
+_WORD_PIECE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+class TokenCounter(ABC):
+    """Cuenta y corta en tokens del tokenizer del modelo de embeddings (sin especiales)."""
+
+    name: str = ""
+
+    @abstractmethod
+    def count_many(self, texts: Sequence[str]) -> List[int]:
+        ...
+
+    @abstractmethod
+    def split(self, text: str, max_tokens: int) -> List[str]:
+        """Parte un texto demasiado largo en trozos de a lo sumo `max_tokens` tokens."""
+
+
+class HFTokenCounter(TokenCounter):
+    def __init__(self, tokenizer: Any, name: str) -> None:
+        self._tokenizer = tokenizer
+        self.name = name
+
+    def count_many(self, texts: Sequence[str]) -> List[int]:
+        if not texts:
+            return []
+        encoded = self._tokenizer(list(texts), add_special_tokens=False)["input_ids"]
+        return [len(ids) for ids in encoded]
+
+    def split(self, text: str, max_tokens: int) -> List[str]:
+        offsets = self._tokenizer(
+            text,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+        )["offset_mapping"]
+        pieces: List[str] = []
+        for start in range(0, len(offsets), max_tokens):
+            window = offsets[start : start + max_tokens]
+            piece = text[window[0][0] : window[-1][1]].strip()
+            if piece:
+                pieces.append(piece)
+        return pieces
+
+
+class ApproxTokenCounter(TokenCounter):
+    """Aproximación sin tokenizer: palabras y signos sueltos (WordPiece da algo más)."""
+
+    name = "approx"
+
+    def count_many(self, texts: Sequence[str]) -> List[int]:
+        return [len(_WORD_PIECE.findall(t)) for t in texts]
+
+    def split(self, text: str, max_tokens: int) -> List[str]:
+        spans = [m.span() for m in _WORD_PIECE.finditer(text)]
+        pieces: List[str] = []
+        for start in range(0, len(spans), max_tokens):
+            window = spans[start : start + max_tokens]
+            piece = text[window[0][0] : window[-1][1]].strip()
+            if piece:
+                pieces.append(piece)
+        return pieces
+
+
+@lru_cache(maxsize=4)
+def load_token_counter(
+    model_name: str,
+    cache_folder: Optional[str] = None,
+    offline: bool = False,
+) -> TokenCounter:
+    """
+    Tokenizer del modelo de embeddings (sólo el tokenizer, sin pesos ni torch). Si
+    `transformers` o los archivos del modelo no están disponibles, usa una aproximación.
+    """
+    try:
+        from transformers import AutoTokenizer
+
+        tokenizer = AutoTokenizer.from_pretrained(
+            model_name,
+            cache_dir=cache_folder or None,
+            local_files_only=offline,
+        )
+    except (ImportError, OSError, ValueError) as exc:
+        print(
+            f"Aviso: no se pudo cargar el tokenizer de {model_name} ({type(exc).__name__}); "
+            "los chunks se miden con una aproximación por palabras."
+        )
+        return ApproxTokenCounter()
+    return HFTokenCounter(tokenizer, model_name)
+
+
+@dataclass(frozen=True)
+class ChunkerConfig:
+    model_name: str
+    # límite de secuencia del encoder (all-MiniLM-L6-v2 trunca en 256 word pieces)
+    max_tokens: int = 256
+    overlap_tokens: int = 32
+    cache_folder: Optional[str] = None
+    offline: bool = False
+
+    @property
+    def budget(self) -> int:
+        return max(self.max_tokens - SPECIAL_TOKENS, 1)
+
+    def fingerprint(self) -> str:
+        return f"tokens={self.max_tokens}:overlap={self.overlap_tokens}:{self.model_name}"
+
+
+@dataclass
+class ChunkReport:
+    """Cuánto texto quedaría fuera del vector por el truncado del encoder."""
+
+    max_tokens: int
+    chunks: int = 0
+    tokens: int = 0
+    truncated_chunks: int = 0
+    truncated_tokens: int = 0
+    largest: int = 0
+
+    def add(self, token_counts: Sequence[int]) -> None:
+        limit = self.max_tokens - SPECIAL_TOKENS
+        for n in token_counts:
+            self.chunks += 1
+            self.tokens += n
+            self.largest = max(self.largest, n)
+            if n > limit:
+                self.truncated_chunks += 1
+                self.truncated_tokens += n - limit
+
+    @property
+    def truncation_rate(self) -> float:
+        return self.truncated_chunks / self.chunks if self.chunks else 0.0
+
+    @property
+    def lost_fraction(self) -> float:
+        return self.truncated_tokens / self.tokens if self.tokens else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.chunks} chunks, {self.tokens} tokens (máx {self.largest}); "
+            f"{self.truncated_chunks} truncados ({self.truncation_rate:.0%}), "
+            f"{self.truncated_tokens} tokens fuera del vector ({self.lost_fraction:.1%})"
+        )
+
+
+@dataclass
+class _Unit:
+    text: str
+    tokens: int
+    paragraph: int
+
+
+@dataclass
+class TokenChunker:
+    """
+    Chunks medidos en tokens del encoder, con solapamiento entre ventanas consecutivas.
+
+    El texto se parte en oraciones (dentro de cada párrafo) y cada oración se tokeniza una
+    sola vez; las oraciones que solas exceden el límite se cortan por tokens. Las ventanas se
+    arman con dos punteros sobre sumas acumuladas, así el costo es lineal en las oraciones.
+    """
+
+    config: ChunkerConfig
+    counter: TokenCounter
+    split_sentences: Callable[[str], List[str]]
+    report: ChunkReport = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.report = ChunkReport(self.config.max_tokens)
+
+    def _units(self, text: str) -> List[_Unit]:
+        sentences: List[Tuple[str, int]] = []
+        for p_idx, paragraph in enumerate(p for p in text.split("\n\n") if p.strip()):
+            for sent in self.split_sentences(paragraph.strip()):
+                if sent.strip():
+                    sentences.append((sent.strip(), p_idx))
+
+        counts = self.counter.count_many([s for s, _ in sentences])
+        budget = self.config.budget
+        units: List[_Unit] = []
+        for (sent, p_idx), n in zip(sentences, counts):
+            if n <= budget:
+                units.append(_Unit(sent, n, p_idx))
+                continue
+            pieces = self.counter.split(sent, budget)
+            for piece, m in zip(pieces, self.counter.count_many(pieces)):
+                units.append(_Unit(piece, m, p_idx))
+        return units
+
+    @staticmethod
+    def _join(units: Sequence[_Unit]) -> str:
+        parts: List[str] = []
+        for i, unit in enumerate(units):
+            if i:
+                parts.append("\n\n" if unit.paragraph != units[i - 1].paragraph else " ")
+            parts.append(unit.text)
+        return "".join(parts)
+
+    def chunk_with_tokens(self, text: str) -> Tuple[List[str], List[int]]:
+        units = self._units(text)
+        budget = self.config.budget
+        overlap = min(self.config.overlap_tokens, budget // 2)
+
+        # prefix[i] = tokens de units[:i]; tokens(units[a:b]) = prefix[b] - prefix[a]
+        prefix = [0]
+        for unit in units:
+            prefix.append(prefix[-1] + unit.tokens)
+
+        chunks: List[str] = []
+        counts: List[int] = []
+        start, end = 0, 0
+        while start < len(units):
+            end = max(end, start + 1)
+            while end < len(units) and prefix[end + 1] - prefix[start] <= budget:
+                end += 1
+            chunks.append(self._join(units[start:end]))
+            counts.append(prefix[end] - prefix[start])
+            if end >= len(units):
+                break
+            # la ventana siguiente repite las últimas oraciones que entran en `overlap`
+            next_start = end
+            while next_start - 1 > start and prefix[end] - prefix[next_start - 1] <= overlap:
+                next_start -= 1
+            start = next_start
+
+        self.report.add(counts)
+        return chunks, counts
+
+    def chunk(self, text: str) -> List[str]:
+        return self.chunk_with_tokens(text)[0]
+
+
+@lru_cache(maxsize=4)
+def build_chunker(config: ChunkerConfig) -> TokenChunker:
+    """Un chunker por configuración y proceso (también en los workers del ProcessPool)."""
+    counter = load_token_counter(config.model_name, config.cache_folder, config.offline)
+    return TokenChunker(config, counter, sentence_splitter())
+
+
+def chunker_config_from_settings(settings: Any) -> ChunkerConfig:
+    return ChunkerConfig(
+        model_name=settings.embedding_model_name,
+        max_tokens=settings.chunk_max_tokens,
+        overlap_tokens=settings.chunk_overlap_tokens,
+        cache_folder=settings.embedding_model_cache_dir or None,
+        offline=settings.embedding_offline,
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from config import get_settings
+    from services.ingest.main import load_text
+
+    parser = argparse.ArgumentParser(
+        description="Reporte de truncado: chunks por caracteres vs. chunks por tokens del encoder."
+    )
+    parser.add_argument("--max-tokens", type=int, default=0, help="default: CHUNK_MAX_TOKENS")
+    parser.add_argument("--overlap", type=int, default=-1, help="default: CHUNK_OVERLAP_TOKENS")
+    parser.add_argument("--max-chars", type=int, default=CHUNK_MAX_CHARS, help="chunker por caracteres")
+    args = parser.parse_args(argv)
+
+    settings = get_settings()
+    config = chunker_config_from_settings(settings)
+    config = ChunkerConfig(
+        model_name=config.model_name,
+        max_tokens=args.max_tokens or config.max_tokens,
+        overlap_tokens=config.overlap_tokens if args.overlap < 0 else args.overlap,
+        cache_folder=config.cache_folder,
+        offline=config.offline,
+    )
+    chunker = build_chunker(config)
+    by_chars = ChunkReport(config.max_tokens)
+
+    for person in settings.persons:
+        text = load_text(person.cv_path)
+        by_chars.add(chunker.counter.count_many(chunk_text(text, max_chars=args.max_chars)))
+        chunker.chunk(text)
+
+    print(f"Tokenizer: {chunker.counter.name}, límite {config.max_tokens} tokens")
+    print(f"Por caracteres (max_chars={args.max_chars}): {by_chars.summary()}")
+    print(
+        f"Por tokens (overlap={config.overlap_tokens}): {chunker.report.summary()}"
+    )
+
+
+if __name__ == "__main__":
+    main()
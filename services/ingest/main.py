@@ -1,105 +1,423 @@
 # services/ingest/main.py
 from __future__ import annotations
 
+import argparse
 import pathlib
-from typing import List
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
-import nltk
-from nltk.tokenize import sent_tokenize
+import numpy as np
 
-from config import get_settings
-from services.rag.embeddings import embed_text
-from services.rag.vector_store import VectorStore, VectorStoreConfig
+from config import PersonConfig, Settings, get_settings
+from services.ingest.chunking import (
+    ChunkerConfig,
+    ChunkReport,
+    build_chunker,
+    chunker_config_from_settings,
+)
+from services.ingest.manifest import Manifest
+from services.ingest.pipeline import (
+    ChunkRecord,
+    MicroBatcher,
+    Pipeline,
+    PersonPlan,
+    SortedMicroBatcher,
+    discover_persons,
+)
+from services.rag.batching import UpsertStats
+from services.rag.chunk_store import ChunkTextStore, open_chunk_store
+from services.rag.index_version import bump_index_version
+from services.rag.profile_index import Profile, ProfileIndex, extract_profile
+from services.rag.embeddings import (
+    configure_embeddings,
+    embed_array,
+    embedding_dimension,
+    embedding_server,
+    get_embedding_cache,
+    model_identity,
+    set_torch_threads,
+)
+from services.rag.vector_store import create_vector_store, person_namespace
+from services.telemetry.exporters import configure_telemetry, flush_metrics
+from services.telemetry.tracing import span, trace
 
 
-nltk.download("punkt", quiet=True)
-
+def load_text(path: str) -> str:
+    p = pathlib.Path(path)
+    if not p.exists():
+        raise FileNotFoundError(f"No se encontró el archivo: {p.resolve()}")
+    return p.read_text(encoding="utf-8")
 
-def split_paragraphs(text: str) -> List[str]:
-    raw_paragraphs = text.split("\n\n")
-    return [p.strip() for p in raw_paragraphs if p.strip()]
 
+@dataclass
+class PreparedPerson:
+    person: PersonConfig
+    fingerprint: str
+    chunks: Optional[List[str]]  # None = el CV no cambió desde la última ingesta
+    chunk_tokens: Optional[List[int]] = None
+    # se extrae siempre (es barato): el índice de perfiles se reescribe entero
+    profile: Optional[Profile] = None
 
-def chunk_long_paragraph(paragraph: str, max_chars: int) -> List[str]:
-    if len(paragraph) <= max_chars:
-        return [paragraph]
 
-    sentences = sent_tokenize(paragraph, language="spanish")
-    chunks: List[str] = []
-    current = ""
+def chunk_person(
+    person: PersonConfig,
+    raw_text: str,
+    chunker_config: ChunkerConfig,
+    known_fingerprint: Optional[str] = None,
+) -> PreparedPerson:
+    fingerprint = Manifest.file_fingerprint(raw_text, person.name, chunker_config.fingerprint())
+    profile = extract_profile(person.id, person.name, raw_text)
+    if fingerprint == known_fingerprint:
+        return PreparedPerson(person, fingerprint, None, profile=profile)
+    chunks, tokens = build_chunker(chunker_config).chunk_with_tokens(raw_text)
+    return PreparedPerson(person, fingerprint, chunks, tokens, profile)
 
-    for sent in sentences:
-        candidate = (current + " " + sent).strip()
-        if len(candidate) <= max_chars:
-            current = candidate
-        else:
-            if current:
-                chunks.append(current)
-            current = sent
 
-    if current:
-        chunks.append(current)
+def prepare_person(
+    person: PersonConfig,
+    chunker_config: ChunkerConfig,
+    known_fingerprint: Optional[str] = None,
+) -> PreparedPerson:
+    """Carga y chunking de un CV; función de módulo para poder correr en un ProcessPool."""
+    return chunk_person(person, load_text(person.cv_path), chunker_config, known_fingerprint)
 
-    return chunks
 
+def prepare_in_pool(
+    pool: Executor,
+    persons: Iterable[PersonConfig],
+    chunker_config: ChunkerConfig,
+    known_fingerprint: Callable[[PersonConfig], Optional[str]],
+    max_in_flight: int,
+) -> Iterator[PreparedPerson]:
+    """
+    Manda cada CV al pool a medida que se descubre, con como mucho `max_in_flight`
+    en vuelo (igual que `VectorStore._run_batches`), y entrega cada resultado apenas
+    termina: el diff arranca sin esperar a que se descubran todos ni al CV más lento.
+    """
+    pending: Set[Future] = set()
+    for person in persons:
+        if len(pending) >= max_in_flight:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for f in done:
+                yield f.result()
+        pending.add(
+            pool.submit(prepare_person, person, chunker_config, known_fingerprint(person))
+        )
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for f in done:
+            yield f.result()
 
-def chunk_text(text: str, max_chars: int = 400) -> List[str]:
-    paragraphs = split_paragraphs(text)
-    all_chunks: List[str] = []
-    for p in paragraphs:
-        all_chunks.extend(chunk_long_paragraph(p, max_chars))
-    return [c.strip() for c in all_chunks if c.strip()]
 
+def _known_fingerprint(manifest: Manifest, person: PersonConfig, full: bool) -> Optional[str]:
+    if full:
+        return None
+    entry = manifest.persons.get(person.id)
+    return entry.file_hash if entry else None
 
-def load_text(path: str) -> str:
-    p = pathlib.Path(path)
-    if not p.exists():
-        raise FileNotFoundError(f"No se encontró el archivo: {p.resolve()}")
-    return p.read_text(encoding="utf-8")
 
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Ingesta incremental de CVs al índice vectorial.")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="ignora el manifest y vuelve a subir todos los chunks (igual borra los huérfanos)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=64,
+        help="chunks por micro-lote de embedding/upsert (default: 64)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="procesos para carga y chunking; >1 activa el modo paralelo (default: 1)",
+    )
+    parser.add_argument(
+        "--sort-window",
+        type=int,
+        default=8,
+        help="en modo paralelo, lotes que se juntan antes de ordenar por largo (default: 8)",
+    )
+    parser.add_argument(
+        "--torch-threads",
+        type=int,
+        default=0,
+        help="hilos de torch para el encoder (default: lo que decida torch)",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=4,
+        help="ítems máximos en cola entre etapas (default: 4)",
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="append",
+        default=[],
+        metavar="PERSON_ID",
+        help="borra los vectores de esa persona y la vuelve a subir entera (repetible)",
+    )
+    args = parser.parse_args(argv)
 
-def main() -> None:
     settings = get_settings()
+    configure_telemetry(settings)
+    with trace("ingest", full=args.full, workers=args.workers, batch_size=args.batch_size):
+        _ingest(args, settings)
+    flush_metrics()
 
-    all_ids: List[str] = []
-    all_vectors: List[List[float]] = []
-    all_metadatas: List[dict] = []
-
-    for person in settings.persons:
-        print(f"Ingestando CV de {person.name} desde {person.cv_path}...")
-        raw_text = load_text(person.cv_path)
-        chunks = chunk_text(raw_text, max_chars=2000)
-        print(f"  Chunks para {person.id}: {len(chunks)}")
-
-        embeddings = embed_text(chunks, model_name=settings.embedding_model_name)
-
-        ids = [f"{person.id}-chunk-{i}" for i in range(len(chunks))]
-        metadatas = [
-            {
-                "person_id": person.id,
-                "person_name": person.name,
-                "text": chunk,
-            }
-            for chunk in chunks
-        ]
-
-        all_ids.extend(ids)
-        all_vectors.extend(embeddings)
-        all_metadatas.extend(metadatas)
-
-    vs_config = VectorStoreConfig(
-        api_key=settings.pinecone_api_key,
-        index_name=settings.pinecone_index_name,
-        cloud=settings.pinecone_cloud,
-        region=settings.pinecone_region,
-        dimension=len(all_vectors[0]),
-    )
-    store = VectorStore(vs_config)
 
-    print("Subiendo todos los vectores al índice...")
-    store.upsert(all_ids, all_vectors, all_metadatas)
+def _ingest(args: argparse.Namespace, settings: Settings) -> None:
+    configure_embeddings(settings)
+
+    manifest = Manifest.load(settings.ingest_manifest_path, target=_manifest_target(settings))
+    chunk_store = open_chunk_store(settings)
+    if chunk_store is not None:
+        _check_chunk_store(chunk_store, manifest)
+    chunker_config = chunker_config_from_settings(settings)
+    chunk_report = ChunkReport(chunker_config.max_tokens)
+    plans: List[PersonPlan] = []
+    profiles: Dict[str, Profile] = {}
+    stores: List[Any] = []  # el store se crea con el primer lote (ahí se conoce la dimensión)
+    upsert_stats = UpsertStats()
+
+    def get_store(dimension: Optional[int] = None) -> Any:
+        if not stores:
+            dimension = dimension or embedding_dimension(settings.embedding_model_name)
+            stores.append(create_vector_store(settings, dimension=dimension))
+        return stores[0]
+
+    for person_id in args.rebuild:
+        _drop_person(get_store(), chunk_store, settings, manifest, person_id)
+
+    def load_stage(person: PersonConfig) -> Iterator[Tuple[PersonConfig, str]]:
+        yield person, load_text(person.cv_path)
+
+    def chunk_stage(item: Tuple[PersonConfig, str]) -> Iterator[ChunkRecord]:
+        person, raw_text = item
+        prepared = chunk_person(
+            person,
+            raw_text,
+            chunker_config,
+            _known_fingerprint(manifest, person, args.full),
+        )
+        yield from diff_stage(prepared)
+
+    def diff_stage(prepared: PreparedPerson) -> Iterator[ChunkRecord]:
+        person = prepared.person
+        if prepared.profile is not None:
+            profiles[person.id] = prepared.profile
+        if prepared.chunks is None:
+            print(f"Sin cambios en el CV de {person.name}, se omite.")
+            return
+
+        chunks = prepared.chunks
+        tokens_by_text = dict(zip(chunks, prepared.chunk_tokens or []))
+        chunk_report.add(prepared.chunk_tokens or [])
+        diff, chunk_hashes = manifest.diff_person(
+            person.id, chunks, salt=person.name, force=args.full
+        )
+        print(
+            f"{person.name}: {len(chunks)} chunks "
+            f"({len(diff.upserts)} a subir, {diff.unchanged} sin cambios, {len(diff.deletes)} a borrar)"
+        )
+        plans.append(PersonPlan(person.id, prepared.fingerprint, chunk_hashes, diff.deletes))
+
+        for chunk_id, chunk in diff.upserts:
+            if chunk_store is not None:
+                # el texto va al store local: el índice sólo lleva lo que filtra
+                metadata: Dict[str, Any] = {"person_id": person.id}
+            else:
+                metadata = {
+                    "person_id": person.id,
+                    "person_name": person.name,
+                    "text": chunk,
+                    "tokens": tokens_by_text.get(chunk, 0),
+                }
+            yield ChunkRecord(id=chunk_id, text=chunk, metadata=metadata)
+
+    if args.workers > 1:
+        # lotes grandes ordenados por largo: menos padding por lote en el encoder
+        batcher: Any = SortedMicroBatcher(
+            args.batch_size,
+            window_batches=args.sort_window,
+            key=lambda r: len(r.text),
+        )
+    else:
+        batcher = MicroBatcher(args.batch_size)
+    if args.torch_threads:
+        set_torch_threads(args.torch_threads)
+
+    def embed(batch: List[ChunkRecord]) -> Tuple[List[ChunkRecord], np.ndarray]:
+        # cada ChunkRecord lleva su id y metadata, así el vector vuelve a su dueño;
+        # los vectores viajan como una matriz float32 (n, dim) hasta el store
+        vectors = embed_array(
+            [r.text for r in batch],
+            model_name=settings.embedding_model_name,
+            batch_size=args.batch_size,
+        )
+        return batch, vectors
+
+    def embed_stage(record: ChunkRecord) -> Iterator[Tuple[List[ChunkRecord], np.ndarray]]:
+        for batch in batcher.add(record):
+            yield embed(batch)
+
+    def embed_flush() -> Iterator[Tuple[List[ChunkRecord], np.ndarray]]:
+        for batch in batcher.flush():
+            yield embed(batch)
+
+    def upsert_stage(item: Tuple[List[ChunkRecord], np.ndarray]) -> List[ChunkRecord]:
+        records, vectors = item
+        store = get_store(vectors.shape[1])
+        # un lote puede mezclar personas: cada una va a su namespace
+        rows_by_person: Dict[str, List[int]] = {}
+        for row, r in enumerate(records):
+            rows_by_person.setdefault(r.metadata["person_id"], []).append(row)
+        if chunk_store is not None:
+            # antes que los vectores: una consulta nunca ve un id sin su texto
+            chunk_store.put_many((r.id, r.metadata["person_id"], r.text) for r in records)
+        with span("vector.upsert", items=len(records), namespaces=len(rows_by_person)):
+            for person_id, rows in rows_by_person.items():
+                stats = store.upsert(
+                    [records[i].id for i in rows],
+                    vectors if len(rows) == len(records) else vectors[rows],
+                    [records[i].metadata for i in rows],
+                    namespace=person_namespace(settings, person_id),
+                )
+                upsert_stats.add_batch(stats.items, stats.bytes)
+        return records
+
+    pipeline = Pipeline(queue_size=args.queue_size)
+    if args.workers > 1:
+        # carga + chunking de cada CV en un pool de procesos; el diff queda en este proceso
+        pool = ProcessPoolExecutor(max_workers=args.workers)
+        source: Iterable[Any] = prepare_in_pool(
+            pool,
+            discover_persons(settings.persons),
+            chunker_config,
+            lambda p: _known_fingerprint(manifest, p, args.full),
+            max_in_flight=2 * args.workers,
+        )
+        pipeline.stage("diff", diff_stage)
+        source_name = "prepare"
+    else:
+        pool = None
+        source = discover_persons(settings.persons)
+        pipeline.stage("load", load_stage).stage("chunk", chunk_stage)
+        source_name = "discover"
+    pipeline.stage("embed", embed_stage, flush=embed_flush).stage("upsert", upsert_stage)
+
+    try:
+        stage_stats = pipeline.run(source_name, source)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    if upsert_stats.items:
+        print(f"Upsert: {upsert_stats.finish().summary()}")
+
+    deletes: Dict[str, List[str]] = {plan.person_id: plan.deletes for plan in plans if plan.deletes}
+    orphaned = manifest.orphaned_persons([p.id for p in settings.persons])
+
+    if settings.profile_index_path and ProfileIndex(settings.profile_index_path).save(profiles):
+        print(f"Perfiles actualizados en {settings.profile_index_path} ({len(profiles)} personas).")
+
+    if not plans and not deletes and not orphaned and not args.rebuild:
+        print("El índice ya está al día.")
+        return
+    if deletes:
+        count = sum(len(ids) for ids in deletes.values())
+        print(f"Borrando {count} vectores huérfanos...")
+        delete_stats = UpsertStats()
+        with span("ingest.delete", ids=count):
+            for person_id, ids in deletes.items():
+                stats = get_store().delete(ids, namespace=person_namespace(settings, person_id))
+                delete_stats.add_batch(stats.items, stats.bytes)
+                if chunk_store is not None:
+                    chunk_store.delete(ids)
+        print(f"  Delete: {delete_stats.finish().summary()}")
+    for person_id, ids in orphaned.items():
+        print(f"Persona {person_id} ya no está configurada: se borran {len(ids)} chunks.")
+        _drop_person(get_store(), chunk_store, settings, manifest, person_id)
+
+    # el manifest se actualiza sólo después de aplicar (y persistir) los cambios en el índice
+    if stores:
+        with span("vector.flush"):
+            stores[0].flush()
+    for plan in plans:
+        manifest.record(plan.person_id, plan.fingerprint, plan.chunk_hashes)
+    manifest.save(settings.ingest_manifest_path)
+    if upsert_stats.items or deletes or orphaned or args.rebuild:
+        # invalida los caches de respuestas construidos sobre el contenido anterior
+        bump_index_version(settings.index_version_path)
+
+    if chunk_report.chunks:
+        print(f"Chunks (límite {chunker_config.max_tokens} tokens): {chunk_report.summary()}")
+    print("Etapas:")
+    for st in stage_stats:
+        print(f"  {st.summary()}")
+    client = embedding_server()
+    if client is None:
+        cache_stats = get_embedding_cache(settings.embedding_model_name).stats
+        print(
+            f"Cache de embeddings: {cache_stats.hits} hits, {cache_stats.misses} misses "
+            f"({cache_stats.hit_rate:.0%} hit rate)"
+        )
+    else:
+        print(f"Embeddings calculados por el servidor en {client.socket_path}")
     print("Ingesta multi-persona completa.")
 
 
+def _drop_person(
+    store: Any,
+    chunk_store: Optional[ChunkTextStore],
+    settings: Settings,
+    manifest: Manifest,
+    person_id: str,
+) -> None:
+    """Saca a una persona del índice: con namespaces, una sola operación sobre el suyo."""
+    namespace = person_namespace(settings, person_id)
+    with span("ingest.drop_person", namespaced=namespace is not None):
+        if namespace is not None:
+            store.delete_namespace(namespace)
+        else:
+            entry = manifest.persons.get(person_id)
+            if entry is not None and entry.chunks:
+                store.delete(list(entry.chunks))
+        if chunk_store is not None:
+            chunk_store.delete_person(person_id)
+    manifest.forget(person_id)
+
+
+def _check_chunk_store(chunk_store: ChunkTextStore, manifest: Manifest) -> None:
+    """Si el store de textos no tiene los chunks que el manifest da por subidos, se re-suben."""
+    counts = chunk_store.counts_by_person()
+    for person_id, entry in list(manifest.persons.items()):
+        if counts.get(person_id, 0) != len(entry.chunks):
+            print(f"Faltan textos de {person_id} en {chunk_store.path}: se vuelve a subir entera.")
+            # se conservan los ids (para borrar los que sobren) pero ningún hash coincide
+            manifest.record(person_id, "", {cid: "" for cid in entry.chunks})
+
+
+def _manifest_target(settings: Settings) -> str:
+    index = (
+        settings.local_index_dir
+        if settings.vector_backend == "local"
+        else settings.pinecone_index_name
+    )
+    # un backend con otra numérica (p. ej. int8) produce otros vectores: re-ingesta completa
+    model = model_identity(settings.embedding_model_name, settings.embedding_backend)
+    target = f"{settings.vector_backend}:{index}:{model}"
+    # los vectores viven en otro lugar según el modo de namespaces (ver migrate_namespaces)
+    if settings.vector_namespaces == "person":
+        target += ":ns=person"
+    # con el texto fuera del índice, la metadata de los vectores es otra
+    if settings.chunk_store_path:
+        target += ":text=local"
+    return target
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,136 @@
+# services/ingest/manifest.py
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pathlib
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+
+MANIFEST_FORMAT = 1
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_id(person_id: str, text: str) -> str:
+    """
+    Id estable de un chunk: depende del contenido y no de su posición, así que
+    insertar un párrafo al principio del CV no renombra todos los chunks siguientes.
+    """
+    return f"{person_id}-{content_hash(text)[:16]}"
+
+
+@dataclass
+class PersonManifest:
+    file_hash: str
+    # chunk_id -> hash del contenido del chunk
+    chunks: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class PersonDiff:
+    person_id: str
+    # (chunk_id, texto) de los chunks nuevos o modificados
+    upserts: List[Tuple[str, str]] = field(default_factory=list)
+    # ids que ya no existen en el CV actual
+    deletes: List[str] = field(default_factory=list)
+    unchanged: int = 0
+
+
+@dataclass
+class Manifest:
+    """
+    Registro local de lo que hay en el índice: por persona, el hash del archivo
+    (incluyendo la configuración de chunking) y el hash de cada chunk por id.
+
+    `target` identifica el índice al que corresponde (backend + nombre + modelo);
+    si cambia, el manifest anterior no sirve y se descarta.
+    """
+
+    target: str
+    persons: Dict[str, PersonManifest] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: str, target: str) -> "Manifest":
+        p = pathlib.Path(path)
+        if not p.exists():
+            return cls(target=target)
+        data = json.loads(p.read_text(encoding="utf-8"))
+        if data.get("format") != MANIFEST_FORMAT or data.get("target") != target:
+            return cls(target=target)
+        persons = {
+            pid: PersonManifest(file_hash=entry["file_hash"], chunks=dict(entry["chunks"]))
+            for pid, entry in data.get("persons", {}).items()
+        }
+        return cls(target=target, persons=persons)
+
+    def save(self, path: str) -> None:
+        p = pathlib.Path(path)
+        p.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "format": MANIFEST_FORMAT,
+            "target": self.target,
+            "persons": {
+                pid: {"file_hash": entry.file_hash, "chunks": entry.chunks}
+                for pid, entry in self.persons.items()
+            },
+        }
+        tmp = p.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding="utf-8")
+        os.replace(tmp, p)
+
+    def diff_person(
+        self,
+        person_id: str,
+        chunks: List[str],
+        salt: str = "",
+        force: bool = False,
+    ) -> Tuple[PersonDiff, Dict[str, str]]:
+        """
+        Compara los chunks actuales con los registrados, emparejándolos por `chunk_id`
+        (o sea, por contenido). Devuelve el diff y el nuevo mapa id -> hash, que se
+        guarda con `record` una vez aplicado el diff. `salt` entra en el hash de cada
+        chunk (p. ej. el nombre que va en la metadata). Los chunks repetidos se suben
+        una sola vez.
+        """
+        previous = self.persons.get(person_id)
+        old_chunks = previous.chunks if previous else {}
+
+        diff = PersonDiff(person_id=person_id)
+        new_chunks: Dict[str, str] = {}
+        for text in chunks:
+            cid = chunk_id(person_id, text)
+            if cid in new_chunks:
+                continue
+            h = content_hash(f"{salt}\x00{text}")
+            new_chunks[cid] = h
+            if not force and old_chunks.get(cid) == h:
+                diff.unchanged += 1
+            else:
+                diff.upserts.append((cid, text))
+
+        diff.deletes = [cid for cid in old_chunks if cid not in new_chunks]
+        return diff, new_chunks
+
+    def orphaned_persons(self, active_ids: List[str]) -> Dict[str, List[str]]:
+        """Personas registradas que ya no están en la configuración, con sus ids."""
+        return {
+            pid: list(entry.chunks)
+            for pid, entry in self.persons.items()
+            if pid not in active_ids
+        }
+
+    def record(self, person_id: str, file_hash: str, chunks: Dict[str, str]) -> None:
+        self.persons[person_id] = PersonManifest(file_hash=file_hash, chunks=chunks)
+
+    def forget(self, person_id: str) -> None:
+        self.persons.pop(person_id, None)
+
+    @staticmethod
+    def file_fingerprint(raw_text: str, *extra: Optional[str]) -> str:
+        """Hash del archivo más todo lo que cambia sus chunks o su metadata."""
+        return content_hash("\x00".join([raw_text, *[e or "" for e in extra]]))
@@ -0,0 +1,105 @@
+# services/ingest/migrate_namespaces.py
+from __future__ import annotations
+
+import argparse
+from dataclasses import replace
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from config import get_settings
+from services.ingest.main import _manifest_target
+from services.ingest.manifest import Manifest
+from services.rag.batching import UpsertStats, iter_count_batches
+from services.rag.embeddings import configure_embeddings, embedding_dimension
+from services.rag.index_version import bump_index_version
+from services.rag.vector_store import create_vector_store
+from services.telemetry.tracing import span
+
+
+def migrate(
+    store: Any,
+    batch_size: int = 500,
+    dry_run: bool = False,
+    keep_source: bool = False,
+) -> Dict[str, int]:
+    """
+    Mueve los vectores del namespace por defecto al namespace de su `person_id`.
+    Lee por lotes (ids → fetch), escribe por persona y recién después borra el origen,
+    así una corrida cortada se puede repetir sin perder vectores.
+    Devuelve {namespace: vectores movidos}; los que no tienen `person_id` quedan en "".
+    """
+    moved: Dict[str, int] = {}
+    stats = UpsertStats()
+    # se listan todos los ids antes de borrar: paginar mientras se borra saltea ids
+    source_ids = list(store.list_ids(None))
+    for batch in iter_count_batches(source_ids, batch_size):
+        found = store.fetch(batch)
+        groups: Dict[str, List[str]] = {}
+        for _id, (_, meta) in found.items():
+            groups.setdefault(meta.get("person_id") or "", []).append(_id)
+        unowned = groups.pop("", [])
+        if unowned:
+            moved[""] = moved.get("", 0) + len(unowned)
+
+        for person_id, ids in groups.items():
+            moved[person_id] = moved.get(person_id, 0) + len(ids)
+            if dry_run:
+                continue
+            vectors = np.asarray([found[i][0] for i in ids], dtype=np.float32)
+            with span("migrate.upsert", items=len(ids)):
+                result = store.upsert(ids, vectors, [found[i][1] for i in ids], namespace=person_id)
+            stats.add_batch(result.items, result.bytes)
+            if not keep_source:
+                store.delete(ids)
+    if stats.items:
+        print(f"Upsert: {stats.finish().summary()}")
+    return moved
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Migra un índice plano (filtrado por person_id) a un namespace por persona."
+    )
+    parser.add_argument("--dry-run", action="store_true", help="sólo cuenta lo que se movería")
+    parser.add_argument(
+        "--keep-source",
+        action="store_true",
+        help="no borra los vectores del namespace por defecto después de copiarlos",
+    )
+    parser.add_argument("--batch-size", type=int, default=500, help="ids por lote (default: 500)")
+    args = parser.parse_args(argv)
+
+    settings = get_settings()
+    configure_embeddings(settings)
+    store = create_vector_store(settings, dimension=embedding_dimension(settings.embedding_model_name))
+
+    moved = migrate(store, args.batch_size, dry_run=args.dry_run, keep_source=args.keep_source)
+    store.flush()
+    unowned = moved.pop("", 0)
+    for person_id, count in sorted(moved.items()):
+        print(f"  {person_id}: {count} vectores")
+    if unowned:
+        print(f"  {unowned} vectores sin person_id quedan en el namespace por defecto")
+    if args.dry_run:
+        print(f"Se moverían {sum(moved.values())} vectores (dry run, sin cambios).")
+        return
+
+    # el manifest sigue valiendo (mismos ids y chunks): se pasa al target con namespaces
+    # para que la próxima ingesta siga siendo incremental
+    flat = Manifest.load(
+        settings.ingest_manifest_path,
+        target=_manifest_target(replace(settings, vector_namespaces="none")),
+    )
+    if flat.persons:
+        flat.target = _manifest_target(replace(settings, vector_namespaces="person"))
+        flat.save(settings.ingest_manifest_path)
+    if moved:
+        bump_index_version(settings.index_version_path)
+    print(f"Migración completa: {sum(moved.values())} vectores en {len(moved)} namespaces.")
+    if settings.vector_namespaces != "person":
+        print("Para consultarlos, definir VECTOR_NAMESPACES=person.")
+
+
+if __name__ == "__main__":
+    main()
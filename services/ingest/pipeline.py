@@ -0,0 +1,268 @@
+# services/ingest/pipeline.py
+from __future__ import annotations
+
+import pathlib
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config import PersonConfig
+from services.telemetry.tracing import run_in_context, span
+
+
+_DONE = object()
+
+Handler = Callable[[Any], Iterable[Any]]
+Flush = Callable[[], Iterable[Any]]
+
+
+class _Cancelled(Exception):
+    pass
+
+
+@dataclass
+class StageStats:
+    name: str
+    items_in: int = 0
+    items_out: int = 0
+    busy_s: float = 0.0
+    started_at: float = 0.0
+    finished_at: float = 0.0
+
+    @property
+    def wall_s(self) -> float:
+        return max(self.finished_at - self.started_at, 0.0)
+
+    def summary(self) -> str:
+        rate = self.items_out / self.busy_s if self.busy_s > 0 else 0.0
+        return (
+            f"{self.name:<8} in={self.items_in:<6} out={self.items_out:<6} "
+            f"ocupado={self.busy_s:6.2f}s total={self.wall_s:6.2f}s ({rate:.0f} items/s)"
+        )
+
+
+@dataclass
+class ChunkRecord:
+    id: str
+    text: str
+    metadata: Dict
+
+
+@dataclass
+class PersonPlan:
+    """Lo que la etapa de chunking decidió para una persona (se aplica al manifest al final)."""
+
+    person_id: str
+    fingerprint: str
+    chunk_hashes: Dict[str, str]
+    deletes: List[str] = field(default_factory=list)
+
+
+class Pipeline:
+    """
+    Ejecuta etapas encadenadas en hilos conectados por colas acotadas:
+    la fuente produce ítems y cada etapa los transforma en 0..n ítems para la siguiente.
+    Con colas acotadas, la memoria en vuelo es `queue_size × tamaño de ítem` por etapa,
+    independiente del tamaño del corpus.
+    """
+
+    def __init__(self, queue_size: int = 8) -> None:
+        self._queue_size = queue_size
+        self._stages: List[Tuple[str, Handler, Optional[Flush]]] = []
+        self._cancel = threading.Event()
+        self._errors: List[BaseException] = []
+        self.stats: List[StageStats] = []
+
+    def stage(
+        self,
+        name: str,
+        handler: Handler,
+        flush: Optional[Flush] = None,
+    ) -> "Pipeline":
+        """`handler(item)` devuelve los ítems de salida; `flush()` emite lo pendiente al cerrar."""
+        self._stages.append((name, handler, flush))
+        return self
+
+    def _put(self, q: queue.Queue, item: Any) -> None:
+        while True:
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                if self._cancel.is_set():
+                    raise _Cancelled()
+
+    def _emit(self, outputs: Iterable[Any], outbox: Optional[queue.Queue], stats: StageStats) -> None:
+        iterator = iter(outputs)
+        while True:
+            t0 = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                stats.busy_s += time.perf_counter() - t0
+                return
+            stats.busy_s += time.perf_counter() - t0
+            stats.items_out += 1
+            if outbox is not None:
+                self._put(outbox, item)
+
+    def _run_source(self, stats: StageStats, source: Iterable[Any], outbox: queue.Queue) -> None:
+        stats.started_at = time.perf_counter()
+        with span(f"ingest.{stats.name}") as s:
+            try:
+                self._emit(source, outbox, stats)
+            except _Cancelled:
+                pass
+            except BaseException as exc:
+                self._fail(exc)
+            finally:
+                stats.finished_at = time.perf_counter()
+                s.set(items_out=stats.items_out, busy_ms=round(stats.busy_s * 1000.0, 1))
+                self._close(outbox)
+
+    def _run_stage(
+        self,
+        stats: StageStats,
+        handler: Handler,
+        flush: Optional[Flush],
+        inbox: queue.Queue,
+        outbox: Optional[queue.Queue],
+    ) -> None:
+        stats.started_at = time.perf_counter()
+        upstream_done = False
+        # un span por etapa (no por ítem): ocupado vs. total muestra dónde está el cuello
+        with span(f"ingest.{stats.name}") as s:
+            try:
+                while True:
+                    item = inbox.get()
+                    if item is _DONE:
+                        upstream_done = True
+                        break
+                    if self._cancel.is_set():
+                        continue  # drenamos la cola para no bloquear a la etapa anterior
+                    stats.items_in += 1
+                    self._emit(handler(item), outbox, stats)
+                if flush is not None and not self._cancel.is_set():
+                    self._emit(flush(), outbox, stats)
+            except _Cancelled:
+                pass
+            except BaseException as exc:
+                self._fail(exc)
+                # seguimos drenando hasta el _DONE de la etapa anterior
+                while not upstream_done:
+                    upstream_done = inbox.get() is _DONE
+            finally:
+                stats.finished_at = time.perf_counter()
+                s.set(
+                    items_in=stats.items_in,
+                    items_out=stats.items_out,
+                    busy_ms=round(stats.busy_s * 1000.0, 1),
+                )
+                if outbox is not None:
+                    self._close(outbox)
+
+    def _fail(self, exc: BaseException) -> None:
+        self._errors.append(exc)
+        self._cancel.set()
+
+    def _close(self, q: queue.Queue) -> None:
+        # el _DONE siempre se entrega, aunque haya cancelación
+        q.put(_DONE)
+
+    def run(self, source_name: str, source: Iterable[Any]) -> List[StageStats]:
+        queues = [queue.Queue(maxsize=self._queue_size) for _ in self._stages]
+        source_stats = StageStats(name=source_name)
+        self.stats.append(source_stats)
+        threads = [
+            threading.Thread(
+                target=run_in_context(self._run_source),
+                args=(source_stats, source, queues[0]),
+                name=f"ingest-{source_name}",
+            )
+        ]
+        for i, (name, handler, flush) in enumerate(self._stages):
+            stats = StageStats(name=name)
+            self.stats.append(stats)
+            outbox = queues[i + 1] if i + 1 < len(queues) else None
+            threads.append(
+                threading.Thread(
+                    target=run_in_context(self._run_stage),
+                    args=(stats, handler, flush, queues[i], outbox),
+                    name=f"ingest-{name}",
+                )
+            )
+
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        if self._errors:
+            raise self._errors[0]
+        return self.stats
+
+
+def discover_persons(persons: Iterable[PersonConfig]) -> Iterator[PersonConfig]:
+    """Etapa fuente: personas configuradas cuyo CV existe en disco."""
+    for person in persons:
+        if not pathlib.Path(person.cv_path).exists():
+            raise FileNotFoundError(
+                f"No se encontró el archivo: {pathlib.Path(person.cv_path).resolve()}"
+            )
+        yield person
+
+
+class MicroBatcher:
+    """Acumula ítems y los libera en lotes de `batch_size` (el resto, en `flush`)."""
+
+    def __init__(self, batch_size: int) -> None:
+        self._batch_size = max(batch_size, 1)
+        self._pending: List[Any] = []
+
+    def add(self, item: Any) -> Iterator[List[Any]]:
+        self._pending.append(item)
+        if len(self._pending) >= self._batch_size:
+            batch, self._pending = self._pending, []
+            yield batch
+
+    def flush(self) -> Iterator[List[Any]]:
+        if self._pending:
+            batch, self._pending = self._pending, []
+            yield batch
+
+
+class SortedMicroBatcher:
+    """
+    Como MicroBatcher, pero junta `window_batches` lotes, los ordena por `key`
+    (p. ej. largo del texto) y emite lotes llenos de ítems de tamaño parecido.
+    La memoria sigue acotada a `batch_size × window_batches` ítems.
+    """
+
+    def __init__(
+        self,
+        batch_size: int,
+        window_batches: int = 8,
+        key: Callable[[Any], Any] = len,
+    ) -> None:
+        self._batch_size = max(batch_size, 1)
+        self._window = self._batch_size * max(window_batches, 1)
+        self._key = key
+        self._pending: List[Any] = []
+
+    def add(self, item: Any) -> Iterator[List[Any]]:
+        self._pending.append(item)
+        if len(self._pending) < self._window:
+            return
+        self._pending.sort(key=self._key)
+        full = len(self._pending) - len(self._pending) % self._batch_size
+        ready, self._pending = self._pending[:full], self._pending[full:]
+        for i in range(0, full, self._batch_size):
+            yield ready[i : i + self._batch_size]
+
+    def flush(self) -> Iterator[List[Any]]:
+        self._pending.sort(key=self._key)
+        pending, self._pending = self._pending, []
+        for i in range(0, len(pending), self._batch_size):
+            yield pending[i : i + self._batch_size]
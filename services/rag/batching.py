@@ -0,0 +1,148 @@
+# services/rag/batching.py
+from __future__ import annotations
+
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+
+T = TypeVar("T")
+
+# bytes aproximados por float serializado en JSON ("-0.0123456789,")
+_BYTES_PER_FLOAT = 14
+
+
+@dataclass
+class UpsertStats:
+    """Progreso y rendimiento de una operación por lotes (upsert / delete)."""
+
+    items: int = 0
+    batches: int = 0
+    bytes: int = 0
+    retries: int = 0
+    started_at: float = field(default_factory=time.perf_counter)
+    finished_at: Optional[float] = None
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add_batch(self, items: int, size_bytes: int) -> None:
+        with self._lock:
+            self.items += items
+            self.batches += 1
+            self.bytes += size_bytes
+
+    def add_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    def finish(self) -> "UpsertStats":
+        self.finished_at = time.perf_counter()
+        return self
+
+    @property
+    def seconds(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return end - self.started_at
+
+    @property
+    def items_per_s(self) -> float:
+        return self.items / self.seconds if self.seconds > 0 else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.items} items en {self.batches} lotes, "
+            f"{self.bytes / 1e6:.1f} MB, {self.seconds:.2f}s "
+            f"({self.items_per_s:.0f} items/s, {self.retries} reintentos)"
+        )
+
+
+def estimate_record_bytes(_id: str, values: Any, metadata: Dict) -> int:
+    """Tamaño aproximado del registro serializado, para no pasar el límite por request."""
+    return (
+        len(_id)
+        + len(values) * _BYTES_PER_FLOAT
+        + len(json.dumps(metadata, ensure_ascii=False).encode("utf-8"))
+        + 48
+    )
+
+
+def iter_size_batches(
+    records: Iterable[T],
+    size_of: Callable[[T], int],
+    max_items: int,
+    max_bytes: int,
+) -> Iterator[List[T]]:
+    """Agrupa `records` en lotes que no superan `max_items` ni `max_bytes`."""
+    batch: List[T] = []
+    batch_bytes = 0
+    for record in records:
+        size = size_of(record)
+        if batch and (len(batch) >= max_items or batch_bytes + size > max_bytes):
+            yield batch
+            batch, batch_bytes = [], 0
+        batch.append(record)
+        batch_bytes += size
+    if batch:
+        yield batch
+
+
+def iter_count_batches(items: Iterable[T], max_items: int) -> Iterator[List[T]]:
+    batch: List[T] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= max_items:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# errores de transporte de urllib3/httpx (los usan los SDKs), reconocidos sin importarlos
+_TRANSIENT_ERROR_NAMES = {
+    "ProtocolError",
+    "NewConnectionError",
+    "MaxRetryError",
+    "ReadTimeoutError",
+    "ConnectTimeoutError",
+    "ConnectError",
+    "ReadTimeout",
+    "RemoteProtocolError",
+}
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """
+    429, 5xx, timeouts y errores de conexión. Un 4xx, un error de validación o de
+    autenticación no cambia reintentando: se propaga enseguida.
+    """
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    # Pinecone expone `status`; Groq/httpx, `status_code`
+    status = getattr(exc, "status", None) or getattr(exc, "status_code", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return any(cls.__name__ in _TRANSIENT_ERROR_NAMES for cls in type(exc).__mro__)
+
+
+def call_with_retries(
+    fn: Callable[[], T],
+    max_retries: int = 3,
+    backoff_base_s: float = 0.5,
+    backoff_max_s: float = 8.0,
+    on_retry: Optional[Callable[[BaseException], None]] = None,
+    retryable: Callable[[BaseException], bool] = is_transient_error,
+) -> T:
+    """Reintenta `fn` con backoff exponencial + jitter, sólo ante errores `retryable`."""
+    attempt = 0
+    while True:
+        try:
+            return fn()
+        except Exception as exc:
+            if attempt >= max_retries or not retryable(exc):
+                raise
+            if on_retry is not None:
+                on_retry(exc)
+            time.sleep(random.uniform(0, min(backoff_max_s, backoff_base_s * (2**attempt))))
+            attempt += 1
@@ -1,12 +1,13 @@
 # services/rag/chatbot.py
 from __future__ import annotations
 
-from dataclasses import dataclass
-from typing import Dict, List, Tuple
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
 
-from groq import Groq
-
-from services.rag.embeddings import embed_text
+from services.rag.chunk_store import ChunkTextStore, chunk_texts
+from services.rag.context_packing import PackingConfig, pack_context
+from services.rag.embeddings import embed_array
+from services.rag.llm_client import LLMClient, LLMClientConfig
 from services.rag.vector_store import VectorStore
 
 
@@ -24,16 +25,30 @@ class RAGChatbot:
     embedding_model_name: str
     top_k: int = 4
     llm_model_name: str = "llama-3.1-8b-instant"
+    llm_client: Optional[LLMClient] = None
+    packing: PackingConfig = field(default_factory=PackingConfig)
+    # namespace de la persona (VECTOR_NAMESPACES=person); None = índice plano
+    namespace: Optional[str] = None
+    chunk_store: Optional[ChunkTextStore] = None
+
+    def __post_init__(self) -> None:
+        # cliente reutilizable (pool de conexiones) en lugar de un Groq() por pregunta
+        if self.llm_client is None:
+            self.llm_client = LLMClient(
+                LLMClientConfig(api_key=self.groq_api_key, model_name=self.llm_model_name)
+            )
 
     def _retrieve(self, question: str) -> List[RetrievedChunk]:
-        query_vec = embed_text(question, model_name=self.embedding_model_name)
-        matches = self.vector_store.query(query_vec, top_k=self.top_k)
+        query_vec = embed_array(question, model_name=self.embedding_model_name)
+        matches = self.vector_store.query(query_vec, top_k=self.top_k, namespace=self.namespace)
 
-        chunks: List[RetrievedChunk] = []
-        for _id, score, meta in matches:
-            text = meta.get("text", "")
-            chunks.append(RetrievedChunk(id=_id, score=score, text=text))
-        return chunks
+        texts = chunk_texts(self.chunk_store, matches)
+        chunks = [
+            RetrievedChunk(id=_id, score=score, text=texts.get(_id, ""))
+            for _id, score, _ in matches
+        ]
+        packed, _ = pack_context(chunks, self.packing)
+        return packed
 
     def _build_prompt(
         self,
@@ -72,16 +87,28 @@ Instrucciones:
         chunks = self._retrieve(question)
         system_prompt, user_prompt = self._build_prompt(question, chunks)
 
-        client = Groq(api_key=self.groq_api_key)
-
-        completion = client.chat.completions.create(
-            model=self.llm_model_name,
-            messages=[
+        answer = self.llm_client.chat(
+            [
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt},
             ],
-            temperature=0.2,
+            model=self.llm_model_name,
         )
-
-        answer = completion.choices[0].message.content
         return answer, chunks
+
+    def stream_answer(
+        self,
+        question: str,
+    ) -> Tuple[Iterator[str], List[RetrievedChunk]]:
+        """Devuelve el contexto recuperado y un iterador con la respuesta en fragmentos."""
+        chunks = self._retrieve(question)
+        system_prompt, user_prompt = self._build_prompt(question, chunks)
+
+        stream = self.llm_client.stream_chat(
+            [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            model=self.llm_model_name,
+        )
+        return stream, chunks
@@ -0,0 +1,120 @@
+# services/rag/chunk_store.py
+from __future__ import annotations
+
+import pathlib
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from services.telemetry.tracing import span
+
+
+# SQLite limita los parámetros por sentencia (999 en versiones viejas)
+_MAX_PARAMS = 900
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    id        TEXT PRIMARY KEY,
+    person_id TEXT NOT NULL,
+    text      TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS chunks_person ON chunks (person_id);
+"""
+
+
+class ChunkTextStore:
+    """
+    Texto de los chunks, guardado al lado del índice y indexado por id de chunk.
+
+    El índice vectorial sólo lleva `person_id` en la metadata: las consultas devuelven
+    ids y scores, y el texto se lee de acá en una sola consulta por pregunta.
+    Una conexión por hilo; WAL permite leer mientras el ingest escribe.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        pathlib.Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def put_many(self, rows: Iterable[Tuple[str, str, str]]) -> int:
+        """Guarda (id, person_id, texto); un id existente se reemplaza."""
+        rows = list(rows)
+        with span("chunks.put", items=len(rows)), self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO chunks (id, person_id, text) VALUES (?, ?, ?)", rows
+            )
+        return len(rows)
+
+    def get_many(self, ids: Iterable[str]) -> Dict[str, str]:
+        """{id: texto} de los ids que estén guardados."""
+        ids = list(dict.fromkeys(ids))
+        found: Dict[str, str] = {}
+        with span("chunks.get", ids=len(ids)) as s:
+            conn = self._connect()
+            for start in range(0, len(ids), _MAX_PARAMS):
+                batch = ids[start : start + _MAX_PARAMS]
+                marks = ",".join("?" * len(batch))
+                found.update(
+                    conn.execute(f"SELECT id, text FROM chunks WHERE id IN ({marks})", batch)
+                )
+            s.set(found=len(found))
+        return found
+
+    def delete(self, ids: Iterable[str]) -> None:
+        ids = list(ids)
+        with self._connect() as conn:
+            for start in range(0, len(ids), _MAX_PARAMS):
+                batch = ids[start : start + _MAX_PARAMS]
+                marks = ",".join("?" * len(batch))
+                conn.execute(f"DELETE FROM chunks WHERE id IN ({marks})", batch)
+
+    def delete_person(self, person_id: str) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM chunks WHERE person_id = ?", (person_id,))
+
+    def counts_by_person(self) -> Dict[str, int]:
+        return dict(
+            self._connect().execute("SELECT person_id, COUNT(*) FROM chunks GROUP BY person_id")
+        )
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def open_chunk_store(settings: Any) -> Optional[ChunkTextStore]:
+    """Store de textos configurado en `CHUNK_STORE_PATH`; vacío = el texto va en la metadata."""
+    if not settings.chunk_store_path:
+        return None
+    return ChunkTextStore(settings.chunk_store_path)
+
+
+def chunk_texts(
+    store: Optional[ChunkTextStore],
+    matches: List[Tuple[str, float, Dict]],
+) -> Dict[str, str]:
+    """
+    Texto de cada match: de la metadata si viene (índices viejos) y, para el resto,
+    del store local en una sola lectura.
+    """
+    texts = {_id: meta.get("text", "") for _id, _, meta in matches}
+    missing = [_id for _id, text in texts.items() if not text]
+    if missing and store is not None:
+        texts.update(store.get_many(missing))
+    return texts
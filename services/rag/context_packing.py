@@ -0,0 +1,167 @@
+# services/rag/context_packing.py
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, replace
+from typing import Any, Dict, FrozenSet, List, Sequence, Tuple, TypeVar
+
+
+T = TypeVar("T")
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_SENTENCE_END = re.compile(r"[.!?…](?=\s|$)")
+
+# un recorte que deja menos que esto no aporta contexto útil: se descarta el chunk
+MIN_TRIM_TOKENS = 32
+
+
+def estimate_tokens(text: str) -> int:
+    """Tokens del LLM estimados por caracteres (~4 por token); alcanza para presupuestar."""
+    return (len(text) + 3) // 4
+
+
+def _shingles(text: str, size: int = 3) -> FrozenSet[Tuple[str, ...]]:
+    words = _WORD.findall(text.lower())
+    if len(words) < size:
+        return frozenset([tuple(words)])
+    return frozenset(tuple(words[i : i + size]) for i in range(len(words) - size + 1))
+
+
+def _similarity(a: FrozenSet, b: FrozenSet) -> float:
+    """Jaccard; con chunks solapados cuenta también la contención del más chico."""
+    if not a or not b:
+        return 0.0
+    inter = len(a & b)
+    return max(inter / len(a | b), inter / min(len(a), len(b)))
+
+
+def trim_to_tokens(text: str, max_tokens: int) -> str:
+    """Corta `text` al presupuesto, en el último fin de oración (o palabra) que entre."""
+    limit = max_tokens * 4
+    if len(text) <= limit:
+        return text
+    head = text[:limit]
+    ends = [m.end() for m in _SENTENCE_END.finditer(head)]
+    if ends and ends[-1] >= limit // 2:
+        return head[: ends[-1]].strip()
+    cut = head.rfind(" ")
+    return (head[:cut] if cut > 0 else head).strip() + " …"
+
+
+@dataclass(frozen=True)
+class PackingConfig:
+    # presupuesto de tokens para todo el contexto; 0 = sin límite
+    max_tokens: int = 1500
+    # similitud (shingles de 3 palabras) a partir de la cual dos chunks son casi duplicados
+    dedupe_threshold: float = 0.8
+    # se descartan los chunks con score < mejor score de la persona - score_gap; 0 = no se corta
+    score_gap: float = 0.15
+
+
+@dataclass
+class PackingReport:
+    chunks_in: int = 0
+    chunks_out: int = 0
+    tokens_in: int = 0
+    tokens_out: int = 0
+    duplicates: int = 0
+    below_gap: int = 0
+    over_budget: int = 0
+    trimmed: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_in - self.tokens_out
+
+    def to_attributes(self) -> Dict[str, Any]:
+        return {
+            "context_chunks": self.chunks_out,
+            "context_tokens": self.tokens_out,
+            "context_tokens_saved": self.tokens_saved,
+            "context_dropped": self.duplicates + self.below_gap + self.over_budget,
+        }
+
+    def summary(self) -> str:
+        return (
+            f"{self.chunks_out}/{self.chunks_in} chunks, ~{self.tokens_out}/{self.tokens_in} tokens "
+            f"(ahorro ~{self.tokens_saved}; {self.duplicates} duplicados, "
+            f"{self.below_gap} bajo el corte de score, {self.over_budget} fuera del presupuesto, "
+            f"{self.trimmed} recortados)"
+        )
+
+
+def pack_context(
+    chunks: Sequence[T],
+    config: PackingConfig,
+) -> Tuple[List[T], PackingReport]:
+    """
+    Arma el contexto del prompt a partir de los chunks recuperados (con `.text`, `.score`
+    y opcionalmente `.person_id`):
+
+    1. por persona, ordena por score y descarta casi duplicados y los que quedan a más de
+       `score_gap` del mejor (el mejor de cada persona siempre queda);
+    2. reparte el presupuesto por rondas: todas las personas reciben su mejor chunk antes
+       de que alguna reciba el segundo, y lo que una no usa lo aprovechan las demás;
+    3. si el siguiente chunk no entra entero, se recorta a fin de oración (en una copia).
+
+    Devuelve los chunks agrupados por persona (en el orden de llegada) y ordenados por score.
+    """
+    report = PackingReport(chunks_in=len(chunks))
+
+    by_person: Dict[str, List[T]] = {}
+    for c in chunks:
+        if getattr(c, "text", ""):
+            by_person.setdefault(getattr(c, "person_id", ""), []).append(c)
+    report.tokens_in = sum(estimate_tokens(c.text) for c in chunks if getattr(c, "text", ""))
+
+    candidates: Dict[str, List[T]] = {}
+    for pid, plist in by_person.items():
+        plist = sorted(plist, key=lambda c: c.score, reverse=True)
+        best = plist[0].score
+        kept: List[T] = []
+        kept_shingles: List[FrozenSet] = []
+        for c in plist:
+            if config.score_gap > 0 and kept and c.score < best - config.score_gap:
+                report.below_gap += 1
+                continue
+            sh = _shingles(c.text)
+            if any(_similarity(sh, other) >= config.dedupe_threshold for other in kept_shingles):
+                report.duplicates += 1
+                continue
+            kept.append(c)
+            kept_shingles.append(sh)
+        candidates[pid] = kept
+
+    remaining = config.max_tokens if config.max_tokens > 0 else None
+    selected: Dict[str, List[T]] = {pid: [] for pid in candidates}
+    rounds = max((len(v) for v in candidates.values()), default=0)
+    for rank in range(rounds):
+        for pid, plist in candidates.items():
+            if rank >= len(plist):
+                continue
+            c = plist[rank]
+            cost = estimate_tokens(c.text)
+            if remaining is None or cost <= remaining:
+                selected[pid].append(c)
+                if remaining is not None:
+                    remaining -= cost
+            elif remaining >= MIN_TRIM_TOKENS:
+                trimmed = replace(c, text=trim_to_tokens(c.text, remaining - 1))
+                selected[pid].append(trimmed)
+                remaining -= estimate_tokens(trimmed.text)
+                report.trimmed += 1
+            else:
+                report.over_budget += 1
+
+    packed = [c for plist in selected.values() for c in plist]
+    report.chunks_out = len(packed)
+    report.tokens_out = sum(estimate_tokens(c.text) for c in packed)
+    return packed, report
+
+
+def packing_config_from_settings(settings: Any) -> PackingConfig:
+    return PackingConfig(
+        max_tokens=settings.context_max_tokens,
+        dedupe_threshold=settings.context_dedupe_threshold,
+        score_gap=settings.context_score_gap,
+    )
@@ -0,0 +1,134 @@
+# services/rag/embedding_backends.py
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class BackendOptions:
+    # 0 = lo que decida torch
+    num_threads: int = 0
+    # sólo usa el modelo ya descargado (HF cache o `cache_folder`); nunca hace red
+    offline: bool = False
+    cache_folder: Optional[str] = None
+
+
+class Encoder(ABC):
+    """Interfaz mínima que usa embeddings.py: `encode` → float32 (n, dim) y `dimension`."""
+
+    dimension: int
+
+    @abstractmethod
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        ...
+
+
+class SentenceTransformerEncoder(Encoder):
+    def __init__(self, model: Any, inference_mode: bool = False) -> None:
+        self.model = model
+        self.dimension = model.get_sentence_embedding_dimension()
+        self._inference_mode = inference_mode
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        if self._inference_mode:
+            import torch
+
+            with torch.inference_mode():
+                out = self.model.encode(texts, batch_size=batch_size)
+        else:
+            out = self.model.encode(texts, batch_size=batch_size)
+        return np.asarray(out, dtype=np.float32)
+
+
+@dataclass(frozen=True)
+class EmbeddingBackend:
+    name: str
+    load: Callable[[str, BackendOptions], Encoder]
+    # backends con la misma `numerics` producen los mismos vectores y comparten cache/índice
+    numerics: str
+    description: str = ""
+
+
+EMBEDDING_BACKENDS: Dict[str, EmbeddingBackend] = {}
+
+
+def register_backend(name: str, numerics: str, description: str = "") -> Callable:
+    def decorator(load: Callable[[str, BackendOptions], Encoder]) -> Callable:
+        EMBEDDING_BACKENDS[name] = EmbeddingBackend(name, load, numerics, description)
+        return load
+
+    return decorator
+
+
+def get_backend(name: str) -> EmbeddingBackend:
+    backend = EMBEDDING_BACKENDS.get(name)
+    if backend is None:
+        raise ValueError(
+            f"Backend de embeddings desconocido: {name} "
+            f"(disponibles: {', '.join(sorted(EMBEDDING_BACKENDS))})"
+        )
+    return backend
+
+
+def _load_sentence_transformer(model_name: str, options: BackendOptions) -> Any:
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(
+        model_name,
+        device="cpu",
+        cache_folder=options.cache_folder or None,
+        local_files_only=options.offline,
+    )
+
+
+def _tune_torch_threads(options: BackendOptions) -> None:
+    import torch
+
+    if options.num_threads:
+        torch.set_num_threads(options.num_threads)
+    # un solo hilo inter-op: el paralelismo útil en CPU está dentro de cada matmul
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # sólo se puede fijar antes del primer trabajo paralelo de torch
+
+
+@register_backend("torch", numerics="fp32", description="SentenceTransformer fp32 (referencia)")
+def _load_torch(model_name: str, options: BackendOptions) -> Encoder:
+    if options.num_threads:
+        import torch
+
+        torch.set_num_threads(options.num_threads)
+    return SentenceTransformerEncoder(_load_sentence_transformer(model_name, options))
+
+
+@register_backend(
+    "tuned",
+    numerics="fp32",
+    description="fp32 con hilos ajustados, 1 hilo inter-op e inference_mode",
+)
+def _load_tuned(model_name: str, options: BackendOptions) -> Encoder:
+    _tune_torch_threads(options)
+    model = _load_sentence_transformer(model_name, options)
+    model.eval()
+    return SentenceTransformerEncoder(model, inference_mode=True)
+
+
+@register_backend(
+    "int8",
+    numerics="int8-dynamic",
+    description="cuantización dinámica int8 de las capas Linear (CPU)",
+)
+def _load_int8(model_name: str, options: BackendOptions) -> Encoder:
+    import torch
+
+    _tune_torch_threads(options)
+    model = _load_sentence_transformer(model_name, options)
+    model.eval()
+    # pesos de las Linear a int8; activaciones cuantizadas al vuelo en cada llamada
+    quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return SentenceTransformerEncoder(quantized, inference_mode=True)
@@ -0,0 +1,377 @@
+# services/rag/embedding_cache.py
+from __future__ import annotations
+
+import hashlib
+import os
+import pathlib
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import IO, List, Optional, Sequence
+
+import numpy as np
+
+
+_VECTORS_FILE = "vectors.f32"
+_DIGESTS_FILE = "slots.bin"
+_KEYS_FILE = "keys.log"
+_LOCK_FILE = "writer.lock"
+_DIGEST_BYTES = 32
+
+
+def normalize_text(text: str) -> str:
+    """Normalización previa al hash: colapsa espacios (no cambia el embedding)."""
+    return " ".join(text.split())
+
+
+def cache_key(model_name: str, text: str) -> str:
+    payload = f"{model_name}\x00{normalize_text(text)}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hits(self) -> int:
+        return self.memory_hits + self.disk_hits
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class _DiskTier:
+    """
+    Tier persistente: matriz float32 en un archivo mmap + log de claves al costado.
+
+    - Escribe un solo proceso: el que toma el lock exclusivo de `writer.lock`. El resto
+      (p. ej. Streamlit mientras corre la ingesta) abre el tier de sólo lectura y relee
+      el log cuando cambia.
+    - `slots.bin` guarda el digest de la clave dueña de cada slot. La lectura lo compara
+      antes y después de copiar el vector: un slot reutilizado cuenta como miss y nunca
+      devuelve el vector de otro texto.
+    - Cada línea de `keys.log` es "<key> <slot>", en orden de uso (los hits también se
+      registran): al cargar, la última línea de cada clave define su lugar en el LRU.
+    """
+
+    def __init__(self, directory: pathlib.Path, dimension: int, max_entries: int) -> None:
+        self._dir = directory
+        self._dimension = dimension
+        self._max_entries = max_entries
+        self._dir.mkdir(parents=True, exist_ok=True)
+
+        self._vectors_path = self._dir / _VECTORS_FILE
+        self._digests_path = self._dir / _DIGESTS_FILE
+        self._keys_path = self._dir / _KEYS_FILE
+        self._slots: "OrderedDict[str, int]" = OrderedDict()
+        self._free: List[int] = []
+        self._touched: List[str] = []
+        self._log_lines = 0
+        self._log_offset = 0
+        self._log_inode: Optional[int] = None
+        self._matrix: Optional[np.memmap] = None
+        self._digests: Optional[np.memmap] = None
+        self._capacity = 0
+
+        self._lock_file: Optional[IO[str]] = None
+        self.read_only = not self._acquire_writer()
+        self._open(self._file_capacity())
+        self._load_keys()
+
+    def _acquire_writer(self) -> bool:
+        f = open(self._dir / _LOCK_FILE, "a+")
+        try:
+            if os.name == "nt":
+                import msvcrt
+
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                import fcntl
+
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            return False
+        # el lock dura lo que el proceso: se libera al cerrar el archivo
+        self._lock_file = f
+        return True
+
+    def _file_capacity(self) -> int:
+        if not self._vectors_path.exists() or not self._digests_path.exists():
+            return 0
+        return min(
+            self._vectors_path.stat().st_size // (4 * self._dimension),
+            self._digests_path.stat().st_size // _DIGEST_BYTES,
+        )
+
+    def _open(self, capacity: int) -> None:
+        if self._matrix is not None and not self.read_only:
+            self._matrix.flush()
+            self._digests.flush()
+        if not self.read_only:
+            for path, row_bytes in (
+                (self._vectors_path, self._dimension * 4),
+                (self._digests_path, _DIGEST_BYTES),
+            ):
+                with open(path, "ab") as f:
+                    f.truncate(capacity * row_bytes)
+        if capacity == 0:
+            self._matrix = self._digests = None
+            self._capacity = 0
+            return
+        mode = "r" if self.read_only else "r+"
+        self._matrix = np.memmap(
+            self._vectors_path, dtype=np.float32, mode=mode, shape=(capacity, self._dimension)
+        )
+        self._digests = np.memmap(
+            self._digests_path, dtype=np.uint8, mode=mode, shape=(capacity, _DIGEST_BYTES)
+        )
+        self._capacity = capacity
+
+    def _load_keys(self) -> None:
+        self._slots.clear()
+        self._log_lines = 0
+        self._log_offset = 0
+        self._read_log()
+        if not self.read_only:
+            self._drop_unverified()
+        used = set(self._slots.values())
+        self._free = [s for s in range(self._capacity - 1, -1, -1) if s not in used]
+
+    def _read_log(self) -> None:
+        """Aplica las líneas nuevas del log (desde la última lectura)."""
+        try:
+            with open(self._keys_path, "rb") as f:
+                self._log_inode = os.fstat(f.fileno()).st_ino
+                f.seek(self._log_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        # una línea sin "\n" final todavía se está escribiendo: queda para la próxima
+        data = data[: data.rfind(b"\n") + 1]
+        self._log_offset += len(data)
+        owner = {slot: key for key, slot in self._slots.items()}
+        for line in data.decode("ascii", errors="replace").splitlines():
+            parts = line.split()
+            if len(parts) != 2 or len(parts[0]) != 64 or not parts[1].isdigit():
+                continue  # línea truncada por un corte a mitad de escritura
+            key, slot = parts[0], int(parts[1])
+            self._log_lines += 1
+            if slot >= self._capacity:
+                continue
+            previous = owner.get(slot)
+            if previous is not None and previous != key:
+                self._slots.pop(previous, None)
+            old_slot = self._slots.pop(key, None)
+            if old_slot is not None and old_slot != slot:
+                owner.pop(old_slot, None)
+            owner[slot] = key
+            self._slots[key] = slot
+
+    def _drop_unverified(self) -> None:
+        # slots cuyo digest no es el de la clave (corte entre el vector y el log)
+        if not self._slots:
+            return
+        keys = list(self._slots)
+        slots = np.fromiter(self._slots.values(), dtype=np.int64, count=len(keys))
+        ok = (self._digests[slots] == _digests(keys)).all(axis=1)
+        for key, valid in zip(keys, ok):
+            if not valid:
+                del self._slots[key]
+
+    def refresh(self) -> None:
+        """Lector: incorpora lo que el escritor agregó desde la última vez."""
+        if not self.read_only:
+            return
+        try:
+            st = self._keys_path.stat()
+        except FileNotFoundError:
+            return
+        capacity = self._file_capacity()
+        if capacity != self._capacity:
+            self._open(capacity)
+        if st.st_ino != self._log_inode or st.st_size < self._log_offset:
+            # el escritor compactó el log: se relee entero
+            self._load_keys()
+        elif st.st_size > self._log_offset:
+            self._read_log()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        slot = self._slots.get(key)
+        if slot is None:
+            return None
+        digest = _digests([key])[0]
+        vec = np.array(self._matrix[slot]) if (self._digests[slot] == digest).all() else None
+        # segunda comparación: el escritor pudo reutilizar el slot mientras se copiaba
+        if vec is None or not (self._digests[slot] == digest).all():
+            del self._slots[key]
+            if not self.read_only:
+                self._free.append(slot)
+            return None
+        self._slots.move_to_end(key)
+        if not self.read_only:
+            self._touched.append(key)
+        return vec
+
+    def flush_touched(self) -> None:
+        """Registra los hits en el log, así el LRU sobrevive al reinicio."""
+        if self._touched:
+            lines = [f"{key} {self._slots[key]}\n" for key in self._touched if key in self._slots]
+            self._touched = []
+            self._append(lines)
+
+    def put_many(self, keys: Sequence[str], vectors: np.ndarray) -> int:
+        if self.read_only:
+            return 0
+        evicted = 0
+        slots: List[int] = []
+        for key in keys:
+            slot = self._slots.get(key)
+            if slot is None:
+                if self._free:
+                    slot = self._free.pop()
+                elif self._capacity < self._max_entries:
+                    new_capacity = min(max(2 * self._capacity, 1024), self._max_entries)
+                    first_new = self._capacity
+                    self._open(new_capacity)
+                    self._free.extend(range(new_capacity - 1, first_new, -1))
+                    slot = first_new
+                else:
+                    # LRU: reutilizamos el slot de la clave menos usada
+                    _, slot = self._slots.popitem(last=False)
+                    evicted += 1
+            self._slots[key] = slot
+            self._slots.move_to_end(key)
+            slots.append(slot)
+        if not slots:
+            return evicted
+
+        rows = np.asarray(slots, dtype=np.int64)
+        # digest en cero mientras se escribe el vector: un lector nunca ve uno a medias
+        self._digests[rows] = 0
+        self._digests.flush()
+        self._matrix[rows] = vectors
+        self._matrix.flush()
+        self._digests[rows] = _digests(keys)
+        self._digests.flush()
+        self._append([f"{key} {slot}\n" for key, slot in zip(keys, slots)])
+        return evicted
+
+    def _append(self, lines: List[str]) -> None:
+        if not lines:
+            return
+        if self._log_lines + len(lines) > 2 * max(len(self._slots), 1024):
+            self._compact()
+        else:
+            with open(self._keys_path, "a", encoding="ascii") as f:
+                f.writelines(lines)
+            self._log_lines += len(lines)
+
+    def _compact(self) -> None:
+        # en orden LRU: el más viejo primero
+        tmp = self._keys_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="ascii") as f:
+            for key, slot in self._slots.items():
+                f.write(f"{key} {slot}\n")
+        os.replace(tmp, self._keys_path)
+        self._log_lines = len(self._slots)
+
+
+def _digests(keys: Sequence[str]) -> np.ndarray:
+    """Claves (sha256 en hex) → matriz (n, 32) uint8, como se guardan en `slots.bin`."""
+    raw = b"".join(bytes.fromhex(k) for k in keys)
+    return np.frombuffer(raw, dtype=np.uint8).reshape(len(keys), _DIGEST_BYTES)
+
+
+class EmbeddingCache:
+    """
+    Cache de embeddings de dos niveles para un modelo:
+    - memoria: LRU acotado por cantidad de entradas,
+    - disco (opcional): mmap float32 + log de claves, con desalojo LRU por tamaño.
+
+    Las claves son `cache_key(model_name, text)`. Varios procesos pueden compartir el
+    directorio: el primero escribe y los demás lo leen (ver `_DiskTier`).
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        dimension: int,
+        directory: Optional[str] = None,
+        max_memory_entries: int = 4096,
+        max_disk_entries: int = 200_000,
+    ) -> None:
+        self.model_name = model_name
+        self.dimension = dimension
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._max_memory_entries = max_memory_entries
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._disk: Optional[_DiskTier] = None
+
+        if directory and max_disk_entries > 0:
+            slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+            self._disk = _DiskTier(
+                pathlib.Path(directory) / f"{slug}-{dimension}",
+                dimension,
+                max_disk_entries,
+            )
+
+    @property
+    def read_only(self) -> bool:
+        """True si otro proceso escribe el tier de disco (éste sólo lo lee)."""
+        return self._disk is not None and self._disk.read_only
+
+    def key(self, text: str) -> str:
+        return cache_key(self.model_name, text)
+
+    def _remember(self, key: str, vec: np.ndarray) -> None:
+        if self._max_memory_entries <= 0:
+            return
+        self._memory[key] = vec
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._max_memory_entries:
+            self._memory.popitem(last=False)
+            self.stats.evictions += 1
+
+    def get_many(self, keys: Sequence[str]) -> List[Optional[np.ndarray]]:
+        out: List[Optional[np.ndarray]] = []
+        with self._lock:
+            if self._disk is not None:
+                self._disk.refresh()
+            for key in keys:
+                vec = self._memory.get(key)
+                if vec is not None:
+                    self._memory.move_to_end(key)
+                    self.stats.memory_hits += 1
+                elif self._disk is not None and (vec := self._disk.get(key)) is not None:
+                    self._remember(key, vec)
+                    self.stats.disk_hits += 1
+                else:
+                    self.stats.misses += 1
+                out.append(vec)
+            if self._disk is not None:
+                self._disk.flush_touched()
+        return out
+
+    def put_many(self, keys: Sequence[str], vectors: np.ndarray) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(keys), self.dimension)
+        with self._lock:
+            for key, vec in zip(keys, vectors):
+                self._remember(key, vec.copy())
+            if self._disk is not None:
+                self.stats.evictions += self._disk.put_many(keys, vectors)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._disk) if self._disk is not None else len(self._memory)
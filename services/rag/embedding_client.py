@@ -0,0 +1,110 @@
+# services/rag/embedding_client.py
+from __future__ import annotations
+
+import json
+import socket
+import struct
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+# cada frame: "!II" (largo del header JSON, largo del payload binario) + header + payload.
+# Las respuestas de `embed` traen la matriz float32 (n, dim) cruda en el payload.
+_FRAME = struct.Struct("!II")
+
+
+class EmbeddingServerError(RuntimeError):
+    """El servidor respondió con un error (el pedido llegó, pero falló del otro lado)."""
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytearray:
+    buf = bytearray(size)
+    view = memoryview(buf)
+    read = 0
+    while read < size:
+        n = sock.recv_into(view[read:], size - read)
+        if n == 0:
+            raise ConnectionError("conexión cerrada por el otro extremo")
+        read += n
+    return buf
+
+
+def send_frame(sock: socket.socket, header: Dict[str, Any], payload: Any = b"") -> None:
+    head = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    body = memoryview(payload).cast("B") if len(payload) else b""
+    sock.sendall(_FRAME.pack(len(head), len(body)) + head)
+    if len(body):
+        sock.sendall(body)
+
+
+def recv_frame(sock: socket.socket) -> Tuple[Dict[str, Any], bytearray]:
+    head_len, body_len = _FRAME.unpack(_recv_exact(sock, _FRAME.size))
+    header = json.loads(_recv_exact(sock, head_len).decode("utf-8"))
+    payload = _recv_exact(sock, body_len) if body_len else bytearray()
+    return header, payload
+
+
+class EmbeddingClient:
+    """
+    Cliente del servidor de embeddings (`python -m services.rag.embedding_server`).
+    Una conexión persistente por hilo; si se corta, se reconecta una vez y reintenta.
+    """
+
+    def __init__(self, socket_path: str, timeout: float = 30.0) -> None:
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def close(self) -> None:
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def _call(self, header: Dict[str, Any]) -> Tuple[Dict[str, Any], bytearray]:
+        for attempt in range(2):
+            sock = getattr(self._local, "sock", None)
+            fresh = sock is None
+            if fresh:
+                sock = self._local.sock = self._connect()
+            try:
+                send_frame(sock, header)
+                response, payload = recv_frame(sock)
+                break
+            except OSError:
+                self.close()
+                # una conexión reutilizada pudo haber muerto (p. ej. reinicio del servidor)
+                if fresh or attempt:
+                    raise
+        if "error" in response:
+            raise EmbeddingServerError(response["error"])
+        return response, payload
+
+    def embed(
+        self,
+        texts: List[str],
+        model_name: str,
+        batch_size: Optional[int] = None,
+    ) -> np.ndarray:
+        """Matriz float32 (n, dim), escribible y sin copias extra sobre el buffer recibido."""
+        response, payload = self._call(
+            {"op": "embed", "model": model_name, "texts": texts, "batch_size": batch_size}
+        )
+        return np.frombuffer(payload, dtype=np.float32).reshape(response["shape"])
+
+    def info(self, model_name: str) -> Dict[str, Any]:
+        """Dimensión, identidad del modelo, backend y estadísticas del micro-batching."""
+        response, _ = self._call({"op": "info", "model": model_name})
+        return response
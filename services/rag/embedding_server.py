@@ -0,0 +1,268 @@
+# services/rag/embedding_server.py
+from __future__ import annotations
+
+import argparse
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import get_settings
+from services.rag.embedding_client import recv_frame, send_frame
+from services.rag.embeddings import (
+    configure_embedding_backend,
+    configure_embedding_cache,
+    current_backend,
+    embed_batch_cached,
+    embedding_dimension,
+    get_embedding_cache,
+    model_identity,
+    warm_up_model,
+)
+
+
+@dataclass
+class _Request:
+    model_name: str
+    texts: List[str]
+    batch_size: Optional[int]
+    future: Future = field(default_factory=Future)
+
+
+@dataclass
+class BatcherStats:
+    requests: int = 0
+    texts: int = 0
+    batches: int = 0
+    max_batch_texts: int = 0
+
+    @property
+    def mean_batch_texts(self) -> float:
+        return self.texts / self.batches if self.batches else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "texts": self.texts,
+            "batches": self.batches,
+            "mean_batch_texts": round(self.mean_batch_texts, 2),
+            "max_batch_texts": self.max_batch_texts,
+        }
+
+
+class EmbeddingBatcher:
+    """
+    Junta los pedidos concurrentes en un único `encode` por modelo.
+
+    Un hilo toma el primer pedido de la cola, suma los que ya estén esperando y los que
+    lleguen dentro de `max_wait_ms`, hasta `max_batch` textos. Mientras el encoder
+    trabaja se acumula el lote siguiente, así que bajo carga los lotes crecen solos.
+    """
+
+    def __init__(self, max_wait_ms: float = 2.0, max_batch: int = 256) -> None:
+        self.max_wait_s = max_wait_ms / 1000.0
+        self.max_batch = max_batch
+        self.stats = BatcherStats()
+        self._queue: "queue.Queue[Optional[_Request]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name="embed-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, model_name: str, texts: List[str], batch_size: Optional[int] = None) -> Future:
+        request = _Request(model_name, texts, batch_size)
+        self._queue.put(request)
+        return request.future
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self, first: _Request) -> List[_Request]:
+        batch = [first]
+        size = len(first.texts)
+        deadline = time.monotonic() + self.max_wait_s
+        while size < self.max_batch:
+            try:
+                request = self._queue.get_nowait()
+            except queue.Empty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if request is None:
+                self._queue.put(None)  # se procesa este lote y después se corta
+                break
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+
+    def _loop(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            self._run(self._collect(first))
+
+    def _run(self, batch: List[_Request]) -> None:
+        by_model: Dict[str, List[_Request]] = {}
+        for request in batch:
+            by_model.setdefault(request.model_name, []).append(request)
+
+        for model_name, requests in by_model.items():
+            texts = [t for r in requests for t in r.texts]
+            batch_size = max((r.batch_size or 0) for r in requests) or None
+            try:
+                vectors = embed_batch_cached(texts, model_name, batch_size=batch_size)
+            except Exception as exc:
+                for r in requests:
+                    r.future.set_exception(exc)
+                continue
+
+            self.stats.requests += len(requests)
+            self.stats.texts += len(texts)
+            self.stats.batches += 1
+            self.stats.max_batch_texts = max(self.stats.max_batch_texts, len(texts))
+            start = 0
+            for r in requests:
+                end = start + len(r.texts)
+                r.future.set_result(vectors[start:end])
+                start = end
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    server: "EmbeddingServer"
+
+    def handle(self) -> None:
+        sock: socket.socket = self.request
+        while True:
+            try:
+                header, _ = recv_frame(sock)
+            except OSError:
+                return
+            try:
+                self._dispatch(sock, header)
+            except OSError:
+                return
+
+    def _dispatch(self, sock: socket.socket, header: Dict[str, Any]) -> None:
+        # los errores del modelo viajan como respuesta; sólo los del socket cortan la conexión
+        try:
+            response, payload = self._respond(header)
+        except Exception as exc:
+            response, payload = {"error": f"{type(exc).__name__}: {exc}"}, b""
+        send_frame(sock, response, payload)
+
+    def _respond(self, header: Dict[str, Any]) -> Tuple[Dict[str, Any], Any]:
+        op = header.get("op")
+        model_name = header.get("model") or get_settings().embedding_model_name
+        if op == "embed":
+            texts = list(header.get("texts") or [])
+            if not texts:
+                return {"shape": [0, embedding_dimension(model_name)]}, b""
+            future = self.server.batcher.submit(model_name, texts, header.get("batch_size"))
+            vectors = np.ascontiguousarray(future.result(), dtype=np.float32)
+            return {"shape": list(vectors.shape)}, vectors
+        if op == "info":
+            cache_stats = get_embedding_cache(model_name).stats
+            return {
+                "dimension": embedding_dimension(model_name),
+                "model": model_identity(model_name),
+                "backend": current_backend(),
+                "batching": self.server.batcher.stats.to_dict(),
+                "cache": {"hits": cache_stats.hits, "misses": cache_stats.misses},
+            }, b""
+        return {"error": f"operación desconocida: {op}"}, b""
+
+
+class EmbeddingServer(socketserver.ThreadingUnixStreamServer):
+    """Servidor de embeddings en un socket Unix: un hilo por conexión, un batcher compartido."""
+
+    daemon_threads = True
+    # backlog de listen: muchas sesiones pueden conectarse a la vez al arrancar
+    request_queue_size = 128
+
+    def __init__(self, socket_path: str, batcher: EmbeddingBatcher) -> None:
+        self.socket_path = socket_path
+        self.batcher = batcher
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)  # socket de una corrida anterior
+        directory = os.path.dirname(socket_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        super().__init__(socket_path, _Handler)
+        os.chmod(socket_path, 0o660)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.batcher.close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(
+        description="Servidor local de embeddings (socket Unix) con micro-batching entre clientes."
+    )
+    parser.add_argument(
+        "--socket",
+        default=settings.embedding_server_socket or ".cache/embeddings.sock",
+        help="ruta del socket (default: EMBEDDING_SERVER_SOCKET o .cache/embeddings.sock)",
+    )
+    parser.add_argument(
+        "--max-wait-ms",
+        type=float,
+        default=settings.embedding_server_max_wait_ms,
+        help="ventana para juntar pedidos en un lote (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--max-batch",
+        type=int,
+        default=settings.embedding_server_max_batch,
+        help="textos máximos por lote (default: %(default)s)",
+    )
+    parser.add_argument("--model", default=settings.embedding_model_name, help="modelo a precargar")
+    args = parser.parse_args(argv)
+
+    # el servidor usa el modelo en proceso: no se configura el cliente (sería él mismo)
+    configure_embedding_backend(
+        settings.embedding_backend,
+        num_threads=settings.embedding_threads,
+        offline=settings.embedding_offline,
+        cache_folder=settings.embedding_model_cache_dir,
+    )
+    configure_embedding_cache(
+        settings.embedding_cache_dir,
+        max_memory_entries=settings.embedding_cache_memory_entries,
+        max_disk_entries=settings.embedding_cache_disk_entries,
+    )
+    warm_up_model(args.model)
+
+    batcher = EmbeddingBatcher(max_wait_ms=args.max_wait_ms, max_batch=args.max_batch)
+    with EmbeddingServer(args.socket, batcher) as server:
+        print(
+            f"Servidor de embeddings en {args.socket} "
+            f"(modelo {model_identity(args.model)}, backend {current_backend()})"
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        stats = batcher.stats
+        print(
+            f"Atendidos {stats.requests} pedidos en {stats.batches} lotes "
+            f"({stats.mean_batch_texts:.1f} textos/lote)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,315 @@
 # services/rag/embeddings.py
 from __future__ import annotations
 
-from functools import lru_cache
-from typing import Iterable, List, Union
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 
-from sentence_transformers import SentenceTransformer
+import numpy as np
+
+from config import Settings
+from services.rag.embedding_backends import BackendOptions, Encoder, get_backend
+from services.rag.embedding_cache import EmbeddingCache
+from services.rag.embedding_client import EmbeddingClient
+from services.telemetry.tracing import span
 
 
 DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 
+# configuración del cache; las entradas (ingest, streamlit) la ajustan con configure_embeddings
+_cache_config: Dict[str, object] = {
+    "directory": ".cache/embeddings",
+    "max_memory_entries": 4096,
+    "max_disk_entries": 200_000,
+}
+_caches: Dict[str, EmbeddingCache] = {}
+
+# backend de inferencia (ver embedding_backends.py); se ajusta con configure_embedding_backend
+_backend_config: Dict[str, object] = {
+    "backend": "torch",
+    "options": BackendOptions(),
+}
+_models: Dict[Tuple[str, str], Encoder] = {}
+_models_lock = threading.Lock()
+
+# servidor de embeddings compartido (ver embedding_server.py); None = modelo en el proceso
+_server: Dict[str, Optional[EmbeddingClient]] = {"client": None}
+_server_fallback_warned = False
+
+
+def configure_embedding_backend(
+    backend: str = "torch",
+    num_threads: int = 0,
+    offline: bool = False,
+    cache_folder: Optional[str] = None,
+) -> None:
+    """Elige el backend de inferencia (`torch`, `tuned`, `int8`, ...) y sus opciones."""
+    get_backend(backend)  # valida el nombre
+    _backend_config.update(
+        backend=backend,
+        options=BackendOptions(
+            num_threads=num_threads,
+            offline=offline,
+            cache_folder=cache_folder or None,
+        ),
+    )
+    _caches.clear()
+
+
+def current_backend() -> str:
+    return str(_backend_config["backend"])
+
+
+def model_identity(model_name: str = DEFAULT_EMBEDDING_MODEL, backend: Optional[str] = None) -> str:
+    """
+    Identidad de los vectores producidos: el nombre del modelo más la numérica del
+    backend si no es fp32. Se usa en las claves del cache y en el target del manifest.
+    """
+    numerics = get_backend(backend or current_backend()).numerics
+    return model_name if numerics == "fp32" else f"{model_name}@{numerics}"
+
+
+def _get_model(model_name: str = DEFAULT_EMBEDDING_MODEL, backend: Optional[str] = None) -> Encoder:
+    """
+    Carga el encoder una sola vez por proceso y backend. `sentence_transformers` (y torch)
+    se importan recién acá; el lock evita cargarlo dos veces si el warm-up en segundo
+    plano y la primera pregunta llegan a la vez (la pregunta espera al warm-up).
+    """
+    key = (model_name, backend or current_backend())
+    model = _models.get(key)
+    if model is not None:
+        return model
+    with _models_lock:
+        model = _models.get(key)
+        if model is None:
+            options = _backend_config["options"]
+            model = get_backend(key[1]).load(model_name, options)
+            _models[key] = model
+    return model
+
+
+def configure_embedding_server(socket_path: Optional[str], timeout: float = 30.0) -> None:
+    """
+    Con `socket_path`, `embed_array`/`embed_text` delegan en el servidor de embeddings
+    de ese socket Unix (un solo modelo por host, micro-batching entre procesos y sesiones).
+    `None` o "" vuelve al modelo en el proceso.
+    """
+    _server["client"] = EmbeddingClient(socket_path, timeout=timeout) if socket_path else None
+
+
+def embedding_server() -> Optional[EmbeddingClient]:
+    return _server["client"]
+
+
+def _warn_server_unavailable(client: EmbeddingClient, exc: OSError) -> None:
+    global _server_fallback_warned
+    if not _server_fallback_warned:
+        _server_fallback_warned = True
+        print(
+            f"Aviso: servidor de embeddings no disponible en {client.socket_path} "
+            f"({type(exc).__name__}: {exc}); se carga el modelo en este proceso."
+        )
+
+
+def load_model(model_name: str = DEFAULT_EMBEDDING_MODEL) -> None:
+    client = embedding_server()
+    if client is not None:
+        try:
+            client.info(model_name)  # el servidor carga el modelo si aún no lo hizo
+            return
+        except OSError as exc:
+            _warn_server_unavailable(client, exc)
+    _get_model(model_name)
+
+
+def is_model_loaded(model_name: str = DEFAULT_EMBEDDING_MODEL) -> bool:
+    return (model_name, current_backend()) in _models
+
+
+def warm_up_model(model_name: str = DEFAULT_EMBEDDING_MODEL) -> None:
+    """Carga el modelo y hace una inferencia de prueba (sin pasar por el cache)."""
+    client = embedding_server()
+    if client is not None:
+        try:
+            client.embed(["warm-up"], model_name, batch_size=1)
+            return
+        except OSError as exc:
+            _warn_server_unavailable(client, exc)
+    _get_model(model_name).encode(["warm-up"], batch_size=1)
+
 
-@lru_cache
-def _get_model(model_name: str = DEFAULT_EMBEDDING_MODEL) -> SentenceTransformer:
-    return SentenceTransformer(model_name)
+def embedding_dimension(model_name: str = DEFAULT_EMBEDDING_MODEL) -> int:
+    client = embedding_server()
+    if client is not None:
+        try:
+            return int(client.info(model_name)["dimension"])
+        except OSError as exc:
+            _warn_server_unavailable(client, exc)
+    return _get_model(model_name).dimension
+
+
+def configure_embedding_cache(
+    directory: Optional[str],
+    max_memory_entries: int = 4096,
+    max_disk_entries: int = 200_000,
+) -> None:
+    """
+    Ajusta el cache de embeddings. `directory=None` (o "") deja sólo el tier en memoria;
+    `max_memory_entries=0` y `directory=None` lo desactivan por completo.
+    """
+    _cache_config.update(
+        directory=directory or None,
+        max_memory_entries=max_memory_entries,
+        max_disk_entries=max_disk_entries,
+    )
+    _caches.clear()
+
+
+def configure_embeddings(settings: Settings) -> None:
+    """Backend de inferencia + cache según la configuración (ingest, streamlit)."""
+    configure_embedding_backend(
+        settings.embedding_backend,
+        num_threads=settings.embedding_threads,
+        offline=settings.embedding_offline,
+        cache_folder=settings.embedding_model_cache_dir,
+    )
+    configure_embedding_cache(
+        settings.embedding_cache_dir,
+        max_memory_entries=settings.embedding_cache_memory_entries,
+        max_disk_entries=settings.embedding_cache_disk_entries,
+    )
+    configure_embedding_server(settings.embedding_server_socket)
+
+
+def get_embedding_cache(model_name: str = DEFAULT_EMBEDDING_MODEL) -> EmbeddingCache:
+    cache = _caches.get(model_name)
+    if cache is None:
+        dimension = embedding_dimension(model_name)
+        # vectores int8 y fp32 no se mezclan: la identidad incluye el backend
+        cache = EmbeddingCache(
+            model_identity(model_name),
+            dimension,
+            directory=_cache_config["directory"],
+            max_memory_entries=_cache_config["max_memory_entries"],
+            max_disk_entries=_cache_config["max_disk_entries"],
+        )
+        if cache.read_only:
+            print(
+                f"Aviso: otro proceso escribe el cache de embeddings en "
+                f"{_cache_config['directory']}; este proceso sólo lo lee."
+            )
+        _caches[model_name] = cache
+    return cache
+
+
+def set_torch_threads(num_threads: int) -> None:
+    """Fija los hilos intra-op de torch para el encoder (útil al repartir cores en ingest)."""
+    import torch
+
+    torch.set_num_threads(num_threads)
+
+
+def embed_batch_cached(
+    texts: List[str],
+    model_name: str,
+    batch_size: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Embeddings de un lote en este proceso (sin pasar por el servidor de embeddings; es
+    lo que el servidor mismo usa para atender).
+    Resuelve desde el cache y envía a `encode` sólo los textos que faltan (deduplicados).
+    Devuelve una matriz float32 (n, dim) contigua, escrita fila a fila sin listas intermedias.
+    """
+    with span("embed", texts=len(texts), backend=current_backend()) as s:
+        cache = get_embedding_cache(model_name)
+        keys = [cache.key(t) for t in texts]
+        cached = cache.get_many(keys)
+
+        missing: Dict[str, int] = {}  # clave → posición en el lote a codificar
+        miss_texts: List[str] = []
+        for key, text, vec in zip(keys, texts, cached):
+            if vec is None and key not in missing:
+                missing[key] = len(miss_texts)
+                miss_texts.append(text)
+        s.set(encoded=len(miss_texts))
+
+        encoded: Optional[np.ndarray] = None
+        if miss_texts:
+            encoded = _get_model(model_name).encode(miss_texts, batch_size=batch_size or 32)
+            cache.put_many(list(missing), encoded)
+            if len(miss_texts) == len(texts):
+                # todo nuevo y sin repetidos: la salida del encoder ya es el resultado
+                return np.ascontiguousarray(encoded, dtype=np.float32)
+
+    out = np.empty((len(texts), cache.dimension), dtype=np.float32)
+    for i, (key, vec) in enumerate(zip(keys, cached)):
+        out[i] = vec if vec is not None else encoded[missing[key]]
+    return out
+
+
+def _embed_remote(
+    client: EmbeddingClient,
+    texts: List[str],
+    model_name: str,
+    batch_size: Optional[int],
+) -> Optional[np.ndarray]:
+    """Pide los embeddings al servidor; None si no está disponible (se usa el modelo local)."""
+    with span("embed", texts=len(texts), remote=True):
+        try:
+            return client.embed(texts, model_name, batch_size=batch_size)
+        except OSError as exc:
+            _warn_server_unavailable(client, exc)
+            return None
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Normaliza cada fila a norma 1 in-place (las filas nulas quedan en cero)."""
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    vectors /= norms
+    return vectors
+
+
+def embed_array(
+    text: Union[str, Iterable[str]],
+    model_name: str = DEFAULT_EMBEDDING_MODEL,
+    batch_size: Optional[int] = None,
+    normalize: bool = False,
+) -> np.ndarray:
+    """
+    Embeddings como arrays float32 contiguos (la forma nativa en todo el pipeline):
+    - si text es str, devuelve shape (dim,)
+    - si es iterable de str, devuelve shape (n, dim)
+    Con `normalize=True` las filas salen con norma 1 (métrica coseno sin recalcular).
+    Los textos ya vistos se sirven desde el cache (memoria o disco) sin codificar.
+    """
+    texts = [text] if isinstance(text, str) else list(text)
+    if not texts:
+        return np.empty((0, embedding_dimension(model_name)), dtype=np.float32)
+
+    embeddings = None
+    client = embedding_server()
+    if client is not None:
+        embeddings = _embed_remote(client, texts, model_name, batch_size)
+    if embeddings is None:
+        embeddings = embed_batch_cached(texts, model_name, batch_size=batch_size)
+    if normalize:
+        normalize_rows(embeddings)
+    return embeddings[0] if isinstance(text, str) else embeddings
 
 
 def embed_text(
     text: Union[str, Iterable[str]],
     model_name: str = DEFAULT_EMBEDDING_MODEL,
+    batch_size: Optional[int] = None,
 ) -> Union[List[float], List[List[float]]]:
     """
-    Devuelve embeddings como listas de floats (para fácil serialización).
+    Devuelve embeddings como listas de floats, para serializar (JSON, APIs).
     - Si text es str, devuelve List[float]
     - Si es iterable de str, devuelve List[List[float]]
+    En el código interno usar `embed_array`: evita un float de Python por componente.
     """
-    model = _get_model(model_name)
-    embeddings = model.encode(text)
-
-    # SentenceTransformers puede devolver np.array o lista; lo normalizamos
-    if isinstance(text, str):
-        return embeddings.tolist()
-    return embeddings.tolist()
+    if not isinstance(text, str):
+        text = list(text)
+        if not text:
+            return []
+    return embed_array(text, model_name, batch_size=batch_size).tolist()
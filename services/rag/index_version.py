@@ -0,0 +1,42 @@
+# services/rag/index_version.py
+from __future__ import annotations
+
+import os
+import pathlib
+import uuid
+from typing import Optional, Tuple
+
+
+def bump_index_version(path: str) -> str:
+    """Registra que el contenido del índice cambió (lo llama ingest tras aplicar cambios)."""
+    p = pathlib.Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    version = uuid.uuid4().hex
+    tmp = p.with_suffix(".tmp")
+    tmp.write_text(version, encoding="ascii")
+    os.replace(tmp, p)
+    return version
+
+
+class IndexVersionWatcher:
+    """
+    Lee la versión del índice sólo cuando cambia el mtime del archivo, así consultarla
+    en cada pregunta cuesta un `stat`.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._path = pathlib.Path(path)
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._version = ""
+
+    def current(self) -> str:
+        try:
+            st = self._path.stat()
+        except FileNotFoundError:
+            self._stamp, self._version = None, ""
+            return self._version
+        stamp = (st.st_mtime_ns, st.st_ino)
+        if stamp != self._stamp:
+            self._stamp = stamp
+            self._version = self._path.read_text(encoding="ascii").strip()
+        return self._version
@@ -0,0 +1,424 @@
+# services/rag/llm_client.py
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Optional
+
+import httpx
+
+from config import Settings
+from services.telemetry.tracing import span
+
+
+Messages = List[Dict[str, str]]
+
+
+@dataclass
+class LLMClientConfig:
+    api_key: str
+    base_url: Optional[str] = None  # None = API pública de Groq
+    model_name: str = "llama-3.1-8b-instant"
+    timeout_s: float = 30.0
+    connect_timeout_s: float = 5.0
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry_s: float = 30.0
+    max_retries: int = 3
+    backoff_base_s: float = 0.5
+    backoff_max_s: float = 8.0
+
+
+@dataclass
+class LLMStats:
+    """Métricas acumuladas por cliente: llamadas, reintentos, tokens y latencias recientes."""
+
+    calls: int = 0
+    errors: int = 0
+    retries: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latencies_s: Deque[float] = field(default_factory=lambda: deque(maxlen=1000))
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, latency_s: float, usage: Any) -> None:
+        with self._lock:
+            self.calls += 1
+            self.latencies_s.append(latency_s)
+            if usage is not None:
+                self.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+                self.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+
+    def record_error(self) -> None:
+        with self._lock:
+            self.errors += 1
+
+    def record_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    def percentile(self, p: float) -> float:
+        with self._lock:
+            values = sorted(self.latencies_s)
+        if not values:
+            return 0.0
+        idx = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+        return values[idx]
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "p50_s": self.percentile(50),
+            "p95_s": self.percentile(95),
+        }
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    from groq import APIConnectionError  # ya importado si hubo una llamada
+
+    if isinstance(exc, APIConnectionError):  # incluye timeouts
+        return True
+    status = getattr(exc, "status_code", None)
+    return status is not None and (status == 429 or status >= 500)
+
+
+def _stream_delta(chunk: Any) -> str:
+    if not chunk.choices:
+        return ""
+    return chunk.choices[0].delta.content or ""
+
+
+def _stream_usage(chunk: Any) -> Any:
+    # Groq informa el uso de tokens en `x_groq.usage` del último fragmento
+    x_groq = getattr(chunk, "x_groq", None)
+    return getattr(x_groq, "usage", None) or getattr(chunk, "usage", None)
+
+
+def _prompt_chars(messages: Messages) -> int:
+    return sum(len(m.get("content") or "") for m in messages)
+
+
+def _usage_attributes(usage: Any) -> Dict[str, int]:
+    if usage is None:
+        return {}
+    return {
+        "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+        "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+    }
+
+
+def _backoff_delay(config: LLMClientConfig, attempt: int, exc: BaseException) -> float:
+    # si el servidor indica Retry-After, lo respetamos; si no, backoff exponencial con full jitter
+    response = getattr(exc, "response", None)
+    if response is not None and hasattr(response, "headers"):
+        retry_after = response.headers.get("retry-after")
+        if retry_after:
+            try:
+                return min(float(retry_after), config.backoff_max_s)
+            except ValueError:
+                pass
+    cap = min(config.backoff_max_s, config.backoff_base_s * (2**attempt))
+    return random.uniform(0, cap)
+
+
+class LLMClient:
+    """
+    Cliente LLM compartido: un único `Groq` sobre un pool httpx con keep-alive,
+    timeouts y reintentos con backoff+jitter ante 429/5xx. Registra latencia y tokens.
+
+    `client` permite inyectar cualquier objeto compatible con Groq (p. ej. FakeLLMClient).
+    Si no se inyecta, `groq` se importa recién en la primera llamada (arranque más rápido).
+    """
+
+    def __init__(self, config: LLMClientConfig, client: Optional[Any] = None) -> None:
+        self.config = config
+        self.stats = LLMStats()
+        self._http: Optional[httpx.Client] = None
+        if client is None:
+            self._http = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=config.max_connections,
+                    max_keepalive_connections=config.max_keepalive_connections,
+                    keepalive_expiry=config.keepalive_expiry_s,
+                ),
+                timeout=httpx.Timeout(config.timeout_s, connect=config.connect_timeout_s),
+            )
+        self._client = client
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self) -> Any:
+        """Cliente Groq; se construye (e importa `groq`) en el primer uso o en `warm_up`."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from groq import Groq
+
+                    # los reintentos los maneja este cliente para poder medirlos
+                    self._client = Groq(
+                        api_key=self.config.api_key,
+                        base_url=self.config.base_url or None,
+                        http_client=self._http,
+                        max_retries=0,
+                    )
+        return self._client
+
+    def warm_up(self) -> None:
+        self.client
+
+    def complete(
+        self,
+        messages: Messages,
+        model: Optional[str] = None,
+        temperature: float = 0.2,
+        **kwargs: Any,
+    ) -> Any:
+        model = model or self.config.model_name
+        with span("llm.complete", model=model, prompt_chars=_prompt_chars(messages)) as s:
+            attempt = 0
+            while True:
+                start = time.perf_counter()
+                try:
+                    completion = self.client.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        temperature=temperature,
+                        **kwargs,
+                    )
+                except Exception as exc:
+                    if attempt >= self.config.max_retries or not _is_retryable(exc):
+                        self.stats.record_error()
+                        raise
+                    self.stats.record_retry()
+                    s.set(retries=attempt + 1)
+                    time.sleep(_backoff_delay(self.config, attempt, exc))
+                    attempt += 1
+                    continue
+                usage = getattr(completion, "usage", None)
+                self.stats.record(time.perf_counter() - start, usage)
+                s.set(**_usage_attributes(usage))
+                return completion
+
+    def chat(
+        self,
+        messages: Messages,
+        model: Optional[str] = None,
+        temperature: float = 0.2,
+        **kwargs: Any,
+    ) -> str:
+        completion = self.complete(messages, model=model, temperature=temperature, **kwargs)
+        return completion.choices[0].message.content
+
+    def stream_chat(
+        self,
+        messages: Messages,
+        model: Optional[str] = None,
+        temperature: float = 0.2,
+        **kwargs: Any,
+    ) -> Iterator[str]:
+        """
+        Genera el texto de la respuesta a medida que llega. Sólo se reintenta si el
+        error ocurre antes del primer fragmento (después ya se entregó texto al llamador).
+        """
+        model = model or self.config.model_name
+        with span("llm.stream", model=model, prompt_chars=_prompt_chars(messages)) as s:
+            attempt = 0
+            while True:
+                start = time.perf_counter()
+                try:
+                    stream = self.client.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        temperature=temperature,
+                        stream=True,
+                        **kwargs,
+                    )
+                    iterator = iter(stream)
+                    first = next(iterator, None)
+                except Exception as exc:
+                    if attempt >= self.config.max_retries or not _is_retryable(exc):
+                        self.stats.record_error()
+                        raise
+                    self.stats.record_retry()
+                    s.set(retries=attempt + 1)
+                    time.sleep(_backoff_delay(self.config, attempt, exc))
+                    attempt += 1
+                    continue
+                break
+            s.set(first_chunk_ms=round((time.perf_counter() - start) * 1000.0, 1))
+
+            usage = None
+            try:
+                chunk = first
+                while chunk is not None:
+                    usage = _stream_usage(chunk) or usage
+                    delta = _stream_delta(chunk)
+                    if delta:
+                        yield delta
+                    chunk = next(iterator, None)
+            except Exception:
+                self.stats.record_error()
+                raise
+            self.stats.record(time.perf_counter() - start, usage)
+            s.set(**_usage_attributes(usage))
+
+    def close(self) -> None:
+        if self._http is not None:
+            self._http.close()
+
+
+class AsyncLLMClient:
+    """
+    Variante asíncrona de LLMClient (AsyncGroq + httpx.AsyncClient), misma política de
+    reintentos. El pool asíncrono queda atado al event loop donde se usa por primera vez:
+    pensado para el loop de fondo del router (`AgentRouter.answer_concurrent`).
+    """
+
+    def __init__(self, config: LLMClientConfig, client: Optional[Any] = None) -> None:
+        self.config = config
+        self.stats = LLMStats()
+        self._http: Optional[httpx.AsyncClient] = None
+        if client is None:
+            self._http = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=config.max_connections,
+                    max_keepalive_connections=config.max_keepalive_connections,
+                    keepalive_expiry=config.keepalive_expiry_s,
+                ),
+                timeout=httpx.Timeout(config.timeout_s, connect=config.connect_timeout_s),
+            )
+        self._client = client
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from groq import AsyncGroq
+
+                    self._client = AsyncGroq(
+                        api_key=self.config.api_key,
+                        base_url=self.config.base_url or None,
+                        http_client=self._http,
+                        max_retries=0,
+                    )
+        return self._client
+
+    def warm_up(self) -> None:
+        self.client
+
+    async def complete(
+        self,
+        messages: Messages,
+        model: Optional[str] = None,
+        temperature: float = 0.2,
+        **kwargs: Any,
+    ) -> Any:
+        model = model or self.config.model_name
+        with span("llm.complete", model=model, prompt_chars=_prompt_chars(messages)) as s:
+            attempt = 0
+            while True:
+                start = time.perf_counter()
+                try:
+                    completion = await self.client.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        temperature=temperature,
+                        **kwargs,
+                    )
+                except Exception as exc:
+                    if attempt >= self.config.max_retries or not _is_retryable(exc):
+                        self.stats.record_error()
+                        raise
+                    self.stats.record_retry()
+                    s.set(retries=attempt + 1)
+                    await asyncio.sleep(_backoff_delay(self.config, attempt, exc))
+                    attempt += 1
+                    continue
+                usage = getattr(completion, "usage", None)
+                self.stats.record(time.perf_counter() - start, usage)
+                s.set(**_usage_attributes(usage))
+                return completion
+
+    async def chat(
+        self,
+        messages: Messages,
+        model: Optional[str] = None,
+        temperature: float = 0.2,
+        **kwargs: Any,
+    ) -> str:
+        completion = await self.complete(messages, model=model, temperature=temperature, **kwargs)
+        return completion.choices[0].message.content
+
+    async def astream_chat(
+        self,
+        messages: Messages,
+        model: Optional[str] = None,
+        temperature: float = 0.2,
+        **kwargs: Any,
+    ) -> AsyncIterator[str]:
+        model = model or self.config.model_name
+        with span("llm.stream", model=model, prompt_chars=_prompt_chars(messages)) as s:
+            attempt = 0
+            while True:
+                start = time.perf_counter()
+                try:
+                    stream = await self.client.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        temperature=temperature,
+                        stream=True,
+                        **kwargs,
+                    )
+                    iterator = stream.__aiter__()
+                    first = await anext(iterator, None)
+                except Exception as exc:
+                    if attempt >= self.config.max_retries or not _is_retryable(exc):
+                        self.stats.record_error()
+                        raise
+                    self.stats.record_retry()
+                    s.set(retries=attempt + 1)
+                    await asyncio.sleep(_backoff_delay(self.config, attempt, exc))
+                    attempt += 1
+                    continue
+                break
+            s.set(first_chunk_ms=round((time.perf_counter() - start) * 1000.0, 1))
+
+            usage = None
+            try:
+                chunk = first
+                while chunk is not None:
+                    usage = _stream_usage(chunk) or usage
+                    delta = _stream_delta(chunk)
+                    if delta:
+                        yield delta
+                    chunk = await anext(iterator, None)
+            except Exception:
+                self.stats.record_error()
+                raise
+            self.stats.record(time.perf_counter() - start, usage)
+            s.set(**_usage_attributes(usage))
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+
+
+def llm_config_from_settings(settings: Settings) -> LLMClientConfig:
+    return LLMClientConfig(
+        api_key=settings.groq_api_key,
+        base_url=settings.groq_base_url or None,
+        model_name=settings.llm_model_name,
+        timeout_s=settings.llm_timeout_s,
+        max_connections=settings.llm_max_connections,
+        max_retries=settings.llm_max_retries,
+    )
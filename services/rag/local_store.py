@@ -0,0 +1,422 @@
+# services/rag/local_store.py
+from __future__ import annotations
+
+import json
+import os
+import pathlib
+import re
+import shutil
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from services.rag.batching import UpsertStats
+from services.telemetry.tracing import span
+
+
+_VECTORS_FILE = "vectors.npy"
+_META_FILE = "meta.json"
+# cada namespace es un store independiente en `path/namespaces/<nombre>/`
+_NAMESPACES_DIR = "namespaces"
+_NAMESPACE_NAME = re.compile(r"[\w][\w.-]*", re.UNICODE)
+
+
+def check_namespace(namespace: str) -> str:
+    """Los nombres de namespace son ids de persona: se usan como nombre de directorio."""
+    if not _NAMESPACE_NAME.fullmatch(namespace):
+        raise ValueError(f"Nombre de namespace inválido: {namespace!r}")
+    return namespace
+
+
+class LocalVectorStore:
+    """
+    Índice vectorial en memoria (NumPy) con la misma interfaz que VectorStore.
+
+    - Todos los vectores viven en una única matriz float32 contigua.
+    - Se mantiene un índice de filas por `person_id` para resolver el filtro
+      habitual del router sin recorrer la metadata.
+    - Las escrituras quedan en memoria hasta `flush()`, que persiste en
+      `path/vectors.npy` + `path/meta.json` (la ingesta lo llama una vez al final);
+      al cargar, la matriz se abre con memory-map, por lo que el arranque no copia el índice.
+    - Como en Pinecone, `namespace=` aísla particiones: cada una es otro store (su propia
+      matriz), así que consultar una persona no recorre los vectores de las demás.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        dimension: int = 384,
+        metric: str = "cosine",
+    ) -> None:
+        if metric not in ("cosine", "dotproduct"):
+            raise ValueError(f"Métrica no soportada por el store local: {metric}")
+
+        self._path = pathlib.Path(path)
+        self._dimension = dimension
+        self._metric = metric
+        self._lock = threading.Lock()
+
+        self._matrix: np.ndarray = np.empty((0, dimension), dtype=np.float32)
+        self._size = 0
+        self._ids: List[str] = []
+        self._metadatas: List[Dict] = []
+        self._row_by_id: Dict[str, int] = {}
+        self._rows_by_person: Dict[str, List[int]] = {}
+        self._person_rows_cache: Dict[str, np.ndarray] = {}
+        self._namespaces: Dict[str, "LocalVectorStore"] = {}
+        self._namespaces_lock = threading.Lock()
+        self._dirty = False
+
+        self._load()
+
+    # ------------------------------------------------------------------ #
+    # persistencia
+    # ------------------------------------------------------------------ #
+    def _load(self) -> None:
+        vectors_path = self._path / _VECTORS_FILE
+        meta_path = self._path / _META_FILE
+        if not vectors_path.exists() or not meta_path.exists():
+            return
+
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if meta["dimension"] != self._dimension:
+            raise ValueError(
+                f"El índice local en {self._path} tiene dimensión {meta['dimension']}, "
+                f"se esperaba {self._dimension}"
+            )
+
+        # mmap de sólo lectura: la primera escritura lo copia a memoria
+        self._matrix = np.load(vectors_path, mmap_mode="r")
+        self._size = self._matrix.shape[0]
+        self._ids = list(meta["ids"])
+        self._metadatas = list(meta["metadatas"])
+        self._rebuild_indexes()
+
+    def _save(self) -> None:
+        self._path.mkdir(parents=True, exist_ok=True)
+        vectors_path = self._path / _VECTORS_FILE
+        meta_path = self._path / _META_FILE
+
+        # escribimos a temporales y reemplazamos para no dejar el índice a medias
+        tmp_vectors = self._path / (_VECTORS_FILE + ".tmp")
+        with open(tmp_vectors, "wb") as f:
+            np.save(f, np.ascontiguousarray(self._matrix[: self._size]))
+        tmp_meta = self._path / (_META_FILE + ".tmp")
+        tmp_meta.write_text(
+            json.dumps(
+                {
+                    "dimension": self._dimension,
+                    "metric": self._metric,
+                    "ids": self._ids,
+                    "metadatas": self._metadatas,
+                },
+                ensure_ascii=False,
+            ),
+            encoding="utf-8",
+        )
+        os.replace(tmp_vectors, vectors_path)
+        os.replace(tmp_meta, meta_path)
+
+    def flush(self) -> None:
+        """Persiste lo escrito desde la última vez (este store y sus namespaces)."""
+        with self._lock:
+            if self._dirty:
+                self._save()
+                self._dirty = False
+        with self._namespaces_lock:
+            namespaces = list(self._namespaces.values())
+        for store in namespaces:
+            store.flush()
+
+    def _rebuild_indexes(self) -> None:
+        self._row_by_id = {_id: row for row, _id in enumerate(self._ids)}
+        self._rows_by_person = {}
+        for row, meta in enumerate(self._metadatas):
+            person_id = meta.get("person_id")
+            if person_id is not None:
+                self._rows_by_person.setdefault(person_id, []).append(row)
+        self._person_rows_cache = {}
+
+    def _index_row(self, row: int, person_id: Optional[str]) -> None:
+        if person_id is not None:
+            self._rows_by_person.setdefault(person_id, []).append(row)
+            self._person_rows_cache.pop(person_id, None)
+
+    def _unindex_row(self, row: int, person_id: Optional[str]) -> None:
+        if person_id is not None:
+            self._rows_by_person[person_id].remove(row)
+            self._person_rows_cache.pop(person_id, None)
+
+    # ------------------------------------------------------------------ #
+    # namespaces
+    # ------------------------------------------------------------------ #
+    def _namespace(self, namespace: Optional[str]) -> "LocalVectorStore":
+        if not namespace:
+            return self
+        with self._namespaces_lock:
+            store = self._namespaces.get(namespace)
+            if store is None:
+                store = LocalVectorStore(
+                    str(self._path / _NAMESPACES_DIR / check_namespace(namespace)),
+                    dimension=self._dimension,
+                    metric=self._metric,
+                )
+                self._namespaces[namespace] = store
+            return store
+
+    def namespace_counts(self) -> Dict[str, int]:
+        """{namespace: vectores}; "" es el namespace por defecto (el índice plano)."""
+        counts: Dict[str, int] = {}
+        if self._size:
+            counts[""] = self._size
+        root = self._path / _NAMESPACES_DIR
+        names = {p.name for p in root.iterdir() if p.is_dir()} if root.exists() else set()
+        with self._namespaces_lock:
+            names.update(self._namespaces)
+        for name in sorted(names):
+            size = len(self._namespace(name))
+            if size:
+                counts[name] = size
+        return counts
+
+    def delete_namespace(self, namespace: str) -> None:
+        """Borra un namespace entero (todos sus vectores) de una vez."""
+        if not namespace:
+            self.delete(list(self._ids))
+            return
+        with self._namespaces_lock:
+            self._namespaces.pop(namespace, None)
+        shutil.rmtree(self._path / _NAMESPACES_DIR / check_namespace(namespace), ignore_errors=True)
+
+    def list_ids(self, namespace: Optional[str] = None) -> Iterator[str]:
+        store = self._namespace(namespace)
+        with store._lock:
+            ids = list(store._ids[: store._size])
+        yield from ids
+
+    def __len__(self) -> int:
+        return self._size
+
+    # ------------------------------------------------------------------ #
+    # escritura
+    # ------------------------------------------------------------------ #
+    def _ensure_capacity(self, extra: int) -> None:
+        needed = self._size + extra
+        writable = isinstance(self._matrix, np.ndarray) and not isinstance(
+            self._matrix, np.memmap
+        )
+        if writable and needed <= self._matrix.shape[0]:
+            return
+
+        capacity = max(needed, 2 * self._matrix.shape[0], 64)
+        grown = np.empty((capacity, self._dimension), dtype=np.float32)
+        grown[: self._size] = self._matrix[: self._size]
+        self._matrix = grown
+
+    def _prepare(self, vectors: Any) -> np.ndarray:
+        # un array float32 (p. ej. de embed_array) se usa tal cual, sin copiarlo
+        arr = np.asarray(vectors, dtype=np.float32)
+        if arr.ndim == 1:
+            arr = arr.reshape(1, -1)
+        if arr.shape[1] != self._dimension:
+            raise ValueError(
+                f"Dimensión {arr.shape[1]} no coincide con la del índice ({self._dimension})"
+            )
+        if self._metric == "cosine":
+            norms = np.linalg.norm(arr, axis=1, keepdims=True)
+            if np.all(np.abs(norms - 1.0) < 1e-4):
+                return arr  # ya normalizados
+            norms[norms == 0] = 1.0
+            arr = arr / norms
+        return arr
+
+    def upsert(
+        self,
+        ids: List[str],
+        vectors: Any,
+        metadatas: List[Dict],
+        on_progress: Optional[Callable[[UpsertStats], None]] = None,
+        namespace: Optional[str] = None,
+    ) -> UpsertStats:
+        if namespace:
+            return self._namespace(namespace).upsert(ids, vectors, metadatas, on_progress)
+        # en memoria no hace falta partir en lotes: una sola escritura a la matriz
+        stats = UpsertStats()
+        ids = list(ids)
+        metadatas = list(metadatas)
+        if not ids:
+            return stats.finish()
+        arr = self._prepare(vectors)
+
+        with self._lock:
+            new_ids = [i for i in ids if i not in self._row_by_id]
+            self._ensure_capacity(len(new_ids))
+
+            # los índices se actualizan sólo para las filas tocadas; el disco se
+            # escribe recién en `flush()`
+            rows = np.empty(len(ids), dtype=np.int64)
+            for i, (_id, meta) in enumerate(zip(ids, metadatas)):
+                meta = dict(meta)
+                row = self._row_by_id.get(_id)
+                if row is None:
+                    row = self._size
+                    self._size += 1
+                    self._ids.append(_id)
+                    self._metadatas.append(meta)
+                    self._row_by_id[_id] = row
+                    self._index_row(row, meta.get("person_id"))
+                else:
+                    previous = self._metadatas[row].get("person_id")
+                    if previous != meta.get("person_id"):
+                        self._unindex_row(row, previous)
+                        self._index_row(row, meta.get("person_id"))
+                    self._metadatas[row] = meta
+                rows[i] = row
+            # una sola copia de todo el lote a la matriz (sin iterar vectores en Python)
+            self._matrix[rows] = arr
+            self._dirty = True
+
+        stats.add_batch(len(ids), arr.nbytes)
+        if on_progress is not None:
+            on_progress(stats)
+        return stats.finish()
+
+    def delete(
+        self,
+        ids: List[str],
+        on_progress: Optional[Callable[[UpsertStats], None]] = None,
+        namespace: Optional[str] = None,
+    ) -> UpsertStats:
+        if namespace:
+            return self._namespace(namespace).delete(ids, on_progress)
+        stats = UpsertStats()
+        ids = list(ids)
+        with self._lock:
+            drop = {self._row_by_id[i] for i in ids if i in self._row_by_id}
+            if not drop:
+                return stats.finish()
+            keep = [row for row in range(self._size) if row not in drop]
+            self._matrix = np.ascontiguousarray(self._matrix[keep], dtype=np.float32)
+            self._size = len(keep)
+            self._ids = [self._ids[row] for row in keep]
+            self._metadatas = [self._metadatas[row] for row in keep]
+            self._rebuild_indexes()
+            self._dirty = True
+
+        stats.add_batch(len(drop), 0)
+        if on_progress is not None:
+            on_progress(stats)
+        return stats.finish()
+
+    def fetch(
+        self,
+        ids: List[str],
+        namespace: Optional[str] = None,
+    ) -> Dict[str, Tuple[List[float], Dict]]:
+        if namespace:
+            return self._namespace(namespace).fetch(ids)
+        with self._lock:
+            rows = [(i, self._row_by_id[i]) for i in ids if i in self._row_by_id]
+            return {
+                _id: (self._matrix[row].tolist(), dict(self._metadatas[row]))
+                for _id, row in rows
+            }
+
+    # ------------------------------------------------------------------ #
+    # lectura
+    # ------------------------------------------------------------------ #
+    def _person_rows(self, person_id: str) -> np.ndarray:
+        rows = self._person_rows_cache.get(person_id)
+        if rows is None:
+            rows = np.asarray(self._rows_by_person.get(person_id, []), dtype=np.int64)
+            self._person_rows_cache[person_id] = rows
+        return rows
+
+    @staticmethod
+    def _match(value: Any, condition: Any) -> bool:
+        if isinstance(condition, dict):
+            for op, operand in condition.items():
+                if op == "$eq" and value != operand:
+                    return False
+                if op == "$ne" and value == operand:
+                    return False
+                if op == "$in" and value not in operand:
+                    return False
+                if op == "$nin" and value in operand:
+                    return False
+            return True
+        return value == condition
+
+    def _candidate_rows(self, metadata_filter: Optional[Dict]) -> Optional[np.ndarray]:
+        """
+        Devuelve las filas que cumplen el filtro (None = todas).
+        El filtro por `person_id` se resuelve con el índice; el resto, recorriendo metadata.
+        """
+        if not metadata_filter:
+            return None
+
+        if set(metadata_filter) == {"person_id"}:
+            cond = metadata_filter["person_id"]
+            persons: Optional[Sequence[str]] = None
+            if not isinstance(cond, dict):
+                persons = [cond]
+            elif set(cond) == {"$eq"}:
+                persons = [cond["$eq"]]
+            elif set(cond) == {"$in"}:
+                persons = list(cond["$in"])
+
+            if persons is not None:
+                parts = [self._person_rows(p) for p in dict.fromkeys(persons)]
+                if not parts:
+                    return np.empty(0, dtype=np.int64)
+                return np.concatenate(parts)
+
+        rows = [
+            row
+            for row, meta in enumerate(self._metadatas)
+            if all(self._match(meta.get(k), c) for k, c in metadata_filter.items())
+        ]
+        return np.asarray(rows, dtype=np.int64)
+
+    def query(
+        self,
+        vector: Any,
+        top_k: int = 4,
+        metadata_filter: Optional[Dict] = None,
+        namespace: Optional[str] = None,
+        include_metadata: bool = True,
+    ) -> List[Tuple[str, float, Dict]]:
+        if namespace:
+            return self._namespace(namespace).query(
+                vector, top_k, metadata_filter, include_metadata=include_metadata
+            )
+        with span("vector.query", backend="local", top_k=top_k) as s:
+            q = self._prepare(vector)[0]
+
+            with self._lock:
+                matrix = self._matrix[: self._size]
+                rows = self._candidate_rows(metadata_filter)
+                ids = self._ids
+                metadatas = self._metadatas
+
+            if rows is None:
+                scores = matrix @ q
+            else:
+                scores = matrix[rows] @ q
+            s.set(candidates=int(scores.shape[0]))
+
+            k = min(top_k, scores.shape[0])
+            if k <= 0:
+                return []
+
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+
+            matches: List[Tuple[str, float, Dict]] = []
+            for pos in top:
+                row = int(pos if rows is None else rows[pos])
+                meta = dict(metadatas[row]) if include_metadata else {}
+                matches.append((ids[row], float(scores[pos]), meta))
+            s.set(matches=len(matches))
+            return matches
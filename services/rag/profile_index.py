@@ -0,0 +1,157 @@
+# services/rag/profile_index.py
+from __future__ import annotations
+
+import json
+import os
+import pathlib
+import re
+import threading
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+
+PROFILE_FORMAT = 1
+
+# secciones reconocidas del CV (título normalizado → campo del perfil)
+SECTION_FIELDS = {
+    "contacto": "contact",
+    "aptitudes principales": "skills",
+    "aptitudes": "skills",
+    "habilidades": "skills",
+    "certificaciones": "certifications",
+    "publicaciones": "publications",
+    "idiomas": "languages",
+    "languages": "languages",
+    "extracto": "summary",
+    "experiencia": "experience",
+    "educación": "education",
+    "educacion": "education",
+}
+
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_PHONE = re.compile(r"(?:tel[ée]fono|tel|cel(?:ular)?|phone)\s*:\s*(.+)", re.IGNORECASE)
+_LINKEDIN = re.compile(r"https?://(?:[\w-]+\.)?linkedin\.com/\S+", re.IGNORECASE)
+_BULLET = re.compile(r"^[-•*·]\s*")
+
+
+@dataclass
+class Profile:
+    """Datos puntuales de un CV, extraídos en la ingesta para responder sin RAG ni LLM."""
+
+    person_id: str
+    name: str
+    headline: str = ""
+    location: str = ""
+    email: str = ""
+    phone: str = ""
+    linkedin: str = ""
+    skills: List[str] = field(default_factory=list)
+    certifications: List[str] = field(default_factory=list)
+    publications: List[str] = field(default_factory=list)
+    languages: List[str] = field(default_factory=list)
+
+
+def _section_title(line: str) -> Optional[str]:
+    key = line.strip().rstrip(":").strip().lower()
+    return SECTION_FIELDS.get(key)
+
+
+def split_sections(raw_text: str) -> Tuple[List[str], Dict[str, List[str]]]:
+    """(líneas del encabezado, {campo: líneas no vacías de la sección})."""
+    header: List[str] = []
+    sections: Dict[str, List[str]] = {}
+    current: Optional[List[str]] = None
+    for line in raw_text.splitlines():
+        text = line.strip()
+        if not text:
+            continue
+        name = _section_title(text)
+        if name is not None:
+            current = sections.setdefault(name, [])
+        elif current is None:
+            header.append(text)
+        else:
+            current.append(_BULLET.sub("", text))
+    return header, sections
+
+
+def extract_profile(person_id: str, name: str, raw_text: str) -> Profile:
+    """
+    Lee el encabezado (nombre, titular, ubicación) y las secciones marcadas del CV.
+    Lo que no se encuentra queda vacío: el router vuelve al RAG para esos campos.
+    """
+    header, sections = split_sections(raw_text)
+    profile = Profile(person_id=person_id, name=name)
+    # encabezado: nombre completo, titular y ubicación, en ese orden
+    if len(header) > 1:
+        profile.headline = header[1]
+    if len(header) > 2 and len(header[2]) <= 60:
+        profile.location = header[2]
+
+    contact = "\n".join(sections.get("contact", []))
+    email = _EMAIL.search(contact)
+    phone = _PHONE.search(contact)
+    linkedin = _LINKEDIN.search(contact)
+    profile.email = email.group(0) if email else ""
+    profile.phone = phone.group(1).strip() if phone else ""
+    profile.linkedin = linkedin.group(0) if linkedin else ""
+
+    profile.skills = sections.get("skills", [])
+    profile.certifications = sections.get("certifications", [])
+    profile.publications = sections.get("publications", [])
+    profile.languages = sections.get("languages", [])
+    return profile
+
+
+class ProfileIndex:
+    """
+    Perfiles de todas las personas en un JSON chico (`PROFILE_INDEX_PATH`).
+    Se relee sólo cuando cambia el mtime del archivo, así la ingesta lo actualiza
+    sin reiniciar la app y consultarlo en cada pregunta cuesta un `stat`.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = pathlib.Path(path)
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._profiles: Dict[str, Profile] = {}
+        self._lock = threading.Lock()
+
+    def get(self, person_id: str) -> Optional[Profile]:
+        return self.profiles().get(person_id)
+
+    def profiles(self) -> Dict[str, Profile]:
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return {}
+        stamp = (st.st_mtime_ns, st.st_ino)
+        if stamp != self._stamp:
+            with self._lock:
+                if stamp != self._stamp:
+                    self._profiles = self._read()
+                    self._stamp = stamp
+        return self._profiles
+
+    def _read(self) -> Dict[str, Profile]:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+        if data.get("format") != PROFILE_FORMAT:
+            return {}
+        return {pid: Profile(**entry) for pid, entry in data.get("profiles", {}).items()}
+
+    def save(self, profiles: Dict[str, Profile]) -> bool:
+        """Escribe los perfiles (atómico); devuelve False si no cambió nada."""
+        data = {
+            "format": PROFILE_FORMAT,
+            "profiles": {pid: asdict(p) for pid, p in sorted(profiles.items())},
+        }
+        content = json.dumps(data, ensure_ascii=False, indent=1)
+        if self.path.exists() and self.path.read_text(encoding="utf-8") == content:
+            return False
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(content, encoding="utf-8")
+        os.replace(tmp, self.path)
+        return True
@@ -0,0 +1,165 @@
+# services/rag/startup.py
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from services.rag.embeddings import (
+    embedding_server,
+    get_embedding_cache,
+    load_model,
+    warm_up_model,
+)
+
+
+# instante de importación de este módulo: aproxima el arranque del proceso
+PROCESS_START = time.perf_counter()
+
+
+@dataclass
+class Phase:
+    name: str
+    status: str = "pending"  # pending | running | ready | failed
+    started_at: float = 0.0
+    seconds: float = 0.0
+    error: str = ""
+
+
+class Readiness:
+    """
+    Estado de las fases de arranque (carga del modelo, warm-up, router, ...) con sus
+    tiempos. Thread-safe: las fases pueden correr en hilos de fondo.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._phases: Dict[str, Phase] = {}
+        self._changed = threading.Condition(self._lock)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[Phase]:
+        with self._lock:
+            current = Phase(name=name, status="running", started_at=time.perf_counter())
+            self._phases[name] = current
+        try:
+            yield current
+        except BaseException as exc:
+            with self._changed:
+                current.status = "failed"
+                current.error = f"{type(exc).__name__}: {exc}"
+                current.seconds = time.perf_counter() - current.started_at
+                self._changed.notify_all()
+            raise
+        with self._changed:
+            current.status = "ready"
+            current.seconds = time.perf_counter() - current.started_at
+            self._changed.notify_all()
+
+    def mark(self, name: str, seconds: float) -> None:
+        """Registra una fase ya medida por fuera (p. ej. tiempo hasta el primer render)."""
+        with self._changed:
+            if name not in self._phases:
+                self._phases[name] = Phase(name=name, status="ready", seconds=seconds)
+                self._changed.notify_all()
+
+    def phases(self) -> List[Phase]:
+        with self._lock:
+            return [Phase(**vars(p)) for p in self._phases.values()]
+
+    def is_ready(self, *names: str) -> bool:
+        with self._lock:
+            return all(
+                n in self._phases and self._phases[n].status == "ready" for n in names
+            )
+
+    def wait(self, *names: str, timeout: Optional[float] = None) -> bool:
+        """Espera a que las fases terminen (bien o mal); True si todas quedaron listas."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        def settled() -> bool:
+            return all(
+                n in self._phases and self._phases[n].status in ("ready", "failed")
+                for n in names
+            )
+
+        with self._changed:
+            while not settled():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._changed.wait(remaining)
+            return all(self._phases[n].status == "ready" for n in names)
+
+    def summary(self) -> str:
+        parts = []
+        for p in self.phases():
+            if p.status == "running":
+                parts.append(f"{p.name}: en curso")
+            elif p.status == "failed":
+                parts.append(f"{p.name}: error ({p.error})")
+            else:
+                parts.append(f"{p.name}: {p.seconds:.2f}s")
+        return ", ".join(parts)
+
+
+readiness = Readiness()
+
+EMBEDDING_LOAD = "modelo de embeddings"
+EMBEDDING_WARMUP = "warm-up del encoder"
+EMBEDDING_CACHE = "cache de embeddings"
+LLM_CLIENT = "cliente LLM"
+
+_warmup_thread: Optional[threading.Thread] = None
+_warmup_lock = threading.Lock()
+
+
+def _warm_up_embeddings(model_name: str) -> None:
+    try:
+        with readiness.phase(EMBEDDING_LOAD):
+            load_model(model_name)
+        with readiness.phase(EMBEDDING_WARMUP):
+            warm_up_model(model_name)
+        if embedding_server() is None:
+            # con servidor de embeddings el cache vive del otro lado del socket
+            with readiness.phase(EMBEDDING_CACHE):
+                get_embedding_cache(model_name)
+    except Exception as exc:
+        # el error queda en `readiness`; la primera pregunta reintentará la carga
+        print(f"Warm-up del modelo falló: {type(exc).__name__}: {exc}")
+
+
+def start_background_warmup(model_name: str) -> threading.Thread:
+    """
+    Carga y calienta el modelo de embeddings en un hilo daemon (una vez por proceso),
+    para que la página se renderice sin esperar a torch y la primera pregunta no pague
+    la carga ni la primera inferencia.
+    """
+    global _warmup_thread
+    with _warmup_lock:
+        if _warmup_thread is None:
+            _warmup_thread = threading.Thread(
+                target=_warm_up_embeddings,
+                args=(model_name,),
+                name="warmup-embeddings",
+                daemon=True,
+            )
+            _warmup_thread.start()
+    return _warmup_thread
+
+
+def run_in_background(name: str, fn: Callable[[], Any]) -> threading.Thread:
+    """Corre `fn` en un hilo daemon registrándola como fase `name`."""
+
+    def run() -> None:
+        try:
+            with readiness.phase(name):
+                fn()
+        except Exception as exc:
+            print(f"{name} falló: {type(exc).__name__}: {exc}")
+
+    thread = threading.Thread(target=run, name=f"warmup-{name}", daemon=True)
+    thread.start()
+    return thread
@@ -1,10 +1,20 @@
 # services/rag/vector_store.py
 from __future__ import annotations
 
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 
-from pinecone import Pinecone, ServerlessSpec
+from config import Settings
+from services.rag.batching import (
+    UpsertStats,
+    call_with_retries,
+    estimate_record_bytes,
+    iter_count_batches,
+    iter_size_batches,
+)
+from services.rag.local_store import LocalVectorStore
+from services.telemetry.tracing import span
 
 
 @dataclass
@@ -15,16 +25,37 @@ class VectorStoreConfig:
     region: str = "us-east-1"
     dimension: int = 384
     metric: str = "cosine"
+    # límites por request de Pinecone: 1000 vectores / 2 MB en upsert, 1000 ids en delete
+    upsert_batch_size: int = 100
+    upsert_max_bytes: int = 2_000_000
+    delete_batch_size: int = 1000
+    fetch_batch_size: int = 200
+    max_workers: int = 4
+    max_retries: int = 3
 
 
 class VectorStore:
     def __init__(self, config: VectorStoreConfig) -> None:
+        # import diferido: con el backend local no se carga el SDK de Pinecone
+        from pinecone import Pinecone
+
         self._config = config
         self._client = Pinecone(api_key=config.api_key)
         self._ensure_index()
         self._index = self._client.Index(config.index_name)
 
+    @classmethod
+    def from_index(cls, config: VectorStoreConfig, index: Any) -> "VectorStore":
+        """Envuelve un índice ya construido (p. ej. un fake para benchmarks) sin tocar la red."""
+        store = cls.__new__(cls)
+        store._config = config
+        store._client = None
+        store._index = index
+        return store
+
     def _ensure_index(self) -> None:
+        from pinecone import ServerlessSpec
+
         existing = [idx["name"] for idx in self._client.list_indexes()]
         if self._config.index_name not in existing:
             self._client.create_index(
@@ -37,38 +68,209 @@ class VectorStore:
                 ),
             )
 
+    def _run_batches(
+        self,
+        batches: Iterable[Tuple[List[Any], int]],
+        send: Callable[[List[Any]], Any],
+        on_progress: Optional[Callable[[UpsertStats], None]] = None,
+    ) -> UpsertStats:
+        """
+        Envía los lotes por un pool de hilos acotado. Como mucho hay `2 * max_workers`
+        lotes en vuelo, así la memoria no depende del tamaño total de la entrada.
+        """
+        stats = UpsertStats()
+        max_in_flight = 2 * self._config.max_workers
+
+        def run(batch: List[Any], size: int) -> None:
+            call_with_retries(
+                lambda: send(batch),
+                max_retries=self._config.max_retries,
+                on_retry=lambda exc: stats.add_retry(),
+            )
+            stats.add_batch(len(batch), size)
+            if on_progress is not None:
+                on_progress(stats)
+
+        with ThreadPoolExecutor(
+            max_workers=self._config.max_workers,
+            thread_name_prefix="pinecone",
+        ) as pool:
+            pending: Set[Future] = set()
+            for batch, size in batches:
+                if len(pending) >= max_in_flight:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for f in done:
+                        f.result()
+                pending.add(pool.submit(run, batch, size))
+            for f in pending:
+                f.result()
+        return stats.finish()
+
     def upsert(
         self,
-        ids: List[str],
-        vectors: List[List[float]],
-        metadatas: List[Dict],
-    ) -> None:
-        payload = []
-        for _id, vec, meta in zip(ids, vectors, metadatas):
-            payload.append(
-                {"id": _id, "values": vec, "metadata": meta}
+        ids: Iterable[str],
+        vectors: Iterable[Any],
+        metadatas: Iterable[Dict],
+        on_progress: Optional[Callable[[UpsertStats], None]] = None,
+        namespace: Optional[str] = None,
+    ) -> UpsertStats:
+        """
+        Sube vectores en lotes limitados por cantidad y por bytes, en paralelo y con
+        reintentos por lote. Acepta iterables (se consumen de a un lote).
+        """
+        ns = _namespace_kwargs(namespace)
+
+        def records() -> Iterable[Tuple[Dict, int]]:
+            # `vectors` suele ser una matriz float32: se pasa a lista fila a fila recién
+            # al armar el payload del lote (la frontera de serialización)
+            for _id, vec, meta in zip(ids, vectors, metadatas):
+                values = vec.tolist() if hasattr(vec, "tolist") else list(vec)
+                record = {"id": _id, "values": values, "metadata": meta}
+                yield record, estimate_record_bytes(_id, values, meta)
+
+        def batches() -> Iterable[Tuple[List[Dict], int]]:
+            for batch in iter_size_batches(
+                records(),
+                size_of=lambda r: r[1],
+                max_items=self._config.upsert_batch_size,
+                max_bytes=self._config.upsert_max_bytes,
+            ):
+                yield [r for r, _ in batch], sum(size for _, size in batch)
+
+        return self._run_batches(
+            batches(),
+            lambda payload: self._index.upsert(vectors=payload, **ns),
+            on_progress,
+        )
+
+    def delete(
+        self,
+        ids: Iterable[str],
+        on_progress: Optional[Callable[[UpsertStats], None]] = None,
+        namespace: Optional[str] = None,
+    ) -> UpsertStats:
+        ns = _namespace_kwargs(namespace)
+        batches = (
+            (batch, sum(len(i) for i in batch))
+            for batch in iter_count_batches(ids, self._config.delete_batch_size)
+        )
+        return self._run_batches(
+            batches,
+            lambda batch: self._index.delete(ids=batch, **ns),
+            on_progress,
+        )
+
+    def fetch(
+        self,
+        ids: Iterable[str],
+        namespace: Optional[str] = None,
+    ) -> Dict[str, Tuple[List[float], Dict]]:
+        """Devuelve {id: (values, metadata)} de los ids que existan en el índice."""
+        found: Dict[str, Tuple[List[float], Dict]] = {}
+        batches = list(iter_count_batches(ids, self._config.fetch_batch_size))
+        ns = _namespace_kwargs(namespace)
+
+        def fetch_batch(batch: List[str]) -> Dict[str, Any]:
+            return call_with_retries(
+                lambda: self._index.fetch(ids=batch, **ns).vectors,
+                max_retries=self._config.max_retries,
             )
-        self._index.upsert(vectors=payload)
+
+        with ThreadPoolExecutor(
+            max_workers=self._config.max_workers,
+            thread_name_prefix="pinecone",
+        ) as pool:
+            for vectors in pool.map(fetch_batch, batches):
+                for _id, vec in vectors.items():
+                    found[_id] = (list(vec.values), dict(vec.metadata or {}))
+        return found
+
+    def flush(self) -> None:
+        """Pinecone persiste cada escritura: nada que hacer (ver `LocalVectorStore.flush`)."""
 
     def query(
         self,
-        vector: List[float],
+        vector: Any,
         top_k: int = 4,
         metadata_filter: Optional[Dict] = None,
+        namespace: Optional[str] = None,
+        include_metadata: bool = True,
     ) -> List[Tuple[str, float, Dict]]:
         kwargs = dict(
-            vector=vector,
+            vector=vector.tolist() if hasattr(vector, "tolist") else list(vector),
             top_k=top_k,
-            include_metadata=True,
+            include_metadata=include_metadata,
+            **_namespace_kwargs(namespace),
         )
         if metadata_filter:
             kwargs["filter"] = metadata_filter
 
-        res = self._index.query(**kwargs)
+        with span("vector.query", backend="pinecone", top_k=top_k) as s:
+            res = self._index.query(**kwargs)
 
-        matches: List[Tuple[str, float, Dict]] = []
-        for m in res["matches"]:
-            matches.append(
-                (m["id"], m["score"], m.get("metadata", {})),
-            )
-        return matches
+            matches: List[Tuple[str, float, Dict]] = []
+            for m in res["matches"]:
+                matches.append(
+                    (m["id"], m["score"], m.get("metadata") or {}),
+                )
+            s.set(matches=len(matches))
+            return matches
+
+    def list_ids(self, namespace: Optional[str] = None) -> Iterator[str]:
+        """Ids de un namespace, paginados por Pinecone (sólo índices serverless)."""
+        for page in self._index.list(**_namespace_kwargs(namespace)):
+            yield from page
+
+    def namespace_counts(self) -> Dict[str, int]:
+        """{namespace: vectores}; "" es el namespace por defecto."""
+        stats = self._index.describe_index_stats()
+        namespaces = stats["namespaces"] if isinstance(stats, dict) else stats.namespaces
+        counts: Dict[str, int] = {}
+        for name, info in (namespaces or {}).items():
+            count = info["vector_count"] if isinstance(info, dict) else info.vector_count
+            if count:
+                counts[name] = int(count)
+        return counts
+
+    def delete_namespace(self, namespace: str) -> None:
+        """Borra todos los vectores de un namespace con una sola operación."""
+        if namespace not in self.namespace_counts():
+            return  # Pinecone responde 404 al borrar un namespace que no existe
+        call_with_retries(
+            lambda: self._index.delete(delete_all=True, **_namespace_kwargs(namespace)),
+            max_retries=self._config.max_retries,
+        )
+
+
+def _namespace_kwargs(namespace: Optional[str]) -> Dict[str, str]:
+    # sin namespace no se manda el parámetro: se usa el namespace por defecto ("")
+    return {"namespace": namespace} if namespace else {}
+
+
+def create_vector_store(
+    settings: Settings,
+    dimension: int = 384,
+) -> Union[VectorStore, LocalVectorStore]:
+    """
+    Construye el backend vectorial configurado en `settings.vector_backend`.
+    Ambos exponen `upsert`/`delete`/`query` con `namespace=`, `delete_namespace` y
+    `flush` (el store local sólo escribe a disco ahí).
+    """
+    if settings.vector_backend == "local":
+        return LocalVectorStore(settings.local_index_dir, dimension=dimension)
+
+    vs_config = VectorStoreConfig(
+        api_key=settings.pinecone_api_key,
+        index_name=settings.pinecone_index_name,
+        cloud=settings.pinecone_cloud,
+        region=settings.pinecone_region,
+        dimension=dimension,
+        upsert_batch_size=settings.upsert_batch_size,
+        max_workers=settings.upsert_workers,
+    )
+    return VectorStore(vs_config)
+
+
+def person_namespace(settings: Settings, person_id: str) -> Optional[str]:
+    """Namespace de una persona (`VECTOR_NAMESPACES=person`) o None si el índice es plano."""
+    return person_id if settings.vector_namespaces == "person" else None
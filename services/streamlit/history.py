@@ -0,0 +1,95 @@
+# services/streamlit/history.py
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from services.agents.multi_agent import RetrievedChunk
+from services.rag.chunk_store import ChunkTextStore
+
+
+@dataclass(frozen=True)
+class ChunkRef:
+    id: str
+    score: float
+
+
+@dataclass(frozen=True)
+class ContextGroup:
+    person_name: str
+    chunks: Tuple[ChunkRef, ...]
+    # texto acotado de los chunks que el store no puede devolver (perfil, índice con texto
+    # en la metadata); el resto se resuelve por id al dibujar
+    excerpts: Dict[str, str] = field(default_factory=dict)
+
+
+def compact_context(
+    chunks: Sequence[RetrievedChunk],
+    store: Optional[ChunkTextStore],
+    excerpt_chars: int,
+) -> List[ContextGroup]:
+    """
+    Vista del contexto de una respuesta, agrupada por persona una sola vez al guardarla.
+    Guarda ids y scores: como el id depende del contenido, el texto se vuelve a leer del
+    store. Si el store no lo tiene, queda sólo un extracto de `excerpt_chars` caracteres.
+    """
+    stored = set(store.get_many(c.id for c in chunks)) if chunks and store is not None else set()
+    refs: Dict[str, List[ChunkRef]] = {}
+    excerpts: Dict[str, Dict[str, str]] = {}
+    for c in chunks:
+        refs.setdefault(c.person_name, []).append(ChunkRef(c.id, c.score))
+        if c.id not in stored:
+            excerpts.setdefault(c.person_name, {})[c.id] = excerpt(c.text, excerpt_chars)
+    return [
+        ContextGroup(name, tuple(group), excerpts.get(name, {})) for name, group in refs.items()
+    ]
+
+
+def excerpt(text: str, max_chars: int) -> str:
+    """Primeros `max_chars` caracteres del texto, cortando en un espacio si se puede."""
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind(" ", 0, max_chars)
+    return text[: cut if cut > 0 else max_chars].rstrip() + "…"
+
+
+def context_texts(
+    contexts: Iterable[Optional[List[ContextGroup]]],
+    store: Optional[ChunkTextStore],
+) -> Dict[str, str]:
+    """Textos de todas las referencias a dibujar, en una sola lectura del store."""
+    texts: Dict[str, str] = {}
+    missing: List[str] = []
+    for groups in contexts:
+        for group in groups or []:
+            texts.update(group.excerpts)
+            missing.extend(ref.id for ref in group.chunks if ref.id not in group.excerpts)
+    if missing and store is not None:
+        texts.update(store.get_many(missing))
+    return texts
+
+
+def visible_start(messages: Sequence[Dict[str, Any]], visible: int, pages: int) -> int:
+    """
+    Índice del primer mensaje a dibujar: los últimos `visible * pages`, empezando
+    siempre en una pregunta para no mostrar una respuesta suelta. 0 = todos.
+    """
+    if visible <= 0:
+        return 0
+    start = max(0, len(messages) - visible * pages)
+    while start > 0 and messages[start]["role"] != "user":
+        start -= 1
+    return start
+
+
+def trim_history(messages: List[Dict[str, Any]], max_messages: int) -> int:
+    """
+    Descarta los mensajes más viejos por encima de `max_messages` (0 = sin tope),
+    cortando en una pregunta. Devuelve cuántos se descartaron.
+    """
+    if max_messages <= 0 or len(messages) <= max_messages:
+        return 0
+    cut = len(messages) - max_messages
+    turn = next((i for i in range(cut, len(messages)) if messages[i]["role"] == "user"), cut)
+    del messages[:turn]
+    return turn
@@ -1,49 +1,160 @@
 # services/streamlit/main.py
 from __future__ import annotations
 
+import time
+from typing import Any, Dict, List, Optional
+
 import streamlit as st
 
 from config import get_settings
-from services.rag.vector_store import VectorStore, VectorStoreConfig
-from services.agents.multi_agent import AgentRouter, RetrievedChunk
+from services.rag.embeddings import configure_embeddings
+from services.rag.startup import (
+    EMBEDDING_LOAD,
+    EMBEDDING_WARMUP,
+    LLM_CLIENT,
+    PROCESS_START,
+    readiness,
+    run_in_background,
+    start_background_warmup,
+)
+from services.rag.vector_store import create_vector_store
+from services.agents.multi_agent import AgentRouter
+from services.streamlit.history import (
+    ContextGroup,
+    compact_context,
+    context_texts,
+    trim_history,
+    visible_start,
+)
+from services.telemetry.exporters import configure_telemetry
+from services.telemetry.tracing import Trace, trace
 
 
 @st.cache_resource
 def get_router() -> AgentRouter:
     settings = get_settings()
-    vs_config = VectorStoreConfig(
-        api_key=settings.pinecone_api_key,
-        index_name=settings.pinecone_index_name,
-        cloud=settings.pinecone_cloud,
-        region=settings.pinecone_region,
-        dimension=384,  # mismo que embeddings
-    )
-    store = VectorStore(vs_config)
-    return AgentRouter(settings, store)
+    configure_telemetry(settings)
+    configure_embeddings(settings)
+    # torch + modelo se cargan en segundo plano: la página no los espera
+    start_background_warmup(settings.embedding_model_name)
+    with readiness.phase("router"):
+        store = create_vector_store(settings, dimension=384)  # mismo que embeddings
+        router = AgentRouter(settings, store)
+    run_in_background(LLM_CLIENT, router.llm.warm_up)
+    return router
 
 
 def init_session_state() -> None:
     if "messages" not in st.session_state:
         st.session_state.messages = []
+        # páginas del historial a la vista y mensajes descartados por el tope de la sesión
+        st.session_state.history_pages = 1
+        st.session_state.history_dropped = 0
 
 
 def render_sidebar() -> None:
     settings = get_settings()
     st.sidebar.title("ℹ️ Info TP3")
+    backend = "un índice local" if settings.vector_backend == "local" else "Pinecone"
+    partition = (
+        "con un namespace por persona"
+        if settings.vector_namespaces == "person"
+        else "con filtro por `person_id`"
+    )
     st.sidebar.markdown(
-        """
+        f"""
 **TP3 – Chatbot multi-agente sobre CVs**
 
 - 1 agente por persona (cada CV del equipo).
-- RAG sobre Pinecone con filtro por `person_id`.
+- RAG sobre {backend}, {partition}.
+- Consultas puntuales (email, teléfono, aptitudes, certificaciones) se responden directo del perfil del CV.
 - Si no se menciona a nadie, se usa el CV del alumno por defecto.
 - Si se mencionan varios nombres, se combinan contextos y se responde por persona.
 """
     )
+    st.sidebar.checkbox("Mostrar tiempos por respuesta", key="show_timings")
     st.sidebar.markdown("### Personas disponibles:")
     for p in settings.persons:
         default_mark = " *(por defecto)*" if p.is_default else ""
         st.sidebar.markdown(f"- {p.name}{default_mark}")
+    render_readiness()
+
+
+def render_readiness() -> None:
+    ready = readiness.is_ready(EMBEDDING_LOAD, EMBEDDING_WARMUP)
+    label = "✅ Listo" if ready else "⏳ Cargando modelo de embeddings…"
+    with st.sidebar.expander(f"Arranque: {label}"):
+        for p in readiness.phases():
+            if p.status == "running":
+                st.markdown(f"- {p.name}: en curso…")
+            elif p.status == "failed":
+                st.markdown(f"- {p.name}: ❌ {p.error}")
+            else:
+                st.markdown(f"- {p.name}: {p.seconds:.2f} s")
+
+
+def render_context(groups: List[ContextGroup], texts: Dict[str, str]) -> None:
+    with st.expander("Ver fragmentos de CV usados como contexto"):
+        for group in groups:
+            st.markdown(f"### {group.person_name}")
+            for i, ref in enumerate(group.chunks, start=1):
+                st.markdown(f"**Fragmento {i}** (score: {ref.score:.3f})")
+                text = texts.get(ref.id)
+                st.write(text or "*(el fragmento ya no está en el índice)*")
+
+
+def show_older_messages() -> None:
+    st.session_state.history_pages += 1
+
+
+def render_history(router: AgentRouter) -> None:
+    """
+    Dibuja sólo los últimos `CHAT_HISTORY_VISIBLE` mensajes (más las páginas que se
+    pidan); así el costo de cada rerun no crece con el largo de la conversación.
+    """
+    settings = get_settings()
+    messages = st.session_state.messages
+    visible = settings.chat_history_visible
+    start = visible_start(messages, visible, st.session_state.history_pages)
+    if st.session_state.history_dropped:
+        st.caption(
+            f"Se descartaron {st.session_state.history_dropped} mensajes viejos "
+            f"(tope de {settings.chat_history_max_messages} por sesión)."
+        )
+    if start:
+        st.button(
+            f"Mostrar mensajes anteriores ({start} ocultos)",
+            on_click=show_older_messages,
+        )
+
+    shown = messages[start:]
+    texts = context_texts((m.get("context") for m in shown), router.chunk_store)
+    for msg in shown:
+        with st.chat_message(msg["role"]):
+            st.markdown(msg["content"])
+            if msg["role"] == "assistant" and msg.get("context"):
+                render_context(msg["context"], texts)
+            if msg.get("timings"):
+                render_timings(msg["timings"])
+
+
+def timing_rows(t: Optional[Trace]) -> List[Dict[str, Any]]:
+    """Filas (etapa, ms, atributos) del árbol de spans de una respuesta."""
+    if t is None:
+        return []
+    return [
+        {
+            "etapa": "\u2003" * depth + s.name,
+            "ms": round(s.duration_ms, 1),
+            "detalle": ", ".join(f"{k}={v}" for k, v in s.attributes.items()),
+        }
+        for depth, s in t.breakdown()
+    ]
+
+
+def render_timings(rows: List[Dict[str, Any]]) -> None:
+    with st.expander(f"⏱️ Tiempos ({rows[0]['ms']:.0f} ms)"):
+        st.dataframe(rows, hide_index=True, use_container_width=True)
 
 
 def main() -> None:
@@ -61,25 +172,14 @@ def main() -> None:
         "Este asistente responde preguntas sobre los CVs de los integrantes del equipo. "
         "Si la pregunta no menciona ningún nombre, se usa tu CV por defecto."
     )
+    readiness.mark("primer render", time.perf_counter() - PROCESS_START)
 
-    # historial
-    for msg in st.session_state.messages:
-        with st.chat_message(msg["role"]):
-            st.markdown(msg["content"])
-            if msg["role"] == "assistant" and msg.get("chunks"):
-                with st.expander("Ver fragmentos de CV usados como contexto"):
-                    # agrupamos por persona para mostrar mejor
-                    by_person = {}
-                    for c in msg["chunks"]:
-                        by_person.setdefault(c.person_name, []).append(c)
-                    for person_name, plist in by_person.items():
-                        st.markdown(f"### {person_name}")
-                        for i, c in enumerate(plist, start=1):
-                            st.markdown(f"**Fragmento {i}** (score: {c.score:.3f})")
-                            st.write(c.text)
+    render_history(router)
 
     user_input = st.chat_input("Escribe tu pregunta sobre uno o varios CVs...")
     if user_input:
+        # una pregunta nueva vuelve a la última página del historial
+        st.session_state.history_pages = 1
         # usuario
         st.session_state.messages.append(
             {"role": "user", "content": user_input}
@@ -89,27 +189,43 @@ def main() -> None:
 
         # agente(s)
         with st.chat_message("assistant"):
-            with st.spinner("Consultando a los agentes..."):
-                answer, chunks = router.answer(user_input)
-                st.markdown(answer)
-
-                with st.expander("Ver fragmentos de CV usados como contexto"):
-                    by_person = {}
-                    for c in chunks:
-                        by_person.setdefault(c.person_name, []).append(c)
-                    for person_name, plist in by_person.items():
-                        st.markdown(f"### {person_name}")
-                        for i, c in enumerate(plist, start=1):
-                            st.markdown(f"**Fragmento {i}** (score: {c.score:.3f})")
-                            st.write(c.text)
+            # la traza cubre recuperación y streaming; si el tracing global está apagado,
+            # sólo se registra cuando el usuario pidió ver los tiempos
+            started = time.perf_counter()
+            spinner_text = (
+                "Consultando a los agentes..."
+                if readiness.is_ready(EMBEDDING_LOAD)
+                else "Terminando de cargar el modelo de embeddings..."
+            )
+            with trace("chat", record=st.session_state.get("show_timings", False)) as t:
+                with st.spinner(spinner_text):
+                    stream, chunks = router.stream_answer(user_input)
+
+                # reservamos el lugar de la respuesta y mostramos el contexto ya recuperado
+                answer_slot = st.container()
+                context = compact_context(
+                    chunks, router.chunk_store, get_settings().chat_history_excerpt_chars
+                )
+                render_context(context, {c.id: c.text for c in chunks})
+                with answer_slot:
+                    answer = st.write_stream(stream)
+            readiness.mark("primera respuesta", time.perf_counter() - started)
+
+            timings = timing_rows(t) if st.session_state.get("show_timings") else []
+            if timings:
+                render_timings(timings)
 
         st.session_state.messages.append(
             {
                 "role": "assistant",
                 "content": answer,
-                "chunks": chunks,
+                "context": context,
+                "timings": timings,
             }
         )
+        st.session_state.history_dropped += trim_history(
+            st.session_state.messages, get_settings().chat_history_max_messages
+        )
 
 
 if __name__ == "__main__":
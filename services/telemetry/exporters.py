@@ -0,0 +1,123 @@
+# services/telemetry/exporters.py
+from __future__ import annotations
+
+import json
+import os
+import pathlib
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, List, Optional
+
+from config import Settings
+from services.telemetry.metrics import MetricsRegistry
+from services.telemetry.tracing import Trace, configure_tracing
+
+
+class JsonLogExporter:
+    """Una línea JSON por traza terminada, a un archivo (append) o a stderr."""
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self._path = path or None
+        self._lock = threading.Lock()
+        if self._path:
+            pathlib.Path(self._path).parent.mkdir(parents=True, exist_ok=True)
+
+    def __call__(self, trace: Trace) -> None:
+        line = json.dumps(trace.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            if self._path:
+                with open(self._path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            else:
+                print(line, file=sys.stderr, flush=True)
+
+
+class PrometheusFileExporter:
+    """
+    Agrega cada traza al registro y reescribe el archivo de métricas (de forma atómica)
+    como mucho cada `min_interval_s`, para que un node-exporter o similar lo lea.
+    """
+
+    def __init__(self, registry: MetricsRegistry, path: str, min_interval_s: float = 5.0) -> None:
+        self.registry = registry
+        self._path = pathlib.Path(path)
+        self._min_interval_s = min_interval_s
+        self._last_write = 0.0
+        self._lock = threading.Lock()
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+
+    def __call__(self, trace: Trace) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_write < self._min_interval_s:
+                return
+            self._last_write = now
+        self.flush()
+
+    def flush(self) -> None:
+        tmp = self._path.with_suffix(self._path.suffix + ".tmp")
+        tmp.write_text(self.registry.render(), encoding="utf-8")
+        os.replace(tmp, self._path)
+
+
+def serve_metrics(registry: MetricsRegistry, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Expone `GET /metrics` en un hilo daemon."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
+
+
+_registry = MetricsRegistry()
+_file_exporters: List[PrometheusFileExporter] = []
+_server: Optional[ThreadingHTTPServer] = None
+
+
+def get_registry() -> MetricsRegistry:
+    return _registry
+
+
+def configure_telemetry(settings: Settings) -> None:
+    """
+    Activa tracing + exportadores según la configuración. Idempotente: el servidor
+    de métricas se levanta una sola vez por proceso.
+    """
+    global _server
+    exporters: List[Callable[[Trace], None]] = []
+    _file_exporters.clear()
+
+    if settings.tracing_enabled:
+        exporters.append(_registry.observe_trace)
+        exporters.append(JsonLogExporter(settings.trace_log_path or None))
+        if settings.metrics_path:
+            file_exporter = PrometheusFileExporter(_registry, settings.metrics_path)
+            _file_exporters.append(file_exporter)
+            exporters.append(file_exporter)
+        if settings.metrics_port and _server is None:
+            _server = serve_metrics(_registry, settings.metrics_port)
+
+    configure_tracing(settings.tracing_enabled, exporters)
+
+
+def flush_metrics() -> None:
+    """Escribe el archivo de métricas ya (al terminar un proceso corto como el ingest)."""
+    for exporter in _file_exporters:
+        exporter.flush()
@@ -0,0 +1,116 @@
+# services/telemetry/metrics.py
+from __future__ import annotations
+
+import bisect
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+from services.telemetry.tracing import Trace
+
+
+# buckets en segundos: de 1 ms (embedding cacheado) a 30 s (timeout del LLM)
+DEFAULT_BUCKETS_S: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+# atributos numéricos de los spans que se acumulan como contadores
+COUNTED_ATTRIBUTES = (
+    "prompt_tokens",
+    "completion_tokens",
+    "prompt_chars",
+    "chunks",
+    "texts",
+    "context_tokens",
+    "context_tokens_saved",
+)
+
+
+@dataclass
+class Histogram:
+    buckets: Tuple[float, ...] = DEFAULT_BUCKETS_S
+    counts: List[int] = field(default_factory=list)
+    total: int = 0
+    sum_s: float = 0.0
+
+    def __post_init__(self) -> None:
+        if not self.counts:
+            self.counts = [0] * len(self.buckets)
+
+    def observe(self, value_s: float) -> None:
+        idx = bisect.bisect_left(self.buckets, value_s)
+        if idx < len(self.counts):
+            self.counts[idx] += 1
+        self.total += 1
+        self.sum_s += value_s
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """
+    Agrega las trazas terminadas en métricas con formato de texto de Prometheus:
+    duración por span (histograma), errores por span y contadores de atributos
+    (tokens, caracteres de prompt, chunks).
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS_S) -> None:
+        self._buckets = buckets
+        self._lock = threading.Lock()
+        self._durations: Dict[str, Histogram] = {}
+        self._errors: Dict[str, int] = {}
+        self._counters: Dict[Tuple[str, str], float] = {}
+        self._traces: Dict[str, int] = {}
+
+    def observe_trace(self, trace: Trace) -> None:
+        with self._lock:
+            self._traces[trace.name] = self._traces.get(trace.name, 0) + 1
+            for s in list(trace.spans):
+                hist = self._durations.get(s.name)
+                if hist is None:
+                    hist = self._durations[s.name] = Histogram(self._buckets)
+                hist.observe(s.duration_ms / 1000.0)
+                if s.error:
+                    self._errors[s.name] = self._errors.get(s.name, 0) + 1
+                for attr in COUNTED_ATTRIBUTES:
+                    value = s.attributes.get(attr)
+                    if isinstance(value, (int, float)) and not isinstance(value, bool):
+                        key = (s.name, attr)
+                        self._counters[key] = self._counters.get(key, 0) + value
+
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            lines.append("# HELP rag_traces_total Trazas terminadas por operación.")
+            lines.append("# TYPE rag_traces_total counter")
+            for name, count in sorted(self._traces.items()):
+                lines.append(f'rag_traces_total{{trace="{_escape(name)}"}} {count}')
+
+            lines.append("# HELP rag_span_duration_seconds Duración de cada etapa.")
+            lines.append("# TYPE rag_span_duration_seconds histogram")
+            for name, hist in sorted(self._durations.items()):
+                label = f'span="{_escape(name)}"'
+                cumulative = 0
+                for bound, count in zip(hist.buckets, hist.counts):
+                    cumulative += count
+                    lines.append(
+                        f'rag_span_duration_seconds_bucket{{{label},le="{bound}"}} {cumulative}'
+                    )
+                lines.append(f'rag_span_duration_seconds_bucket{{{label},le="+Inf"}} {hist.total}')
+                lines.append(f"rag_span_duration_seconds_sum{{{label}}} {hist.sum_s:.6f}")
+                lines.append(f"rag_span_duration_seconds_count{{{label}}} {hist.total}")
+
+            lines.append("# HELP rag_span_errors_total Spans terminados con excepción.")
+            lines.append("# TYPE rag_span_errors_total counter")
+            for name, count in sorted(self._errors.items()):
+                lines.append(f'rag_span_errors_total{{span="{_escape(name)}"}} {count}')
+
+            lines.append("# HELP rag_span_attribute_total Suma de atributos numéricos por span.")
+            lines.append("# TYPE rag_span_attribute_total counter")
+            for (name, attr), value in sorted(self._counters.items()):
+                lines.append(
+                    f'rag_span_attribute_total{{span="{_escape(name)}",attribute="{attr}"}} {value:g}'
+                )
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,270 @@
+# services/telemetry/tracing.py
+from __future__ import annotations
+
+import contextvars
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+
+_current_trace: contextvars.ContextVar[Optional["Trace"]] = contextvars.ContextVar(
+    "rag_trace", default=None
+)
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar(
+    "rag_span", default=None
+)
+
+# con el tracing apagado y sin traza activa, `span()` devuelve un no-op compartido
+_enabled = False
+_exporters: List[Callable[["Trace"], None]] = []
+
+
+def _new_id() -> str:
+    return os.urandom(8).hex()
+
+
+@dataclass
+class Span:
+    name: str
+    span_id: str
+    parent_id: Optional[str]
+    start_s: float
+    end_s: float = 0.0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    @property
+    def duration_ms(self) -> float:
+        return max(self.end_s - self.start_s, 0.0) * 1000.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+@dataclass
+class Trace:
+    """Spans de una operación (una pregunta, una corrida de ingest). Thread-safe."""
+
+    name: str
+    trace_id: str = field(default_factory=_new_id)
+    started_at: float = field(default_factory=time.time)
+    spans: List[Span] = field(default_factory=list)
+    max_spans: int = 2000
+    dropped: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            if len(self.spans) >= self.max_spans:
+                self.dropped += 1
+                return
+            self.spans.append(span)
+
+    @property
+    def root(self) -> Optional[Span]:
+        with self._lock:
+            return next((s for s in self.spans if s.parent_id is None), None)
+
+    def breakdown(self) -> List[Tuple[int, Span]]:
+        """(profundidad, span) en orden de inicio, para mostrar como árbol."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start_s)
+        children: Dict[Optional[str], List[Span]] = {}
+        for s in spans:
+            children.setdefault(s.parent_id, []).append(s)
+
+        out: List[Tuple[int, Span]] = []
+
+        def walk(parent_id: Optional[str], depth: int) -> None:
+            for s in children.get(parent_id, []):
+                out.append((depth, s))
+                walk(s.span_id, depth + 1)
+
+        walk(None, 0)
+        return out
+
+    def to_dict(self) -> Dict[str, Any]:
+        root = self.root
+        return {
+            "trace": self.name,
+            "trace_id": self.trace_id,
+            "started_at": self.started_at,
+            "duration_ms": round(root.duration_ms, 3) if root else 0.0,
+            "dropped_spans": self.dropped,
+            "spans": [s.to_dict() for _, s in self.breakdown()],
+        }
+
+
+class _NoopSpan:
+    """Span inerte: `set` no hace nada y entrar/salir no cuesta más que la llamada."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+    def set(self, **attributes: Any) -> None:
+        return None
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class _ActiveSpan:
+    __slots__ = ("_trace", "_span", "_token")
+
+    def __init__(self, trace: Trace, name: str, attributes: Dict[str, Any]) -> None:
+        parent = _current_span.get()
+        self._trace = trace
+        self._span = Span(
+            name=name,
+            span_id=_new_id(),
+            parent_id=parent.span_id if parent is not None else None,
+            start_s=0.0,
+            attributes=attributes,
+        )
+        self._token: Optional[contextvars.Token] = None
+
+    def __enter__(self) -> Span:
+        self._token = _current_span.set(self._span)
+        self._span.start_s = time.perf_counter()
+        return self._span
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        self._span.end_s = time.perf_counter()
+        if exc_type is not None and exc_type is not GeneratorExit:
+            self._span.error = exc_type.__name__
+        try:
+            _current_span.reset(self._token)
+        except ValueError:
+            # un generador cerrado desde otro contexto (p. ej. por el GC)
+            pass
+        self._trace.add(self._span)
+
+
+def span(name: str, **attributes: Any) -> Any:
+    """
+    `with span("embed", texts=3) as s: ...; s.set(hits=2)`.
+    Sólo registra si hay una traza activa en el contexto; si no, es un no-op.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return NOOP_SPAN
+    return _ActiveSpan(trace, name, attributes)
+
+
+def current_span() -> Any:
+    """Span activo (para agregar atributos desde código interno) o el no-op."""
+    s = _current_span.get()
+    return s if s is not None else NOOP_SPAN
+
+
+class _TraceScope:
+    __slots__ = ("_name", "_attributes", "_trace", "_token", "_root")
+
+    def __init__(self, name: str, attributes: Dict[str, Any]) -> None:
+        self._name = name
+        self._attributes = attributes
+        self._trace: Optional[Trace] = None
+        self._token: Optional[contextvars.Token] = None
+        self._root: Optional[_ActiveSpan] = None
+
+    def __enter__(self) -> Trace:
+        self._trace = Trace(name=self._name)
+        self._token = _current_trace.set(self._trace)
+        self._root = _ActiveSpan(self._trace, self._name, self._attributes)
+        self._root.__enter__()
+        return self._trace
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        self._root.__exit__(exc_type, exc, tb)
+        try:
+            _current_trace.reset(self._token)
+        except ValueError:
+            pass
+        if _enabled:
+            export(self._trace)
+
+
+class _NestedTrace:
+    """`trace()` dentro de una traza activa: es un span más y devuelve la traza externa."""
+
+    __slots__ = ("_trace", "_span")
+
+    def __init__(self, trace: Trace, name: str, attributes: Dict[str, Any]) -> None:
+        self._trace = trace
+        self._span = _ActiveSpan(trace, name, attributes)
+
+    def __enter__(self) -> Trace:
+        self._span.__enter__()
+        return self._trace
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        self._span.__exit__(exc_type, exc, tb)
+
+
+class _NoTrace:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+
+_NO_TRACE = _NoTrace()
+
+
+def trace(name: str, record: bool = False, **attributes: Any) -> Any:
+    """
+    Abre una traza (span raíz) si el tracing está activo o `record=True`
+    (p. ej. para mostrar tiempos en la UI). Al cerrarse se exporta si está activo.
+    Dentro de otra traza se comporta como `span`.
+    """
+    active = _current_trace.get()
+    if active is not None:
+        return _NestedTrace(active, name, attributes)
+    if not (_enabled or record):
+        return _NO_TRACE
+    return _TraceScope(name, attributes)
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def configure_tracing(enabled: bool, exporters: Iterable[Callable[[Trace], None]] = ()) -> None:
+    global _enabled
+    _enabled = enabled
+    _exporters[:] = list(exporters)
+
+
+def export(trace: Trace) -> None:
+    for exporter in list(_exporters):
+        try:
+            exporter(trace)
+        except Exception:
+            # la telemetría nunca debe romper una respuesta
+            pass
+
+
+def run_in_context(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """Envuelve `fn` para que corra con la traza/span actuales en otro hilo."""
+    ctx = contextvars.copy_context()
+    return lambda *args, **kwargs: ctx.run(fn, *args, **kwargs)
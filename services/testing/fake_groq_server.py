@@ -0,0 +1,207 @@
+# services/testing/fake_groq_server.py
+from __future__ import annotations
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from services.testing.fakes import Latency
+
+
+class FakeGroqServer:
+    """
+    Servidor HTTP local que imita `POST /openai/v1/chat/completions` de Groq.
+
+    - `latency`: demora por respuesta.
+    - `token_latency`: demora entre fragmentos cuando el request pide `stream: true`.
+    - `error_rate`: fracción de respuestas que fallan con `error_status` (429 o 5xx).
+    - cuenta requests, conexiones TCP abiertas (para verificar keep-alive) y la
+      concurrencia máxima observada.
+
+    Uso:
+        with FakeGroqServer(latency=Latency(0.05)) as server:
+            LLMClientConfig(api_key="test", base_url=server.base_url)
+    """
+
+    def __init__(
+        self,
+        latency: Optional[Latency] = None,
+        reply: str = "Respuesta simulada.",
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        token_latency: Optional[Latency] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ) -> None:
+        self.latency = latency or Latency()
+        self.reply = reply
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.token_latency = token_latency or Latency()
+        self.requests = 0
+        self.connections = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeGroqServer":
+        self._thread = threading.Thread(
+            target=self._server.serve_forever,
+            name="fake-groq",
+            daemon=True,
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeGroqServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def _completion(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        prompt_chars = sum(len(m.get("content", "")) for m in body.get("messages", []))
+        prompt_tokens = prompt_chars // 4
+        completion_tokens = len(self.reply) // 4
+        return {
+            "id": f"chatcmpl-fake-{self.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": self.reply},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def _stream_chunks(self, body: Dict[str, Any]) -> List[Dict[str, Any]]:
+        base = {
+            "id": f"chatcmpl-fake-{self.requests}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+        }
+        words = self.reply.split(" ")
+        chunks = [
+            {
+                **base,
+                "choices": [
+                    {
+                        "index": 0,
+                        "delta": {"content": w if i == 0 else " " + w},
+                        "finish_reason": None,
+                    }
+                ],
+            }
+            for i, w in enumerate(words)
+        ]
+        final = self._completion(body)
+        chunks.append(
+            {
+                **base,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                "x_groq": {"id": base["id"], "usage": final["usage"]},
+            }
+        )
+        return chunks
+
+    def _handler_class(self) -> type:
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+            # headers y cuerpo salen en escrituras separadas: sin esto, Nagle + ACK
+            # retardado agregan ~40 ms por respuesta y ensucian las mediciones
+            disable_nagle_algorithm = True
+
+            def setup(self) -> None:
+                super().setup()
+                with fake._lock:
+                    fake.connections += 1
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def _send_json(self, status: int, payload: Dict[str, Any], headers: Dict[str, str]) -> None:
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", "0"))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                with fake._lock:
+                    fake.requests += 1
+
+                if self.path.rstrip("/") != "/openai/v1/chat/completions":
+                    self._send_json(404, {"error": {"message": "not found"}}, {})
+                    return
+
+                with fake._lock:
+                    fake._in_flight += 1
+                    fake.max_in_flight = max(fake.max_in_flight, fake._in_flight)
+                try:
+                    fake.latency.sleep()
+                finally:
+                    with fake._lock:
+                        fake._in_flight -= 1
+                if fake.error_rate and random.random() < fake.error_rate:
+                    headers = {"Retry-After": "0"} if fake.error_status == 429 else {}
+                    self._send_json(
+                        fake.error_status,
+                        {"error": {"message": "simulated failure", "type": "fake_error"}},
+                        headers,
+                    )
+                    return
+
+                if body.get("stream"):
+                    self._send_stream(body)
+                    return
+                self._send_json(200, fake._completion(body), {})
+
+            def _write_chunk(self, data: bytes) -> None:
+                # transfer-encoding chunked para mantener la conexión viva
+                self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+
+            def _send_stream(self, body: Dict[str, Any]) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for i, chunk in enumerate(fake._stream_chunks(body)):
+                    if i:
+                        fake.token_latency.sleep()
+                    self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                self._write_chunk(b"data: [DONE]\n\n")
+                self.wfile.write(b"0\r\n\r\n")
+
+        return Handler
@@ -0,0 +1,238 @@
+# services/testing/fakes.py
+from __future__ import annotations
+
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+@dataclass
+class Latency:
+    """
+    Latencia simulada: `base_s` ± `jitter_s` (uniforme), nunca negativa. Con `sigma` > 0
+    se multiplica por una lognormal de mediana 1: la cola larga de una API real.
+    """
+
+    base_s: float = 0.0
+    jitter_s: float = 0.0
+    sigma: float = 0.0
+
+    def sample(self) -> float:
+        delay = self.base_s
+        if self.jitter_s:
+            delay = max(0.0, delay + random.uniform(-self.jitter_s, self.jitter_s))
+        if self.sigma:
+            delay *= random.lognormvariate(0.0, self.sigma)
+        return delay
+
+    def sleep(self) -> None:
+        delay = self.sample()
+        if delay > 0:
+            time.sleep(delay)
+
+
+class LatencyVectorStore:
+    """
+    Stand-in de Pinecone: envuelve un store real (p. ej. LocalVectorStore) y agrega
+    latencia de red a cada operación. Cuenta llamadas y concurrencia máxima observada.
+    """
+
+    def __init__(self, inner: Any, latency: Optional[Latency] = None) -> None:
+        self.inner = inner
+        self.latency = latency or Latency()
+        self.calls: Dict[str, int] = {}
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def _call(self, name: str, *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        try:
+            self.latency.sleep()
+            return getattr(self.inner, name)(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def upsert(self, *args: Any, **kwargs: Any) -> Any:
+        return self._call("upsert", *args, **kwargs)
+
+    def query(self, *args: Any, **kwargs: Any) -> List[Tuple[str, float, Dict]]:
+        return self._call("query", *args, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        # resto de la interfaz del store (delete, fetch, ...) también pasa por la latencia
+        attr = getattr(self.inner, name)
+        if not callable(attr):
+            return attr
+        return lambda *args, **kwargs: self._call(name, *args, **kwargs)
+
+
+@dataclass
+class FakeLLMClient:
+    """
+    Stand-in de Groq con la forma de `client.chat.completions.create(...)`.
+    Devuelve una respuesta fija (o generada por `reply`) tras la latencia configurada.
+    Cuenta la concurrencia máxima observada, como LatencyVectorStore.
+    """
+
+    latency: Latency = field(default_factory=Latency)
+    reply: str = "Respuesta simulada."
+    token_latency: Latency = field(default_factory=Latency)  # entre fragmentos si stream=True
+    calls: List[Dict[str, Any]] = field(default_factory=list)
+    max_in_flight: int = 0
+
+    def __post_init__(self) -> None:
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    def _usage(self, messages: List[Dict[str, str]]) -> Any:
+        prompt_chars = sum(len(m["content"]) for m in messages)
+        return SimpleNamespace(
+            prompt_tokens=prompt_chars // 4,
+            completion_tokens=len(self.reply) // 4,
+            total_tokens=prompt_chars // 4 + len(self.reply) // 4,
+        )
+
+    def _stream(self, messages: List[Dict[str, str]]) -> Iterator[Any]:
+        words = self.reply.split(" ")
+        for i, word in enumerate(words):
+            if i:
+                self.token_latency.sleep()
+            text = word if i == 0 else " " + word
+            delta = SimpleNamespace(role="assistant", content=text)
+            yield SimpleNamespace(
+                choices=[SimpleNamespace(index=0, delta=delta, finish_reason=None)],
+                x_groq=None,
+            )
+        yield SimpleNamespace(
+            choices=[
+                SimpleNamespace(index=0, delta=SimpleNamespace(content=None), finish_reason="stop")
+            ],
+            x_groq=SimpleNamespace(usage=self._usage(messages)),
+        )
+
+    def _create(self, model: str, messages: List[Dict[str, str]], **kwargs: Any) -> Any:
+        with self._lock:
+            self.calls.append({"model": model, "messages": messages, **kwargs})
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        try:
+            self.latency.sleep()
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+        if kwargs.get("stream"):
+            return self._stream(messages)
+
+        usage = self._usage(messages)
+        message = SimpleNamespace(role="assistant", content=self.reply)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")],
+            usage=usage,
+            model=model,
+        )
+
+
+class FakeIndexError(ConnectionError):
+    """Falla simulada del índice (como un 5xx o un timeout de Pinecone)."""
+
+
+class FakePineconeIndex:
+    """
+    Stand-in de `pinecone.Index`: misma forma de llamadas (`upsert(vectors=...)`,
+    `query(...)` → {"matches": [...]}, `delete(ids=...)`, `fetch(ids=...)`, `list`,
+    `describe_index_stats`, todas con `namespace=`) sobre un LocalVectorStore, con
+    latencia de red simulada. Permite ejercitar VectorStore sin red.
+    `error_rate`: fracción de consultas que fallan con FakeIndexError tras la latencia.
+    """
+
+    def __init__(
+        self,
+        inner: Any,
+        latency: Optional[Latency] = None,
+        error_rate: float = 0.0,
+    ) -> None:
+        self.inner = inner
+        self.latency = latency or Latency()
+        self.error_rate = error_rate
+
+    def upsert(self, vectors: List[Dict[str, Any]], namespace: str = "") -> Dict[str, int]:
+        self.latency.sleep()
+        self.inner.upsert(
+            [v["id"] for v in vectors],
+            [v["values"] for v in vectors],
+            [v.get("metadata", {}) for v in vectors],
+            namespace=namespace,
+        )
+        return {"upserted_count": len(vectors)}
+
+    def query(
+        self,
+        vector: List[float],
+        top_k: int,
+        include_metadata: bool = True,
+        filter: Optional[Dict] = None,
+        namespace: str = "",
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        self.latency.sleep()
+        if self.error_rate and random.random() < self.error_rate:
+            raise FakeIndexError("simulated index failure")
+        matches = self.inner.query(
+            vector,
+            top_k=top_k,
+            metadata_filter=filter,
+            namespace=namespace,
+            include_metadata=include_metadata,
+        )
+        return {
+            "matches": [
+                {"id": _id, "score": score, **({"metadata": meta} if include_metadata else {})}
+                for _id, score, meta in matches
+            ]
+        }
+
+    def delete(
+        self,
+        ids: Optional[List[str]] = None,
+        delete_all: bool = False,
+        namespace: str = "",
+    ) -> Dict:
+        self.latency.sleep()
+        if delete_all:
+            self.inner.delete_namespace(namespace)
+        else:
+            self.inner.delete(ids or [], namespace=namespace)
+        return {}
+
+    def fetch(self, ids: List[str], namespace: str = "") -> Any:
+        self.latency.sleep()
+        found = self.inner.fetch(ids, namespace=namespace)
+        return SimpleNamespace(
+            vectors={
+                _id: SimpleNamespace(id=_id, values=values, metadata=meta)
+                for _id, (values, meta) in found.items()
+            }
+        )
+
+    def list(self, namespace: str = "", limit: int = 100) -> Iterator[List[str]]:
+        ids = list(self.inner.list_ids(namespace))
+        for start in range(0, len(ids), limit):
+            self.latency.sleep()
+            yield ids[start : start + limit]
+
+    def describe_index_stats(self) -> Dict[str, Any]:
+        self.latency.sleep()
+        return {
+            "namespaces": {
+                name: {"vector_count": count}
+                for name, count in self.inner.namespace_counts().items()
+            }
+        }
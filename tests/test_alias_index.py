@@ -0,0 +1,37 @@
+# tests/test_alias_index.py
+from __future__ import annotations
+
+from config import PersonConfig
+from services.agents.alias_index import AliasIndex, fold
+
+PERSONS = [
+    PersonConfig(id="ana", name="Ana Morales", cv_path="", aliases=["ana", "anita"]),
+    PersonConfig(id="jose", name="José Muñoz", cv_path="", aliases=["jose", "pepe"]),
+    PersonConfig(id="luis", name="Luis Pérez", cv_path="", aliases=["luis"]),
+    PersonConfig(id="luisa", name="Luisa Gómez", cv_path="", aliases=["luisa"]),
+]
+
+
+def test_fold():
+    assert fold("  José   MUÑOZ ") == "jose munoz"
+
+
+def test_match_sin_tildes_y_en_orden_de_configuracion():
+    index = AliasIndex(PERSONS)
+    assert index.match("Compará a JOSÉ con Ana") == ["ana", "jose"]
+    assert index.match("¿Qué sabe Pepe de datos?") == ["jose"]
+
+
+def test_respeta_limites_de_palabra():
+    index = AliasIndex(PERSONS)
+    assert index.match("¿Qué hace mañana?") == []
+    assert index.match("Experiencia de Luisa") == ["luisa"]
+    assert index.match("luis y luisa") == ["luis", "luisa"]
+
+
+def test_nombre_completo():
+    assert AliasIndex(PERSONS).match("Resumí a Ana Morales") == ["ana"]
+
+
+def test_sin_personas():
+    assert AliasIndex([]).match("hola") == []
@@ -0,0 +1,60 @@
+# tests/test_answer_cache.py
+from __future__ import annotations
+
+import numpy as np
+
+from services.agents.answer_cache import SemanticAnswerCache
+from services.rag.index_version import bump_index_version
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _vec(*values: float) -> np.ndarray:
+    return np.asarray(values, dtype=np.float32)
+
+
+def test_hit_por_similitud_dentro_del_mismo_conjunto_de_personas():
+    cache = SemanticAnswerCache(threshold=0.95)
+    cache.store(["ana"], "¿Dónde estudió?", _vec(1, 0, 0), "En la UBA", [])
+    hit = cache.lookup(["ana"], _vec(0.99, 0.05, 0))
+    assert hit is not None and hit.answer == "En la UBA"
+    assert cache.lookup(["ana"], _vec(0, 1, 0)) is None
+    assert cache.lookup(["ana", "jose"], _vec(1, 0, 0)) is None
+    assert (cache.stats.hits, cache.stats.misses) == (1, 2)
+
+
+def test_expira_por_ttl():
+    clock = Clock()
+    cache = SemanticAnswerCache(ttl_s=10, clock=clock)
+    cache.store(["ana"], "q", _vec(1, 0), "r", [])
+    clock.now = 11
+    assert cache.lookup(["ana"], _vec(1, 0)) is None
+
+
+def test_desaloja_la_menos_usada():
+    cache = SemanticAnswerCache(max_entries=2)
+    cache.store(["ana"], "a", _vec(1, 0, 0), "ra", [])
+    cache.store(["ana"], "b", _vec(0, 1, 0), "rb", [])
+    assert cache.lookup(["ana"], _vec(1, 0, 0)) is not None  # "a" pasa a ser la más reciente
+    cache.store(["ana"], "c", _vec(0, 0, 1), "rc", [])
+    assert cache.lookup(["ana"], _vec(0, 1, 0)) is None
+    assert cache.lookup(["ana"], _vec(1, 0, 0)) is not None
+    assert cache.stats.evictions == 1
+
+
+def test_se_invalida_cuando_cambia_la_version_del_indice(tmp_path):
+    version = str(tmp_path / "version")
+    bump_index_version(version)
+    cache = SemanticAnswerCache(version_path=version)
+    cache.store(["ana"], "q", _vec(1, 0), "vieja", [])
+    assert cache.lookup(["ana"], _vec(1, 0)) is not None
+
+    bump_index_version(version)
+    assert cache.lookup(["ana"], _vec(1, 0)) is None
+    assert cache.stats.invalidations == 1
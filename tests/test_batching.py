@@ -0,0 +1,83 @@
+# tests/test_batching.py
+from __future__ import annotations
+
+import pytest
+
+from services.rag.batching import call_with_retries, is_transient_error, iter_size_batches
+
+
+class FakeIndexError(ConnectionError):
+    pass
+
+
+class StatusError(Exception):
+    def __init__(self, status: int) -> None:
+        super().__init__(f"HTTP {status}")
+        self.status = status
+
+
+def test_iter_size_batches_respeta_cantidad_y_bytes():
+    sizes = [3, 3, 3, 9, 1, 1]
+    batches = list(iter_size_batches(sizes, size_of=lambda s: s, max_items=2, max_bytes=8))
+    assert batches == [[3, 3], [3], [9], [1, 1]]
+
+
+def test_iter_size_batches_registro_mas_grande_que_el_limite_va_solo():
+    assert list(iter_size_batches([20, 1], size_of=lambda s: s, max_items=10, max_bytes=8)) == [
+        [20],
+        [1],
+    ]
+
+
+@pytest.mark.parametrize(
+    "exc, transient",
+    [
+        (FakeIndexError("caído"), True),
+        (TimeoutError(), True),
+        (StatusError(429), True),
+        (StatusError(503), True),
+        (StatusError(400), False),
+        (StatusError(401), False),
+        (ValueError("dimensión"), False),
+    ],
+)
+def test_is_transient_error(exc, transient):
+    assert is_transient_error(exc) is transient
+
+
+def test_reintenta_errores_transitorios():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise StatusError(503)
+        return "ok"
+
+    retries = []
+    assert call_with_retries(flaky, backoff_base_s=0, on_retry=retries.append) == "ok"
+    assert len(calls) == 3 and len(retries) == 2
+
+
+def test_no_reintenta_errores_permanentes():
+    calls = []
+
+    def bad_request():
+        calls.append(1)
+        raise StatusError(400)
+
+    with pytest.raises(StatusError):
+        call_with_retries(bad_request, backoff_base_s=0)
+    assert len(calls) == 1
+
+
+def test_se_rinde_despues_de_max_retries():
+    calls = []
+
+    def down():
+        calls.append(1)
+        raise FakeIndexError("caído")
+
+    with pytest.raises(FakeIndexError):
+        call_with_retries(down, max_retries=2, backoff_base_s=0)
+    assert len(calls) == 3
@@ -0,0 +1,55 @@
+# tests/test_chat_history.py
+from __future__ import annotations
+
+from services.agents.multi_agent import RetrievedChunk
+from services.rag.chunk_store import ChunkTextStore
+from services.streamlit.history import (
+    ChunkRef,
+    compact_context,
+    context_texts,
+    trim_history,
+    visible_start,
+)
+
+
+def _chunk(pid: str, _id: str, text: str, score: float = 0.5) -> RetrievedChunk:
+    return RetrievedChunk(
+        person_id=pid, person_name=pid.title(), id=_id, score=score, text=text
+    )
+
+
+def test_guarda_referencias_y_resuelve_el_texto_del_store(tmp_path):
+    store = ChunkTextStore(str(tmp_path / "chunks.sqlite"))
+    store.put_many([("ana-1", "ana", "Python y SQL"), ("luis-1", "luis", "Go")])
+    chunks = [_chunk("ana", "ana-1", "Python y SQL"), _chunk("luis", "luis-1", "Go", 0.4)]
+
+    context = compact_context(chunks, store, excerpt_chars=10)
+
+    assert [g.person_name for g in context] == ["Ana", "Luis"]
+    assert context[0].chunks == (ChunkRef("ana-1", 0.5),)
+    assert all(not g.excerpts for g in context)
+    assert context_texts([context], store) == {"ana-1": "Python y SQL", "luis-1": "Go"}
+
+
+def test_sin_store_queda_un_extracto_acotado():
+    text = "Email: ana@example.com, teléfono 555-1234 y LinkedIn"
+    context = compact_context([_chunk("ana", "ana-profile", text)], None, excerpt_chars=25)
+
+    excerpt = context[0].excerpts["ana-profile"]
+    assert len(excerpt) <= 26 and excerpt.endswith("…")
+    assert context_texts([context, None], None) == {"ana-profile": excerpt}
+
+
+def test_visible_start_empieza_en_una_pregunta():
+    messages = [{"role": r} for r in ["user", "assistant"] * 5]
+    assert visible_start(messages, 3, 1) == 6
+    assert visible_start(messages, 3, 10) == 0
+    assert visible_start(messages, 0, 1) == 0
+
+
+def test_trim_history_corta_en_una_pregunta():
+    messages = [{"role": r, "n": i} for i, r in enumerate(["user", "assistant"] * 5)]
+    dropped = trim_history(messages, 5)
+    assert dropped == 6
+    assert messages[0] == {"role": "user", "n": 6}
+    assert trim_history(messages, 0) == 0
@@ -0,0 +1,68 @@
+# tests/test_context_packing.py
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from services.rag.context_packing import PackingConfig, estimate_tokens, pack_context
+
+
+@dataclass
+class Chunk:
+    person_id: str
+    id: str
+    score: float
+    text: str
+
+
+def _text(seed: str, words: int = 40) -> str:
+    return " ".join(f"{seed}{i}" for i in range(words)) + "."
+
+
+def test_descarta_casi_duplicados():
+    base = _text("python")
+    chunks = [
+        Chunk("ana", "a-0", 0.9, base),
+        Chunk("ana", "a-1", 0.85, base.replace("python39", "java")),
+        Chunk("ana", "a-2", 0.8, _text("sql")),
+    ]
+    packed, report = pack_context(chunks, PackingConfig(max_tokens=0))
+    assert [c.id for c in packed] == ["a-0", "a-2"]
+    assert report.duplicates == 1
+
+
+def test_corta_por_distancia_al_mejor_score():
+    chunks = [
+        Chunk("ana", "a-0", 0.90, _text("a")),
+        Chunk("ana", "a-1", 0.60, _text("b")),
+    ]
+    packed, report = pack_context(chunks, PackingConfig(max_tokens=0, score_gap=0.15))
+    assert [c.id for c in packed] == ["a-0"]
+    assert report.below_gap == 1
+
+
+def test_reparte_el_presupuesto_por_rondas():
+    chunks = [Chunk("ana", f"a-{i}", 0.9 - i * 0.01, _text(f"ana{i}x")) for i in range(3)]
+    chunks.append(Chunk("jose", "j-0", 0.5, _text("jose")))
+    budget = estimate_tokens(chunks[0].text) * 2
+    packed, report = pack_context(chunks, PackingConfig(max_tokens=budget, score_gap=0))
+    # las dos personas reciben su mejor chunk antes de que ana reciba el segundo
+    assert {c.id for c in packed} >= {"a-0", "j-0"}
+    assert report.tokens_out <= budget
+
+
+def test_recorta_el_ultimo_chunk_sin_tocar_el_original():
+    first = Chunk("ana", "a-0", 0.9, _text("uno", 100))
+    second = Chunk("ana", "a-1", 0.89, _text("dos", 200))
+    budget = estimate_tokens(first.text) + 60
+    packed, report = pack_context([first, second], PackingConfig(max_tokens=budget, score_gap=0))
+    assert [c.id for c in packed] == ["a-0", "a-1"]
+    assert report.trimmed == 1
+    assert len(packed[1].text) < len(second.text)
+    assert second.text == _text("dos", 200)
+    assert report.tokens_out <= budget
+
+
+def test_ignora_chunks_sin_texto():
+    packed, report = pack_context([Chunk("ana", "a-0", 0.9, "")], PackingConfig())
+    assert packed == []
+    assert report.chunks_in == 1
@@ -0,0 +1,81 @@
+# tests/test_embedding_cache.py
+from __future__ import annotations
+
+import numpy as np
+
+from services.rag.embedding_cache import EmbeddingCache, cache_key
+
+
+def _cache(directory, max_disk_entries: int = 1024, max_memory_entries: int = 0) -> EmbeddingCache:
+    return EmbeddingCache(
+        "modelo",
+        4,
+        directory=str(directory),
+        max_memory_entries=max_memory_entries,
+        max_disk_entries=max_disk_entries,
+    )
+
+
+def _rows(n: int, start: int = 0) -> np.ndarray:
+    return np.repeat(np.arange(start, start + n, dtype=np.float32)[:, None], 4, axis=1)
+
+
+def test_cache_key_normaliza_espacios():
+    assert cache_key("m", "hola  mundo\n") == cache_key("m", "hola mundo")
+    assert cache_key("m", "hola") != cache_key("otro", "hola")
+
+
+def test_persiste_entre_instancias(tmp_path):
+    cache = _cache(tmp_path)
+    keys = [cache.key(f"t{i}") for i in range(3)]
+    cache.put_many(keys, _rows(3))
+    del cache
+
+    reopened = _cache(tmp_path)
+    got = reopened.get_many(keys)
+    assert [v[0] for v in got] == [0, 1, 2]
+    assert reopened.stats.disk_hits == 3
+
+
+def test_reutiliza_el_slot_menos_usado_y_el_orden_sobrevive_al_reinicio(tmp_path):
+    cache = _cache(tmp_path)
+    keys = [cache.key(f"t{i}") for i in range(1024)]
+    cache.put_many(keys, _rows(1024))
+    cache.get_many([keys[0]])  # t0 pasa a ser la más reciente
+    del cache
+
+    cache = _cache(tmp_path)
+    new = cache.key("nuevo")
+    cache.put_many([new], _rows(1, start=5000))
+    assert cache.stats.evictions == 1
+    first, second, latest = cache.get_many([keys[0], keys[1], new])
+    assert first is not None and first[0] == 0
+    assert second is None  # t1 era la menos usada: su slot quedó para "nuevo"
+    assert latest[0] == 5000
+
+
+def test_un_segundo_proceso_abre_de_solo_lectura(tmp_path):
+    writer = _cache(tmp_path)
+    reader = _cache(tmp_path)
+    assert not writer.read_only and reader.read_only
+
+    key = writer.key("t")
+    writer.put_many([key], _rows(1, start=7))
+    # el lector ve lo que agregó el escritor y no escribe
+    assert reader.get_many([key])[0][0] == 7
+    reader.put_many([reader.key("solo-memoria")], _rows(1))
+    assert len(writer) == 1
+
+
+def test_lector_no_devuelve_un_slot_reutilizado(tmp_path):
+    writer = _cache(tmp_path, max_disk_entries=1024)
+    keys = [writer.key(f"t{i}") for i in range(1024)]
+    writer.put_many(keys, _rows(1024))
+    reader = _cache(tmp_path)
+    assert reader.get_many([keys[0]])[0][0] == 0
+
+    # el escritor desaloja t0 (su menos usada) y pone otro texto en ese slot
+    writer.put_many([writer.key("otro")], _rows(1, start=9000))
+    # aun sin releer el log, el digest del slot ya no es el de t0
+    assert reader._disk.get(keys[0]) is None
+    assert reader.get_many([keys[0], writer.key("otro")])[1][0] == 9000
@@ -0,0 +1,61 @@
+# tests/test_ingest_pool.py
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import PersonConfig
+from services.ingest import main as ingest
+
+
+def _persons(tmp_path, n):
+    for i in range(n):
+        path = tmp_path / f"p{i}.txt"
+        path.write_text(f"CV número {i}.", encoding="utf-8")
+        yield PersonConfig(id=f"p{i}", name=f"Persona {i}", cv_path=str(path), aliases=[])
+
+
+def test_ventana_acotada_y_descubrimiento_perezoso(tmp_path, monkeypatch):
+    lock = threading.Lock()
+    in_flight = {"now": 0, "max": 0}
+    discovered = []
+
+    def slow_prepare(person, chunker_config, known_fingerprint=None):
+        with lock:
+            in_flight["now"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        time.sleep(0.01)
+        with lock:
+            in_flight["now"] -= 1
+        return ingest.PreparedPerson(person, "h", [person.id])
+
+    def discover():
+        for person in _persons(tmp_path, 20):
+            discovered.append(person.id)
+            yield person
+
+    monkeypatch.setattr(ingest, "prepare_person", slow_prepare)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = ingest.prepare_in_pool(pool, discover(), None, lambda p: None, max_in_flight=4)
+        first = next(results)
+        # el primer resultado sale antes de descubrir todo el corpus
+        assert len(discovered) <= 5
+        rest = list(results)
+
+    assert {r.person.id for r in [first, *rest]} == {f"p{i}" for i in range(20)}
+    assert in_flight["max"] <= 4
+
+
+def test_entrega_en_orden_de_terminacion(tmp_path, monkeypatch):
+    def prepare(person, chunker_config, known_fingerprint=None):
+        time.sleep(0.05 if person.id == "p0" else 0)
+        return ingest.PreparedPerson(person, "h", [])
+
+    monkeypatch.setattr(ingest, "prepare_person", prepare)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        order = [
+            r.person.id
+            for r in ingest.prepare_in_pool(pool, _persons(tmp_path, 3), None, lambda p: None, 2)
+        ]
+    assert order[-1] == "p0"
@@ -0,0 +1,172 @@
+# tests/test_llm_client.py
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+import groq
+import httpx
+import pytest
+
+from services.rag import llm_client
+from services.rag.llm_client import AsyncLLMClient, LLMClient, LLMClientConfig
+from services.testing.fake_groq_server import FakeGroqServer
+from services.testing.fakes import FakeLLMClient
+
+
+MESSAGES = [{"role": "user", "content": "hola"}]
+
+
+def _error(cls, status: int, headers=None):
+    request = httpx.Request("POST", "https://api.groq.test/openai/v1/chat/completions")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    return cls(f"HTTP {status}", response=response, body=None)
+
+
+class FlakyClient:
+    """FakeLLMClient que falla con los errores dados antes de responder."""
+
+    def __init__(self, *errors: Exception) -> None:
+        self.errors = list(errors)
+        self.fake = FakeLLMClient(reply="hola")
+        self.attempts = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        self.attempts += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return self.fake.chat.completions.create(**kwargs)
+
+
+class AsyncFlakyClient(FlakyClient):
+    """Lo mismo con la forma de AsyncGroq (`create` es una corrutina)."""
+
+    def __init__(self, *errors: Exception) -> None:
+        super().__init__(*errors)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._acreate))
+
+    async def _acreate(self, **kwargs):
+        return self._create(**kwargs)
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+
+    async def asleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(llm_client.time, "sleep", delays.append)
+    monkeypatch.setattr(llm_client.asyncio, "sleep", asleep)
+    return delays
+
+
+def _config(max_retries: int = 3, **kwargs) -> LLMClientConfig:
+    return LLMClientConfig(api_key="x", max_retries=max_retries, **kwargs)
+
+
+def _client(fake, max_retries: int = 3) -> LLMClient:
+    return LLMClient(_config(max_retries), client=fake)
+
+
+def _async_chat(fake, max_retries: int = 3) -> str:
+    return asyncio.run(AsyncLLMClient(_config(max_retries), client=fake).chat(MESSAGES))
+
+
+def test_reintenta_429_y_respeta_retry_after(sleeps):
+    fake = FlakyClient(_error(groq.RateLimitError, 429, {"retry-after": "2"}))
+    client = _client(fake)
+    assert client.chat(MESSAGES) == "hola"
+    assert fake.attempts == 2
+    assert sleeps == [2.0]
+    assert client.stats.retries == 1 and client.stats.errors == 0
+
+
+def test_retry_after_se_acota_al_backoff_maximo(sleeps):
+    fake = FlakyClient(_error(groq.RateLimitError, 429, {"retry-after": "120"}))
+    _client(fake).chat(MESSAGES)
+    assert sleeps == [_config().backoff_max_s]
+
+
+def test_reintenta_5xx_con_backoff_acotado(sleeps):
+    fake = FlakyClient(
+        _error(groq.InternalServerError, 503), _error(groq.InternalServerError, 502)
+    )
+    assert _client(fake).chat(MESSAGES) == "hola"
+    config = _config()
+    assert len(sleeps) == 2
+    assert all(0 <= d <= config.backoff_base_s * 2**i for i, d in enumerate(sleeps))
+
+
+def test_no_reintenta_4xx(sleeps):
+    fake = FlakyClient(_error(groq.AuthenticationError, 401))
+    client = _client(fake)
+    with pytest.raises(groq.AuthenticationError):
+        client.chat(MESSAGES)
+    assert fake.attempts == 1 and sleeps == []
+    assert client.stats.errors == 1
+
+
+def test_se_rinde_despues_de_max_retries(sleeps):
+    fake = FlakyClient(*[_error(groq.InternalServerError, 500) for _ in range(5)])
+    with pytest.raises(groq.InternalServerError):
+        _client(fake, max_retries=2).chat(MESSAGES)
+    assert fake.attempts == 3
+
+
+def test_async_misma_politica_de_reintentos(sleeps):
+    fake = AsyncFlakyClient(
+        _error(groq.RateLimitError, 429, {"retry-after": "2"}),
+        _error(groq.InternalServerError, 503),
+    )
+    assert _async_chat(fake) == "hola"
+    assert fake.attempts == 3
+    assert sleeps[0] == 2.0 and 0 <= sleeps[1] <= _config().backoff_base_s * 2
+
+    fake = AsyncFlakyClient(_error(groq.AuthenticationError, 401))
+    with pytest.raises(groq.AuthenticationError):
+        _async_chat(fake)
+    assert fake.attempts == 1
+
+    fake = AsyncFlakyClient(*[_error(groq.InternalServerError, 500) for _ in range(5)])
+    with pytest.raises(groq.InternalServerError):
+        _async_chat(fake, max_retries=2)
+    assert fake.attempts == 3
+
+
+def test_reutiliza_conexiones_contra_el_servidor_fake():
+    with FakeGroqServer(reply="pong") as server:
+        config = _config(base_url=server.base_url)
+        client = LLMClient(config)
+        assert [client.chat(MESSAGES) for _ in range(5)] == ["pong"] * 5
+        client.close()
+
+        async def ask() -> list:
+            aclient = AsyncLLMClient(config)
+            try:
+                return [await aclient.chat(MESSAGES) for _ in range(5)]
+            finally:
+                await aclient.aclose()
+
+        assert asyncio.run(ask()) == ["pong"] * 5
+        # un cliente por variante, cada uno con una sola conexión keep-alive
+        assert server.requests == 10
+        assert server.connections == 2
+    assert client.stats.calls == 5 and client.stats.prompt_tokens > 0
+
+
+def test_stream_reintenta_antes_del_primer_fragmento(sleeps):
+    fake = FlakyClient(_error(groq.RateLimitError, 429, {"retry-after": "0"}))
+    client = _client(fake)
+    assert "".join(client.stream_chat(MESSAGES)) == "hola"
+    assert fake.attempts == 2
+    assert client.stats.calls == 1 and client.stats.prompt_tokens > 0
+
+
+def test_stream_contra_el_servidor_fake():
+    with FakeGroqServer(reply="una respuesta en partes") as server:
+        client = LLMClient(_config(base_url=server.base_url))
+        parts = list(client.stream_chat(MESSAGES))
+        client.close()
+    assert len(parts) > 1 and "".join(parts) == "una respuesta en partes"
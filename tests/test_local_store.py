@@ -0,0 +1,81 @@
+# tests/test_local_store.py
+from __future__ import annotations
+
+import numpy as np
+
+from services.rag.local_store import LocalVectorStore
+
+
+def _unit(*values: float) -> np.ndarray:
+    v = np.asarray(values, dtype=np.float32)
+    return v / np.linalg.norm(v)
+
+
+def _ids(matches) -> list:
+    return [m[0] for m in matches]
+
+
+def test_escrituras_en_memoria_hasta_flush(tmp_path):
+    store = LocalVectorStore(str(tmp_path), dimension=3)
+    store.upsert(["a-0"], [_unit(1, 0, 0)], [{"person_id": "ana"}])
+    assert _ids(store.query(_unit(1, 0, 0))) == ["a-0"]
+    assert LocalVectorStore(str(tmp_path), dimension=3).query(_unit(1, 0, 0)) == []
+
+    store.flush()
+    reopened = LocalVectorStore(str(tmp_path), dimension=3)
+    assert _ids(reopened.query(_unit(1, 0, 0), metadata_filter={"person_id": "ana"})) == ["a-0"]
+
+
+def test_filtro_por_persona_despues_de_cambiar_metadata(tmp_path):
+    store = LocalVectorStore(str(tmp_path), dimension=3)
+    store.upsert(
+        ["x", "y"],
+        [_unit(1, 0, 0), _unit(0, 1, 0)],
+        [{"person_id": "ana"}, {"person_id": "ana"}],
+    )
+    store.upsert(["x"], [_unit(1, 0, 0)], [{"person_id": "jose"}])
+    assert _ids(store.query(_unit(1, 0, 0), metadata_filter={"person_id": "ana"})) == ["y"]
+    assert _ids(store.query(_unit(1, 0, 0), metadata_filter={"person_id": "jose"})) == ["x"]
+    both = store.query(_unit(1, 0, 0), metadata_filter={"person_id": {"$in": ["ana", "jose"]}})
+    assert _ids(both) == ["x", "y"]
+
+
+def test_upsert_sobre_indice_cargado(tmp_path):
+    store = LocalVectorStore(str(tmp_path), dimension=3)
+    store.upsert(["x"], [_unit(1, 0, 0)], [{"person_id": "ana"}])
+    store.flush()
+
+    # el índice cargado está en mmap de sólo lectura: la escritura lo copia a memoria
+    reopened = LocalVectorStore(str(tmp_path), dimension=3)
+    reopened.upsert(["y"], [_unit(0, 0, 1)], [{"person_id": "ana"}])
+    reopened.flush()
+    matches = LocalVectorStore(str(tmp_path), dimension=3).query(
+        _unit(0, 0, 1), metadata_filter={"person_id": "ana"}
+    )
+    assert _ids(matches) == ["y", "x"]
+
+
+def test_delete_se_persiste_con_flush(tmp_path):
+    store = LocalVectorStore(str(tmp_path), dimension=3)
+    store.upsert(["x", "y"], [_unit(1, 0, 0), _unit(0, 1, 0)], [{"person_id": "ana"}] * 2)
+    store.flush()
+
+    store.delete(["x"])
+    assert _ids(store.query(_unit(1, 0, 0))) == ["y"]
+    assert "x" in _ids(LocalVectorStore(str(tmp_path), dimension=3).query(_unit(1, 0, 0)))
+
+    store.flush()
+    assert _ids(LocalVectorStore(str(tmp_path), dimension=3).query(_unit(1, 0, 0))) == ["y"]
+
+
+def test_flush_persiste_los_namespaces(tmp_path):
+    store = LocalVectorStore(str(tmp_path), dimension=3)
+    store.upsert(["a-0"], [_unit(1, 0, 0)], [{"person_id": "ana"}], namespace="ana")
+    store.upsert(["j-0"], [_unit(0, 1, 0)], [{"person_id": "jose"}], namespace="jose")
+    assert _ids(store.query(_unit(1, 0, 0), namespace="ana")) == ["a-0"]
+    assert store.query(_unit(1, 0, 0)) == []
+
+    store.flush()
+    reopened = LocalVectorStore(str(tmp_path), dimension=3)
+    assert reopened.namespace_counts() == {"ana": 1, "jose": 1}
+    assert _ids(reopened.query(_unit(0, 1, 0), namespace="jose")) == ["j-0"]
@@ -0,0 +1,79 @@
+# tests/test_manifest.py
+from __future__ import annotations
+
+from services.ingest.manifest import Manifest, chunk_id
+
+
+def _recorded(chunks):
+    manifest = Manifest(target="local:test")
+    _, hashes = manifest.diff_person("ana", chunks)
+    manifest.record("ana", "h1", hashes)
+    return manifest
+
+
+def test_persona_nueva_sube_todo():
+    diff, hashes = Manifest(target="t").diff_person("ana", ["uno", "dos"])
+    assert diff.upserts == [(chunk_id("ana", "uno"), "uno"), (chunk_id("ana", "dos"), "dos")]
+    assert diff.deletes == []
+    assert diff.unchanged == 0
+    assert set(hashes) == {chunk_id("ana", "uno"), chunk_id("ana", "dos")}
+
+
+def test_id_depende_del_contenido():
+    assert chunk_id("ana", "uno") == chunk_id("ana", "uno")
+    assert chunk_id("ana", "uno") != chunk_id("ana", "dos")
+    assert chunk_id("ana", "uno") != chunk_id("jose", "uno")
+    assert chunk_id("ana", "uno").startswith("ana-")
+
+
+def test_sube_solo_los_chunks_modificados():
+    manifest = _recorded(["uno", "dos", "tres"])
+    diff, _ = manifest.diff_person("ana", ["uno", "DOS", "tres"])
+    assert diff.upserts == [(chunk_id("ana", "DOS"), "DOS")]
+    assert diff.unchanged == 2
+    assert diff.deletes == [chunk_id("ana", "dos")]
+
+
+def test_insertar_al_principio_sube_un_solo_chunk():
+    manifest = _recorded(["uno", "dos", "tres"])
+    diff, _ = manifest.diff_person("ana", ["cero", "uno", "dos", "tres"])
+    assert diff.upserts == [(chunk_id("ana", "cero"), "cero")]
+    assert diff.unchanged == 3
+    assert diff.deletes == []
+
+
+def test_chunks_repetidos_se_suben_una_vez():
+    diff, hashes = Manifest(target="t").diff_person("ana", ["uno", "uno"])
+    assert diff.upserts == [(chunk_id("ana", "uno"), "uno")]
+    assert list(hashes) == [chunk_id("ana", "uno")]
+
+
+def test_borra_los_ids_que_ya_no_existen():
+    manifest = _recorded(["uno", "dos", "tres"])
+    diff, hashes = manifest.diff_person("ana", ["uno"])
+    assert diff.upserts == []
+    assert diff.deletes == [chunk_id("ana", "dos"), chunk_id("ana", "tres")]
+    assert list(hashes) == [chunk_id("ana", "uno")]
+
+
+def test_salt_y_force_vuelven_a_subir():
+    manifest = _recorded(["uno"])
+    diff, _ = manifest.diff_person("ana", ["uno"], salt="Ana Pérez")
+    assert diff.upserts == [(chunk_id("ana", "uno"), "uno")]
+    diff, _ = manifest.diff_person("ana", ["uno"], force=True)
+    assert diff.upserts == [(chunk_id("ana", "uno"), "uno")]
+
+
+def test_load_descarta_manifest_de_otro_target(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    _recorded(["uno"]).save(path)
+    assert Manifest.load(path, target="local:test").persons.keys() == {"ana"}
+    assert Manifest.load(path, target="pinecone:otro").persons == {}
+
+
+def test_orphaned_persons():
+    manifest = _recorded(["uno", "dos"])
+    assert manifest.orphaned_persons(["jose"]) == {
+        "ana": [chunk_id("ana", "uno"), chunk_id("ana", "dos")]
+    }
+    assert manifest.orphaned_persons(["ana"]) == {}
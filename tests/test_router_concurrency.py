@@ -0,0 +1,202 @@
+# tests/test_router_concurrency.py
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from config import PersonConfig, Settings
+from services.agents import multi_agent
+from services.agents.multi_agent import AgentRouter
+from services.rag.llm_client import AsyncLLMClient, llm_config_from_settings
+from services.rag.local_store import LocalVectorStore
+from services.testing.fake_groq_server import FakeGroqServer
+from services.telemetry import tracing
+from services.testing.fakes import Latency, LatencyVectorStore
+
+
+DIM = 8
+PERSONS = [
+    PersonConfig(id=pid, name=pid.title(), cv_path="", aliases=[pid], is_default=pid == "jose")
+    for pid in ("jose", "maria", "luis")
+]
+QUESTIONS = [
+    "¿Qué estudió jose?",
+    "Compará a maria y luis",
+    "¿Dónde trabajaron jose, maria y luis?",
+    "¿Qué idiomas habla luis?",
+] * 3
+
+
+class SlowEmbedder:
+    """Reemplazo de embed_array: vector fijo tras una espera, contando la concurrencia."""
+
+    def __init__(self, delay_s: float) -> None:
+        self.delay_s = delay_s
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, text: str, model_name: str = "") -> np.ndarray:
+        with self._lock:
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        try:
+            time.sleep(self.delay_s)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+        return np.ones(DIM, dtype=np.float32)
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    embedder = SlowEmbedder(0.01)
+    monkeypatch.setattr(multi_agent, "embed_array", embedder)
+
+    inner = LocalVectorStore(str(tmp_path), dimension=DIM)
+    ids = [f"{p.id}-chunk-{i}" for p in PERSONS for i in range(6)]
+    metadatas = [{"person_id": p.id, "text": f"{p.name} {i}"} for p in PERSONS for i in range(6)]
+    vectors = np.random.default_rng(0).normal(size=(len(ids), DIM))
+    # el mismo corpus en el índice plano y en un namespace por persona
+    inner.upsert(ids, vectors, metadatas)
+    for n, p in enumerate(PERSONS):
+        rows = slice(6 * n, 6 * (n + 1))
+        inner.upsert(ids[rows], vectors[rows], metadatas[rows], namespace=p.id)
+
+    store = LatencyVectorStore(inner, Latency(0.02))
+    with FakeGroqServer(latency=Latency(0.02)) as llm:
+        settings = Settings(
+            pinecone_api_key="",
+            pinecone_index_name="test",
+            groq_api_key="test",
+            groq_base_url=llm.base_url,
+            persons=PERSONS,
+            top_k=2,
+            router_workers=16,
+            embed_concurrency=1,
+            store_concurrency=2,
+            llm_concurrency=2,
+            # estos tests miden los backends: sin cache de respuestas
+            answer_cache_enabled=False,
+            # el texto va en la metadata del índice en memoria
+            chunk_store_path="",
+            profile_index_path="",
+        )
+        router = AgentRouter(settings, store)
+        yield SimpleNamespace(
+            router=router, embedder=embedder, store=store, llm=llm, settings=settings
+        )
+        router.llm.close()
+
+
+def test_aanswer_respeta_los_limites_por_backend(env):
+    async def ask_all():
+        return await asyncio.gather(*(env.router.aanswer(q) for q in QUESTIONS))
+
+    results = asyncio.run(ask_all())
+
+    assert [answer for answer, _ in results] == ["Respuesta simulada."] * len(QUESTIONS)
+    assert env.embedder.max_in_flight == 1
+    assert env.store.max_in_flight == 2
+    assert env.llm.max_in_flight == 2
+
+
+def test_aanswer_con_cliente_llm_asincrono(env):
+    router = AgentRouter(
+        env.settings,
+        env.store,
+        async_llm_client=AsyncLLMClient(llm_config_from_settings(env.settings)),
+    )
+    # el AsyncClient de httpx queda atado al loop donde se usa: se reutiliza el de fondo
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        results = list(pool.map(router.answer_concurrent, QUESTIONS))
+
+    assert [answer for answer, _ in results] == ["Respuesta simulada."] * len(QUESTIONS)
+    assert env.llm.max_in_flight == 2
+    assert router.async_llm.stats.calls == len(QUESTIONS)
+    assert router.llm.stats.calls == 0
+
+
+@pytest.mark.parametrize("namespaces, queries_per_answer", [("none", 1), ("person", 2)])
+def test_aanswer_comparte_el_flujo_de_answer(env, namespaces, queries_per_answer):
+    settings = dataclasses.replace(env.settings, vector_namespaces=namespaces)
+    router = AgentRouter(settings, env.store)
+    question = "Compará a maria y luis"
+    _, sync_chunks = router.answer(question)
+    queries = env.store.calls["query"]
+    _, async_chunks = asyncio.run(router.aanswer(question))
+
+    assert [c.id for c in async_chunks] == [c.id for c in sync_chunks]
+    # sin namespaces, una sola consulta con `$in` para las dos personas; con namespaces,
+    # una por persona. En los dos casos, igual que answer
+    assert env.store.calls["query"] - queries == queries == queries_per_answer
+    assert {c.person_id for c in async_chunks} == {"maria", "luis"}
+    router.llm.close()
+
+
+def test_aanswer_usa_el_cache_de_respuestas(env):
+    settings = dataclasses.replace(env.settings, answer_cache_enabled=True)
+    router = AgentRouter(settings, env.store)
+    first = asyncio.run(router.aanswer("¿Dónde estudió maria?"))
+    queries = env.store.calls["query"]
+    second = router.answer("¿Dónde estudió maria?")
+
+    assert second == first
+    assert env.store.calls["query"] == queries
+    assert router.llm.stats.calls == 1
+    router.llm.close()
+
+
+def _loop_threads() -> int:
+    return sum(t.name == "router-loop" for t in threading.enumerate())
+
+
+def test_answer_concurrent_reutiliza_un_solo_loop(env):
+    before = _loop_threads()
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        results = list(pool.map(env.router.answer_concurrent, QUESTIONS))
+
+    assert len(results) == len(QUESTIONS)
+    assert _loop_threads() - before == 1
+    # los límites valen entre preguntas de hilos distintos porque comparten el loop
+    assert env.embedder.max_in_flight == 1
+    assert env.store.max_in_flight <= 2
+    assert env.llm.max_in_flight <= 2
+
+
+def test_los_errores_del_backend_llegan_a_quien_pregunta(env, monkeypatch):
+    def broken(*args, **kwargs):
+        raise ConnectionError("índice caído")
+
+    monkeypatch.setattr(env.store.inner, "query", broken)
+    with pytest.raises(ConnectionError):
+        asyncio.run(env.router.aanswer("Compará a maria y luis"))
+    with pytest.raises(ConnectionError):
+        env.router.answer_concurrent("¿Qué estudió jose?")
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_los_spans_del_flujo_quedan_dentro_de_la_traza(env, mode):
+    traces = []
+    tracing.configure_tracing(True, [traces.append])
+    try:
+        question = "Compará a maria y luis"
+        if mode == "sync":
+            env.router.answer(question)
+        else:
+            env.router.answer_concurrent(question)
+    finally:
+        tracing.configure_tracing(False)
+
+    (trace,) = traces
+    tree = {span.name: depth for depth, span in trace.breakdown()}
+    assert tree["answer"] == 0
+    assert tree["retrieve"] == tree["generate"] == tree["detect"] == 1
+    assert tree["prompt.build"] == 1